@@ -0,0 +1,85 @@
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Mapping, Union
+
+from parser import ExamParser, Question
+
+class AnswerKey(Mapping[str, str]):
+    """An answer key parsed once, mapping question numbers to upper-case letters.
+
+    Immutable, so one key can be shared between threads, pickled to worker
+    processes and passed straight to ExamParser in place of answer key text
+    for any number of exams.
+    """
+    __slots__ = ('_answers', 'source')
+
+    def __init__(self, answers: Mapping[str, str] = None, source: str = ''):
+        self._answers: Dict[str, str] = {str(number): letter.upper() for number, letter in (answers or {}).items()}
+        self.source = source
+
+    @classmethod
+    def from_text(cls, text: str, source: str = '') -> 'AnswerKey':
+        """Parse ``number: letter`` entries from answer key text."""
+        return cls(ExamParser().parse_answer_key(text), source)
+
+    @classmethod
+    def from_docx(cls, file_bytes: bytes, source: str = '') -> 'AnswerKey':
+        """Read the entries of a .docx answer key's tables and paragraphs."""
+        from docx_reader import iter_answer_pairs
+
+        return cls(dict(iter_answer_pairs(file_bytes)), source)
+
+    @classmethod
+    def from_bytes(cls, filename: str, file_bytes: bytes) -> 'AnswerKey':
+        """Parse an uploaded or stored key, choosing the format from the file name."""
+        if filename.lower().endswith('.docx'):
+            return cls.from_docx(file_bytes, filename)
+        from decoding import decode_bytes
+
+        return cls.from_text(decode_bytes(file_bytes).text, filename)
+
+    @classmethod
+    def from_file(cls, path: Union[str, Path]) -> 'AnswerKey':
+        path = Path(path)
+        return cls.from_bytes(path.name, path.read_bytes())
+
+    def __getitem__(self, number: str) -> str:
+        return self._answers[number]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._answers)
+
+    def __len__(self) -> int:
+        return len(self._answers)
+
+    def __repr__(self):
+        return f"AnswerKey({len(self._answers)} entries{', ' + repr(self.source) if self.source else ''})"
+
+    def coverage(self, parsed_questions: Iterable[Union[Question, str]]) -> 'KeyCoverage':
+        """Compare the key with the questions (or question numbers) of one exam."""
+        numbers = [getattr(question, 'number', question) for question in parsed_questions]
+        present = set(numbers)
+        return KeyCoverage(
+            matched=sum(1 for number in numbers if number in self._answers),
+            unkeyed=[number for number in numbers if number not in self._answers],
+            unused=[number for number in self._answers if number not in present],
+        )
+
+class KeyCoverage:
+    """How well an answer key fits an exam."""
+    __slots__ = ('matched', 'unkeyed', 'unused')
+
+    def __init__(self, matched: int, unkeyed: List[str], unused: List[str]):
+        self.matched = matched  # questions with a key entry
+        self.unkeyed = unkeyed  # question numbers with no key entry
+        self.unused = unused    # key entries with no question
+
+    def as_dict(self) -> Dict:
+        return {'matched': self.matched, 'unkeyed': self.unkeyed, 'unused': self.unused}
+
+    def describe(self) -> str:
+        text = f"key covers {self.matched} questions"
+        if self.unkeyed:
+            text += f", {len(self.unkeyed)} not in key"
+        if self.unused:
+            text += f", {len(self.unused)} key entries unused"
+        return text
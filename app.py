@@ -1,10 +1,8 @@
 import streamlit as st
-import pandas as pd
-import io
 from parser import ExamParser
-import chardet
-from docx import Document
-import re
+from exporters import iter_csv, iter_parquet, iter_xlsx
+from decoding import read_upload
+from parse_cache import ParseCache
 import os
 
 # Set page config at the very beginning
@@ -23,99 +21,53 @@ if not os.path.exists("attached_assets"):
 print(f"Streamlit app starting - running in {os.getcwd()}")
 print(f"PORT environment variable: {os.environ.get('PORT', 'not set')}")
 
-def read_docx_content(file_bytes):
-    """Read content from a .docx file."""
-    try:
-        # Create a BytesIO object from the file bytes
-        doc = Document(io.BytesIO(file_bytes))
-
-        # Extract text from paragraphs and tables
-        content = []
-
-        # Debug print for tables
-        for table_idx, table in enumerate(doc.tables):
-            print(f"\nProcessing Table {table_idx + 1}:")
-            for row_idx, row in enumerate(table.rows):
-                row_text = [cell.text.strip() for cell in row.cells]
-                print(f"Row {row_idx + 1}: {row_text}")
-
-                # Skip empty rows
-                if not any(row_text):
-                    continue
-
-                # Process each cell in the row
-                for i in range(len(row_text)):
-                    # Try to find question number and answer pairs
-                    cell_text = row_text[i].strip()
-
-                    # Skip empty cells
-                    if not cell_text:
-                        continue
-
-                    # Check if this cell contains a question number
-                    match = re.match(r'(\d+)\.?\s*$', cell_text)
-                    if match and i + 1 < len(row_text):
-                        question_num = match.group(1)
-                        # Look at the next cell for the answer
-                        answer = row_text[i + 1].strip()
-                        if answer and re.match(r'^[A-Da-d]$', answer):
-                            content.append(f"{question_num}: {answer}")
-                            print(f"Found answer: Question {question_num}: {answer}")
-
-        # Join all content with newlines
-        full_content = '\n'.join(content)
-
-        # Clean up the content
-        full_content = re.sub(r'\s+', ' ', full_content)  # Replace multiple spaces with single space
-        full_content = re.sub(r'\n\s*\n', '\n', full_content)  # Remove empty lines
-
-        # Debug print
-        print("Extracted content from DOCX:", full_content)
-
-        return full_content, None
-    except Exception as e:
-        return None, f"Error reading .docx file: {str(e)}"
-
-def detect_encoding(file_bytes):
-    """Detect the encoding of the uploaded file."""
-    result = chardet.detect(file_bytes)
-    return result['encoding']
+@st.cache_resource(max_entries=8, show_spinner="Parsing questions...")
+def parse_upload(digest, question_name, _question_bytes, answer_key_name, _answer_key_bytes):
+    """Decode and parse an upload; returns (parsed questions, parse statistics, encoding description, error).
 
-def read_file_content(uploaded_file):
-    """Read file content with appropriate encoding."""
+    Cached on ``digest``, a hash of the file contents, so reruns triggered by
+    widget interactions skip decoding and parsing. Arguments starting with an
+    underscore are not hashed by Streamlit. The cached objects are returned
+    as they are, not unpickled into a copy on every rerun as with
+    st.cache_data, so callers must not modify them.
+    """
     try:
-        # Check if file is .docx
-        if uploaded_file.name.lower().endswith('.docx'):
-            return read_docx_content(uploaded_file.getvalue())
-
-        # For .txt files, use existing logic
-        bytes_data = uploaded_file.getvalue()
-        encodings = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1', 'utf-16']
-        content = None
-        used_encoding = None
-
-        for encoding in encodings:
-            try:
-                content = bytes_data.decode(encoding)
-                used_encoding = encoding
-                st.success(f"Successfully read file using {encoding} encoding")
-                break
-            except UnicodeDecodeError:
-                continue
-
-        if content is None:
-            detected = chardet.detect(bytes_data)
-            try:
-                content = bytes_data.decode(detected['encoding'] if detected['encoding'] else 'utf-8')
-                used_encoding = detected['encoding']
-                st.success(f"Successfully read file using detected encoding: {detected['encoding']}")
-            except:
-                raise UnicodeDecodeError("Could not decode file with any supported encoding")
-
-        return content, None
+        decoded = read_upload(question_name, _question_bytes)
     except Exception as e:
-        detailed_error = f"Error reading file: {str(e)}"
-        return None, detailed_error
+        return None, None, None, f"Error reading file: {str(e)}"
+
+    # If we have a separate answer key, read and process it
+    answer_key_content = None
+    if _answer_key_bytes is not None:
+        try:
+            answer_key_content = read_upload(answer_key_name, _answer_key_bytes).text
+        except Exception as e:
+            return None, None, None, f"Error reading answer key file: {str(e)}"
+
+    # Parse content with optional answer key
+    parser = ExamParser()
+    parsed_questions = parser.parse_content(decoded.text, answer_key_content)
+    return parsed_questions, parser.stats, decoded.describe(), None
+
+def session_result(digest, parsed_questions):
+    """The current upload's DataFrame and the exports built for it so far, kept for this session."""
+    result = st.session_state.get('result')
+    if result is None or result['digest'] != digest:
+        result = {'digest': digest, 'df': ExamParser().create_dataframe(parsed_questions), 'exports': {}}
+        st.session_state['result'] = result
+    return result
+
+def build_export(result, fmt, build):
+    result['exports'][fmt] = build()
+
+def export_button(result, fmt, label, build, file_name, mime):
+    """Build an export the first time it is asked for, then offer the stored bytes for download."""
+    data = result['exports'].get(fmt)
+    if data is None:
+        # The callback runs before the rerun, which then shows the download button instead
+        st.button(f"Prepare {label}", key=f"prepare_{fmt}", on_click=build_export, args=(result, fmt, build))
+    else:
+        st.download_button(label=f"Download as {label}", data=data, file_name=file_name, mime=mime)
 
 def main():
     st.title("📝 Exam Question Converter")
@@ -136,26 +88,25 @@ def main():
         answer_key_file = st.file_uploader("Upload your answer key file", type=['txt', 'docx'])
 
     if uploaded_file:
-        # Read and parse file
-        content, error = read_file_content(uploaded_file)
+        question_bytes = uploaded_file.getvalue()
+        answer_key_bytes = answer_key_file.getvalue() if has_separate_answers and answer_key_file else None
+        answer_key_name = answer_key_file.name if answer_key_bytes is not None else ''
+        digest = ParseCache.make_key(question_bytes, answer_key_bytes,
+                                     settings=(answer_key_name.lower().endswith('.docx'),))
+
+        # Read and parse file, or reuse the result for these exact contents
+        parsed_questions, stats, encoding, error = parse_upload(digest, uploaded_file.name, question_bytes,
+                                                         answer_key_name, answer_key_bytes)
 
         if error:
             st.error(error)
         else:
             try:
-                # Initialize parser
-                parser = ExamParser()
+                if encoding:
+                    st.success(f"Successfully read file as {encoding}")
 
-                # If we have a separate answer key, read and process it
-                answer_key_content = None
-                if has_separate_answers and answer_key_file:
-                    answer_key_content, key_error = read_file_content(answer_key_file)
-                    if key_error:
-                        st.error(f"Error reading answer key file: {key_error}")
-                        return
-
-                # Parse content with optional answer key
-                df = parser.process_file(content, answer_key_content if has_separate_answers else None)
+                result = session_result(digest, parsed_questions)
+                df = result['df']
 
                 # Preview the data
                 st.subheader("Preview of Parsed Questions")
@@ -166,30 +117,22 @@ def main():
                     st.subheader("Export Options")
 
                     # Create download buttons
-                    col1, col2 = st.columns(2)
+                    col1, col2, col3 = st.columns(3)
 
                     with col1:
-                        # Excel export
-                        excel_buffer = io.BytesIO()
-                        df.to_excel(excel_buffer, index=False)
-                        excel_data = excel_buffer.getvalue()
-
-                        st.download_button(
-                            label="Download as Excel",
-                            data=excel_data,
-                            file_name="exam_questions.xlsx",
-                            mime="application/vnd.ms-excel"
-                        )
+                        # Excel export, built on first request
+                        export_button(result, 'xlsx', "Excel", lambda: b''.join(iter_xlsx(parsed_questions)),
+                                      file_name="exam_questions.xlsx", mime="application/vnd.ms-excel")
 
                     with col2:
-                        # CSV export
-                        csv = df.to_csv(index=False)
-                        st.download_button(
-                            label="Download as CSV",
-                            data=csv,
-                            file_name="exam_questions.csv",
-                            mime="text/csv"
-                        )
+                        # CSV export, built on first request
+                        export_button(result, 'csv', "CSV", lambda: ''.join(iter_csv(parsed_questions)),
+                                      file_name="exam_questions.csv", mime="text/csv")
+
+                    with col3:
+                        # Parquet export for analytics tools, built on first request
+                        export_button(result, 'parquet', "Parquet", lambda: b''.join(iter_parquet(parsed_questions)),
+                                      file_name="exam_questions.parquet", mime="application/vnd.apache.parquet")
 
                     # Display success message instead of animation if GIF doesn't exist
                     gif_path = "attached_assets/pepe-pepe-wink.gif"
@@ -202,14 +145,9 @@ def main():
                     st.subheader("File Statistics")
                     st.write(f"Total questions parsed: {len(df)}")
 
-                    # Show questions with missing data
-                    missing_answers = df[df[['answer choice A', 'answer choice B', 'answer choice C', 'answer choice D']].isna().any(axis=1)]
-                    if not missing_answers.empty:
-                        st.warning(f"Found {len(missing_answers)} questions with missing answer choices")
-
-                    missing_correct = df[df['Correct Answer'].isna()]
-                    if not missing_correct.empty:
-                        st.warning(f"Found {len(missing_correct)} questions with missing correct answers")
+                    # Show the problems found while parsing
+                    for warning in stats.warnings():
+                        st.warning(warning)
 
             except Exception as e:
                 st.error(f"Error processing file: {str(e)}")
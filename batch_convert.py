@@ -0,0 +1,243 @@
+"""Convert directories of exam files to CSV, XLSX, Parquet or Arrow in parallel.
+
+Each exam (.txt) is paired with the answer key (.txt or .docx) in the same
+directory whose name matches once answer-key markers are removed, e.g.
+``easyup-FinalExamQues40.txt`` with ``easyup-AnswerKeyforFinalExamQues40.docx``
+or ``exam1.txt`` with ``exam1_key.txt``. Outputs are written next to the exam.
+
+When only one exam needs converting, its text is split at question boundaries
+and parsed on all the worker processes instead (see parallel.py). Otherwise
+exams of 64 MiB or more are parsed through a memory map (see mapped.py), so
+their text is never held in memory as a whole.
+
+``--answer-key`` names a master key that is parsed once and applied to every
+exam without a key of its own. Each conversion reports how well its key fits.
+
+``--bank`` also adds every converted exam's questions to a question bank
+(see question_bank.py), skipping exams that are already in it.
+
+Each exam's format (``1.`` or ``1)`` numbering, ``A.``, ``a)`` or ``(a)``
+choices, ``Answer: B`` lines) is detected from its start; ``--dialect`` sets
+one for every exam instead (see dialects.py).
+
+Usage:
+    python batch_convert.py attached_assets/
+    python batch_convert.py "exams/**/*.txt" --format csv xlsx --resume --jobs 4
+    python batch_convert.py exams/ --format parquet
+    python batch_convert.py variants/ --answer-key master_key.docx
+    python batch_convert.py attached_assets/ --bank questions.sqlite3
+    python batch_convert.py exams/ --dialect bracketed
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from answer_key import AnswerKey
+from dialects import DIALECTS
+from exporters import iter_arrow, iter_csv, iter_parquet, iter_xlsx
+from parser import ExamParser
+from parallel import parse_parallel
+from mapped import MAPPED_MIN_BYTES, parse_mapped
+from decoding import decode_bytes
+from question_bank import QuestionBank, content_hash
+
+INPUT_SUFFIXES = ('.txt', '.docx')
+OUTPUT_SUFFIXES = {'csv': '.csv', 'xlsx': '.xlsx', 'parquet': '.parquet', 'arrow': '.arrow'}
+
+# Binary output format -> streaming exporter; CSV is written as text
+BINARY_EXPORTERS = {'xlsx': iter_xlsx, 'parquet': iter_parquet, 'arrow': iter_arrow}
+
+# Words that mark a file as an answer key; stripped from the name when pairing
+ANSWER_KEY_MARKER = re.compile(r'answer[\s_-]*key(?:[\s_-]*for)?|[\s_-](?:key|answers)$', re.IGNORECASE)
+CLEANED_PREFIX = re.compile(r'^cleaned[\s_-]+', re.IGNORECASE)
+
+Pair = Tuple[Path, Optional[Path]]
+
+def is_answer_key(path: Path) -> bool:
+    """Answer keys are named with a key marker; exams must be plain .txt files."""
+    return bool(ANSWER_KEY_MARKER.search(path.stem))
+
+def pairing_stem(path: Path) -> str:
+    """Reduce a file name to the part shared by an exam and its answer key."""
+    stem = CLEANED_PREFIX.sub('', path.stem)
+    stem = ANSWER_KEY_MARKER.sub('', stem)
+    return re.sub(r'[^a-z0-9]+', '', stem.lower())
+
+def collect_inputs(patterns: List[str], recursive: bool = False) -> List[Path]:
+    """Expand directories and glob patterns into a sorted list of input files."""
+    found = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            walker = Path(pattern).rglob('*') if recursive else Path(pattern).iterdir()
+            found.update(path for path in walker if path.is_file())
+        else:
+            found.update(Path(match) for match in glob.glob(pattern, recursive=True))
+    return sorted(path for path in found if path.suffix.lower() in INPUT_SUFFIXES)
+
+def pair_exams(paths: List[Path]) -> Tuple[List[Pair], List[Path]]:
+    """Pair each exam with its answer key; returns (pairs, unmatched answer keys)."""
+    keys: Dict[Tuple[Path, str], Path] = {}
+    exams = []
+    for path in paths:
+        if is_answer_key(path):
+            keys[(path.parent, pairing_stem(path))] = path
+        elif path.suffix.lower() == '.txt':
+            exams.append(path)
+
+    pairs = [(exam, keys.pop((exam.parent, pairing_stem(exam)), None)) for exam in exams]
+    return pairs, sorted(keys.values())
+
+def output_paths(exam: Path, formats: List[str]) -> List[Path]:
+    return [exam.with_suffix(OUTPUT_SUFFIXES[fmt]) for fmt in formats]
+
+def is_up_to_date(exam: Path, key: Optional[Path], formats: List[str]) -> bool:
+    """True when every output exists and is newer than the exam and its key."""
+    newest_input = max(path.stat().st_mtime for path in (exam, key) if path is not None)
+    return all(out.exists() and out.stat().st_mtime >= newest_input for out in output_paths(exam, formats))
+
+def convert_pair(exam: Path, key: Optional[Path], formats: List[str], master_key: Optional[AnswerKey] = None,
+                 parse_pool: Optional[Executor] = None, parse_workers: int = 1,
+                 bank: Optional[QuestionBank] = None, dialect: Optional[str] = None) -> Dict:
+    """Convert one exam and write its outputs; runs in a worker process.
+
+    The exam's own key file is used when it has one, otherwise ``master_key``.
+    With ``parse_pool``, a large exam is parsed on ``parse_workers`` of its processes.
+    With ``bank``, the questions are also added to that question bank.
+    Without ``dialect``, the exam's dialect is detected.
+    """
+    start = time.perf_counter()
+    size = exam.stat().st_size
+    answer_key = AnswerKey.from_file(key) if key else master_key
+    parser = ExamParser(dialect)
+
+    if size >= MAPPED_MIN_BYTES and (parse_pool is None or parse_workers <= 1):
+        parsed_questions = parse_mapped(exam, answer_key, parser=parser)
+    else:
+        content = decode_bytes(exam.read_bytes()).text
+        if parse_pool is not None:
+            parsed_questions = parse_parallel(content, answer_key, parse_workers, parse_pool, parser=parser)
+        else:
+            parsed_questions = parser.parse_content(content, answer_key)
+
+    outputs = output_paths(exam, formats)
+    for fmt, out in zip(formats, outputs):
+        if fmt == 'csv':
+            with open(out, 'w', encoding='utf-8', newline='') as f:
+                f.writelines(iter_csv(parsed_questions))
+        else:
+            with open(out, 'wb') as f:
+                f.writelines(BINARY_EXPORTERS[fmt](parsed_questions))
+
+    added = None
+    if bank is not None:
+        # A master key is identified by its answers, as its file is not passed to the workers
+        key_data = key if key else json.dumps(dict(answer_key), sort_keys=True).encode() if answer_key else None
+        _, added = bank.add(str(exam), content_hash(exam, key_data), parsed_questions)
+
+    return {
+        'questions': len(parsed_questions),
+        'bytes': size + (key.stat().st_size if key else 0),
+        'seconds': time.perf_counter() - start,
+        'outputs': outputs,
+        'coverage': answer_key.coverage(parsed_questions).describe() if answer_key is not None else None,
+        'banked': added,
+        'dialect': parser.dialect.name,
+    }
+
+def describe(exam: Path, key: Optional[Path]) -> str:
+    return f"{exam} + {key.name}" if key else str(exam)
+
+def main(argv=None) -> int:
+    arg_parser = argparse.ArgumentParser(description="Convert exam files to CSV, XLSX, Parquet or Arrow in parallel.")
+    arg_parser.add_argument('inputs', nargs='+', help="directories or glob patterns of exam and answer key files")
+    arg_parser.add_argument('--format', dest='formats', nargs='+', choices=sorted(OUTPUT_SUFFIXES),
+                            default=['csv', 'xlsx'],
+                            help="output formats (default: csv xlsx); parquet and arrow need pyarrow")
+    arg_parser.add_argument('--jobs', '-j', type=int, default=os.cpu_count() or 1,
+                            help="worker processes (default: CPU count)")
+    arg_parser.add_argument('--resume', action='store_true', help="skip exams whose outputs are up to date")
+    arg_parser.add_argument('--recursive', '-r', action='store_true', help="search directories recursively")
+    arg_parser.add_argument('--answer-key', type=Path,
+                            help="answer key (.txt or .docx) for every exam without a key of its own")
+    arg_parser.add_argument('--bank', help="also add the questions to this question bank (SQLite file)")
+    arg_parser.add_argument('--dialect', choices=list(DIALECTS),
+                            help="format of every exam (default: detected for each exam)")
+    args = arg_parser.parse_args(argv)
+
+    master_key = None
+    if args.answer_key:
+        try:
+            master_key = AnswerKey.from_file(args.answer_key)
+        except Exception as e:
+            print(f"[error] {args.answer_key}: {e}")
+            return 1
+    bank = QuestionBank(args.bank) if args.bank else None
+
+    pairs, unmatched_keys = pair_exams(collect_inputs(args.inputs, args.recursive))
+    for key in unmatched_keys:
+        print(f"[unmatched] {key}: no exam found for this answer key")
+    if not pairs:
+        print("No exam files found.")
+        return 1
+
+    todo = []
+    skipped = 0
+    for exam, key in pairs:
+        if args.resume and is_up_to_date(exam, key or args.answer_key, args.formats):
+            print(f"[skipped] {describe(exam, key or args.answer_key)}: outputs are up to date")
+            skipped += 1
+        else:
+            todo.append((exam, key))
+
+    converted = failed = questions = total_bytes = 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        if len(todo) == 1:
+            # A lone exam gets the whole pool for parsing its chunks
+            (exam, key), = todo
+            future = Future()
+            try:
+                future.set_result(convert_pair(exam, key, args.formats, master_key, pool, args.jobs, bank,
+                                                       args.dialect))
+            except Exception as e:
+                future.set_exception(e)
+            futures = {future: (exam, key or args.answer_key)}
+        else:
+            futures = {pool.submit(convert_pair, exam, key, args.formats, master_key, bank=bank, dialect=args.dialect):
+                       (exam, key or args.answer_key) for exam, key in todo}
+        for future in as_completed(futures):
+            exam, key = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"[error] {describe(exam, key)}: {e}")
+                continue
+            converted += 1
+            questions += result['questions']
+            total_bytes += result['bytes']
+            outputs = ', '.join(out.name for out in result['outputs'])
+            coverage = f", {result['coverage']}" if result['coverage'] else ''
+            if result['dialect'] != 'standard':
+                coverage += f", {result['dialect']} dialect"
+            if result['banked'] is not None:
+                coverage += ", added to the bank" if result['banked'] else ", already in the bank"
+            print(f"[ok] {describe(exam, key)} -> {outputs} "
+                  f"({result['questions']} questions{coverage}, {result['seconds']:.2f}s)")
+    elapsed = time.perf_counter() - start
+
+    print(f"\n{converted} converted, {skipped} skipped, {failed} failed in {elapsed:.2f}s")
+    if converted and elapsed > 0:
+        print(f"Throughput: {converted / elapsed:.1f} files/s, {questions / elapsed:.0f} questions/s, "
+              f"{total_bytes / elapsed / 1e6:.2f} MB/s")
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
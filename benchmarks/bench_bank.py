@@ -0,0 +1,84 @@
+"""Insert, search and export timings of QuestionBank at growing bank sizes.
+
+Each bank is filled with synthetic exams of EXAM_SIZE questions, one
+transaction per exam. Searches fetch the first page of matches with their
+total count, ranked by relevance, in bank order, and within one exam. The
+vocabulary of the synthetic questions is small, so common words match most of
+the bank: the worst case for ranking. Exports stream every match as CSV.
+
+Usage: python benchmarks/bench_bank.py [--sizes 10000 50000] [--repeat 5]
+"""
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from exam_corpus import sentence  # noqa: E402
+from exporters import iter_csv  # noqa: E402
+from parser import Question  # noqa: E402
+from question_bank import QuestionBank, content_hash  # noqa: E402
+
+EXAM_SIZE = 1000
+
+# (label, query) searched at every size
+QUERIES = [
+    ('one word', 'annuity'),
+    ('two words', 'deferred income'),
+    ('prefix', 'benef*'),
+    ('no match', 'zeppelin'),
+    ('list all', ''),
+]
+
+
+def synthetic_questions(count, seed):
+    rng = random.Random(seed)
+    return [Question(str(number), sentence(rng, 8, 30) + '?', tuple(sentence(rng, 2, 6) for _ in range(4)),
+                     rng.choice('ABCD'))
+            for number in range(1, count + 1)]
+
+
+def median_ms(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 50000])
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    args = arg_parser.parse_args(argv)
+
+    for count in args.sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            bank = QuestionBank(str(Path(directory) / 'bank.sqlite3'))
+            start = time.perf_counter()
+            for exam in range(0, count, EXAM_SIZE):
+                questions = synthetic_questions(min(EXAM_SIZE, count - exam), seed=exam)
+                bank.add(f'exam{exam // EXAM_SIZE}.txt', content_hash(str(exam).encode()), questions)
+            seconds = time.perf_counter() - start
+            print(f"\n{count} questions: inserted in {seconds:.2f}s ({count / seconds:.0f} questions/s)")
+
+            print(f"{'query':>10} {'matches':>8} {'ranked ms':>10} {'bank order ms':>14} {'in exam ms':>11} "
+                  f"{'export ms':>10}")
+            for label, query in QUERIES:
+                total, _ = bank.search(query)
+                ranked = median_ms(lambda: bank.search(query), args.repeat)
+                unranked = median_ms(lambda: bank.search(query, ranked=False), args.repeat)
+                in_exam = median_ms(lambda: bank.search(query, source_id=1), args.repeat)
+                export = median_ms(lambda: sum(map(len, iter_csv(bank.iter_questions(query)))), 1)
+                print(f"{label:>10} {total:>8} {ranked:>10.1f} {unranked:>14.1f} {in_exam:>11.1f} {export:>10.0f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
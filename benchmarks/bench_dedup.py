@@ -0,0 +1,110 @@
+"""Time, recall and precision of DuplicateFinder on large synthetic banks.
+
+Each bank holds distinct random questions plus planted duplicates: copies
+that differ only in case, punctuation and choice order (exact duplicates
+after normalization), and copies with one word of the stem replaced (near
+duplicates). Recall is the share of planted pairs found in one group;
+precision is the share of reported near pairs whose exact Jaccard
+similarity is within ESTIMATE_MARGIN of the threshold, as MinHash only
+estimates it.
+
+Usage: python benchmarks/bench_dedup.py [--sizes 100000 200000] [--threshold 0.7] [--duplicates 0.05]
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from exam_corpus import WORDS, sentence  # noqa: E402
+from dedup import DuplicateFinder, question_text, shingle_hashes  # noqa: E402
+from parser import Question  # noqa: E402
+
+
+# Allowed gap between the exact Jaccard similarity and the threshold for a reported pair
+ESTIMATE_MARGIN = 0.1
+
+
+def build_bank(count, duplicate_share, seed):
+    """Return (questions, planted exact pairs, planted near pairs) as index pairs."""
+    rng = random.Random(seed)
+    questions = []
+    exact, near = [], []
+    while len(questions) < count:
+        index = len(questions)
+        if index and rng.random() < duplicate_share:
+            original = questions[rng.randrange(index)]
+            if rng.random() < 0.5:
+                choices = list(original.choices)
+                rng.shuffle(choices)
+                questions.append(Question(str(index + 1), original.text.upper() + '!!', tuple(choices)))
+                exact.append((_find(questions, original), index))
+            else:
+                words = original.text.split()
+                words[rng.randrange(len(words))] = rng.choice(WORDS)
+                questions.append(Question(str(index + 1), ' '.join(words), original.choices))
+                near.append((_find(questions, original), index))
+            continue
+        questions.append(Question(str(index + 1), sentence(rng, 30, 50) + '?',
+                                  tuple(sentence(rng, 3, 8) for _ in range(4))))
+    return questions, exact, near
+
+
+def _find(questions, question):
+    # Question numbers are the 1-based positions in the bank
+    return int(question.number) - 1
+
+
+def jaccard(left, right):
+    a, b = set(shingle_hashes(question_text(left))), set(shingle_hashes(question_text(right)))
+    return len(a & b) / len(a | b)
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--sizes', type=int, nargs='+', default=[100000, 200000])
+    arg_parser.add_argument('--threshold', type=float, default=0.7)
+    arg_parser.add_argument('--duplicates', type=float, default=0.05, help='share of planted duplicates')
+    args = arg_parser.parse_args(argv)
+
+    print(f"{'questions':>10} {'add s':>7} {'find s':>7} {'us/question':>12} {'groups':>7} "
+          f"{'exact recall':>13} {'near recall':>12} {'precision':>10}")
+    for count in args.sizes:
+        questions, exact, near = build_bank(count, args.duplicates, seed=count)
+        finder = DuplicateFinder(args.threshold)
+        start = time.perf_counter()
+        finder.add_many(questions)
+        added = time.perf_counter()
+        groups = finder.find()
+        found = time.perf_counter()
+
+        group_of = {}
+        near_pairs = []
+        for number, group in enumerate(groups):
+            indexes = [int(member) - 1 for _, member in group.members]
+            for index in indexes:
+                group_of.setdefault(index, set()).add(number)
+            if group.kind == 'near':
+                near_pairs.extend((indexes[0], other) for other in indexes[1:])
+
+        def recall(pairs):
+            if not pairs:
+                return 1.0
+            return sum(1 for a, b in pairs if group_of.get(a, set()) & group_of.get(b, set())) / len(pairs)
+
+        # Exact duplicates are grouped with their original, which may itself be in a near group
+        exact_found = sum(1 for a, b in exact
+                          if any(group.kind == 'exact' for n in group_of.get(b, ()) for group in [groups[n]]))
+        sample = random.Random(0).sample(near_pairs, min(len(near_pairs), 2000))
+        close = sum(1 for a, b in sample if jaccard(questions[a], questions[b]) >= args.threshold - ESTIMATE_MARGIN)
+        precision = close / len(sample) if sample else 1.0
+        print(f'{count:>10} {added - start:>7.2f} {found - added:>7.2f} {(found - start) / count * 1e6:>12.1f} '
+              f'{len(groups):>7} {exact_found / max(len(exact), 1):>13.3f} {recall(near):>12.3f} {precision:>10.3f}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
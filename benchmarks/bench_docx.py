@@ -0,0 +1,73 @@
+"""Answer-key .docx reading: streaming XML reader vs the python-docx object model.
+
+Builds table- and paragraph-based keys of increasing size, checks that the
+streaming reader finds every entry the python-docx reader finds, and times
+both. The real key in attached_assets/ is included.
+
+Usage: python benchmarks/bench_docx.py [--sizes 100 1000 10000] [--repeat 3]
+"""
+import argparse
+import io
+import re
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from exam_corpus import build_docx  # noqa: E402
+from docx_reader import iter_answer_pairs  # noqa: E402
+
+def python_docx_pairs(file_bytes):
+    """The table walk the apps used before the streaming reader."""
+    from docx import Document
+
+    pairs = []
+    for table in Document(io.BytesIO(file_bytes)).tables:
+        for row in table.rows:
+            row_text = [c.text.strip() for c in row.cells]
+            for i in range(len(row_text) - 1):
+                match = re.match(r'(\d+)\.?\s*$', row_text[i])
+                if match and re.match(r'^[A-Da-d]$', row_text[i + 1].strip()):
+                    pairs.append((match.group(1), row_text[i + 1].strip()))
+    return pairs
+
+
+def best_time(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000])
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    args = arg_parser.parse_args(argv)
+
+    cases = [(path.name, path.read_bytes()) for path in sorted((ROOT / 'attached_assets').glob('*AnswerKey*.docx'))]
+    for size in args.sizes:
+        cases.append((f'table-{size}', build_docx(size, 'table')))
+        cases.append((f'paragraphs-{size}', build_docx(size, 'paragraphs')))
+
+    print(f"{'key':<40} {'entries':>8} {'python-docx':>11} {'streaming s':>12} {'python-docx s':>14} {'speedup':>8}")
+    for name, data in cases:
+        pairs = list(iter_answer_pairs(data))
+        reference = python_docx_pairs(data)
+        if not set(reference) <= set(pairs):
+            print(f'MISSING entries in {name}: {sorted(set(reference) - set(pairs))[:5]}')
+            return 1
+        new = best_time(lambda: list(iter_answer_pairs(data)), args.repeat)
+        old = best_time(lambda: python_docx_pairs(data), args.repeat)
+        # python-docx only reads tables, so its time on paragraph keys is not comparable
+        speedup = f'{old / new:>7.1f}x' if len(reference) == len(pairs) else f"{'n/a':>8}"
+        print(f'{name[:40]:<40} {len(pairs):>8} {len(reference):>11} {new:>12.4f} {old:>14.4f} {speedup}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""Write time, size and read-back time of every export format on synthetic exams.
+
+Each format is written to a temporary file with its streaming exporter, then
+loaded the way an analytics job would: CSV with pandas.read_csv, XLSX with
+pandas.read_excel (openpyxl), Parquet with pyarrow.parquet.read_table and
+Arrow with pyarrow.ipc over a memory map. Every load must return all rows.
+XLSX is skipped above --max-xlsx questions, where reading it takes minutes.
+
+Usage: python benchmarks/bench_export.py [--sizes 10000 100000] [--max-xlsx 20000]
+"""
+import argparse
+import contextlib
+import io
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from exam_corpus import synthetic_exam  # noqa: E402
+from exporters import iter_arrow, iter_csv, iter_parquet, iter_xlsx  # noqa: E402
+from parser import ExamParser  # noqa: E402
+
+
+def read_csv(path):
+    import pandas as pd
+    return len(pd.read_csv(path, keep_default_na=False))
+
+
+def read_xlsx(path):
+    import pandas as pd
+    return len(pd.read_excel(path))
+
+
+def read_parquet(path):
+    import pyarrow.parquet as pq
+    return pq.read_table(path, memory_map=True).num_rows
+
+
+def read_arrow(path):
+    import pyarrow as pa
+    with pa.memory_map(str(path)) as source:
+        return pa.ipc.open_file(source).read_all().num_rows
+
+
+# Format -> (exporter, whether it yields text, reader)
+FORMATS = {
+    'csv': (iter_csv, True, read_csv),
+    'xlsx': (iter_xlsx, False, read_xlsx),
+    'parquet': (iter_parquet, False, read_parquet),
+    'arrow': (iter_arrow, False, read_arrow),
+}
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    arg_parser.add_argument('--max-xlsx', type=int, default=20000, help='largest size at which XLSX is included')
+    args = arg_parser.parse_args(argv)
+
+    # Import the readers' libraries up front so the first read is not charged for them
+    import pandas  # noqa: F401
+    import pyarrow.parquet  # noqa: F401
+
+    print(f"{'questions':>10} {'format':>8} {'MB':>7} {'write s':>8} {'read s':>8}")
+    for count in args.sizes:
+        with contextlib.redirect_stdout(io.StringIO()):
+            questions = ExamParser().parse_content(synthetic_exam(count, seed=count))
+        with tempfile.TemporaryDirectory() as directory:
+            for fmt, (exporter, text, reader) in FORMATS.items():
+                if fmt == 'xlsx' and count > args.max_xlsx:
+                    continue
+                path = Path(directory) / f'questions.{fmt}'
+                start = time.perf_counter()
+                with open(path, 'wb') as f:
+                    chunks = exporter(questions)
+                    f.writelines((chunk.encode('utf-8') for chunk in chunks) if text else chunks)
+                written = time.perf_counter()
+                rows = reader(path)
+                read = time.perf_counter()
+                if rows != len(questions):
+                    print(f'MISMATCH: {fmt} read {rows} of {len(questions)} rows')
+                    return 1
+                print(f"{count:>10} {fmt:>8} {path.stat().st_size / 1e6:>7.2f} {written - start:>8.2f} "
+                      f"{read - written:>8.2f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""Peak memory and time of parse_mapped against reading, decoding and parsing a file.
+
+Each synthetic exam is written to a temporary file and parsed in a fresh
+interpreter per mode, so the peak resident set size (ru_maxrss) belongs to
+that mode alone. The baseline mode is the usual path: read the bytes,
+decode_bytes, then parse_content. Both modes must return the same questions.
+
+Usage: python benchmarks/bench_mapped.py [--sizes 100000 400000] [--encoding utf-8]
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from exam_corpus import synthetic_exam  # noqa: E402
+
+MODES = {
+    'read': ("from decoding import decode_bytes; from parser import ExamParser\n"
+             "with open(path, 'rb') as f:\n"
+             "    questions = ExamParser().parse_content(decode_bytes(f.read()).text)"),
+    'mapped': "from mapped import parse_mapped; questions = parse_mapped(path)",
+}
+
+RUNNER = """
+import hashlib, json, resource, sys, time
+path = sys.argv[1]
+start = time.perf_counter()
+{code}
+seconds = time.perf_counter() - start
+digest = hashlib.sha256(repr([q.astuple() for q in questions]).encode()).hexdigest()
+print(json.dumps({{'seconds': seconds, 'questions': len(questions), 'digest': digest,
+                   'peak_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}}))
+"""
+
+
+def run(mode, path):
+    result = subprocess.run([sys.executable, '-c', RUNNER.format(code=MODES[mode]), str(path)],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--sizes', type=int, nargs='+', default=[100000, 400000])
+    arg_parser.add_argument('--encoding', default='utf-8')
+    args = arg_parser.parse_args(argv)
+
+    print(f"{'questions':>10} {'MB':>7} {'mode':>7} {'seconds':>8} {'peak MB':>8}")
+    for count in args.sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'exam.txt'
+            path.write_bytes(synthetic_exam(count, seed=count).encode(args.encoding))
+            megabytes = path.stat().st_size / 1e6
+            results = {mode: run(mode, path) for mode in MODES}
+        if len({result['digest'] for result in results.values()}) != 1:
+            print(f'MISMATCH at {count} questions')
+            return 1
+        for mode, result in results.items():
+            print(f"{count:>10} {megabytes:>7.1f} {mode:>7} {result['seconds']:>8.2f} {result['peak_kb'] / 1024:>8.0f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
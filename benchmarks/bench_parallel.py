@@ -0,0 +1,91 @@
+"""Speedup of parse_parallel over sequential parsing, per worker count.
+
+Each synthetic exam is parsed sequentially and then on pools of 2, 4, ...
+workers (started before timing, as a long-running process would keep them).
+Every parallel result is checked against the sequential one, and so are the
+EDGE_CASES first. Speedup per core is the speedup divided by the worker count;
+1.0 would be perfect scaling.
+
+Usage: python benchmarks/bench_parallel.py [--sizes 20000 100000 400000] [--workers 2 4 8] [--repeat 3]
+"""
+import argparse
+import contextlib
+import io
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from exam_corpus import EDGE_CASES, answer_key_text, synthetic_exam  # noqa: E402
+from parallel import default_workers, make_executor, parse_parallel  # noqa: E402
+from parser import ExamParser  # noqa: E402
+
+
+def best_time(func, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def check_edge_cases(pool, workers):
+    """Name of the first edge case parse_parallel resolves differently from parse_content, if any."""
+    for description, content, key_text in EDGE_CASES:
+        parser = ExamParser()
+        expected = parser.parse_content(content, key_text)
+        parallel_parser = ExamParser()
+        questions = parse_parallel(content, key_text, workers, pool, min_chars=0, parser=parallel_parser)
+        if questions != expected or parallel_parser.stats.as_dict() != parser.stats.as_dict():
+            return description
+    return None
+
+
+def main(argv=None):
+    cores = default_workers()
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--sizes', type=int, nargs='+', default=[20000, 100000, 400000])
+    arg_parser.add_argument('--workers', type=int, nargs='+',
+                            default=[n for n in (2, 4, 8, 16) if n <= max(cores, 2)])
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    args = arg_parser.parse_args(argv)
+
+    print(f'{cores} cores available')
+    print(f"{'questions':>10} {'MB':>7} {'workers':>8} {'seconds':>9} {'speedup':>8} {'per core':>9}")
+    pools = {workers: make_executor(workers) for workers in args.workers}
+    try:
+        for workers, pool in pools.items():
+            # Start every worker process before timing
+            list(pool.map(abs, range(workers * 4)))
+            mismatch = check_edge_cases(pool, workers)
+            if mismatch:
+                print(f'MISMATCH with {workers} workers: {mismatch}')
+                return 1
+        for count in args.sizes:
+            content = synthetic_exam(count, seed=count)
+            key_text = answer_key_text(count // 2)
+            megabytes = len(content.encode('utf-8')) / 1e6
+            with contextlib.redirect_stdout(io.StringIO()):
+                sequential, expected = best_time(lambda: ExamParser().parse_content(content, key_text), args.repeat)
+            print(f'{count:>10} {megabytes:>7.2f} {1:>8} {sequential:>9.3f} {1:>7.2f}x {1:>9.2f}')
+            for workers, pool in pools.items():
+                seconds, questions = best_time(
+                    lambda: parse_parallel(content, key_text, workers, pool, min_chars=0), args.repeat)
+                if questions != expected:
+                    print(f'MISMATCH at {count} questions with {workers} workers')
+                    return 1
+                speedup = sequential / seconds
+                print(f'{count:>10} {megabytes:>7.2f} {workers:>8} {seconds:>9.3f} {speedup:>7.2f}x '
+                      f'{speedup / workers:>9.2f}')
+    finally:
+        for pool in pools.values():
+            pool.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""Throughput benchmark for ExamParser.parse_content.
+
+Generates synthetic exams of increasing size, checks that the line tokenizer
+returns exactly what the original regex parser returned, and reports
+throughput per size so linear scaling is easy to eyeball.
+
+Usage: python benchmarks/bench_parser.py [--sizes 1000 2000 4000 ...] [--repeat 3]
+"""
+import argparse
+import contextlib
+import io
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from exam_corpus import answer_key_text, as_dicts, fixture_exams, reference_parse, synthetic_exam  # noqa: E402
+from parser import ExamParser  # noqa: E402
+
+
+def best_time(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 2000, 4000, 8000, 16000, 32000])
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    args = arg_parser.parse_args(argv)
+
+    parser = ExamParser()
+    for name, content in fixture_exams():
+        if as_dicts(parser.parse_content(content)) != reference_parse(content, {}):
+            print(f'MISMATCH on fixture {name}')
+            return 1
+
+    print(f"{'questions':>10} {'MB':>7} {'tokenizer s':>12} {'MB/s':>8} {'us/question':>12} "
+          f"{'reference s':>12} {'speedup':>8}")
+    for count in args.sizes:
+        content = synthetic_exam(count, seed=count)
+        key_text = answer_key_text(count)
+        with contextlib.redirect_stdout(io.StringIO()):
+            answer_key = parser.parse_answer_key(key_text)
+            if as_dicts(parser.parse_content(content, key_text)) != reference_parse(content, answer_key):
+                print(f'MISMATCH at {count} questions')
+                return 1
+            new = best_time(lambda: parser.parse_content(content), args.repeat)
+        old = best_time(lambda: reference_parse(content, {}), args.repeat)
+        megabytes = len(content.encode('utf-8')) / 1e6
+        print(f'{count:>10} {megabytes:>7.2f} {new:>12.4f} {megabytes / new:>8.1f} '
+              f'{new / count * 1e6:>12.2f} {old:>12.4f} {old / new:>7.1f}x')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
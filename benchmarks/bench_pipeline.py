@@ -0,0 +1,154 @@
+"""Per-stage timings of the whole conversion pipeline, with regression checks.
+
+Every case is run through the same stages the apps use: decoding the exam,
+reading the answer key (.txt or .docx), parse_answer_key, parse_content,
+create_dataframe and the CSV, XLSX and Parquet exports. Cases are the real exams in
+attached_assets/ and synthetic exams of each requested size, paired with a
+text key and with table- and paragraph-based .docx keys.
+
+Results can be written as JSON and compared with an earlier run; the script
+exits 1 when any stage got slower than the baseline by more than the
+tolerance.
+
+Usage: python benchmarks/bench_pipeline.py [--sizes 100 1000 10000] [--keys txt table paragraphs]
+       [--encoding utf-8] [--repeat 3] [--json results.json] [--baseline previous.json] [--tolerance 0.25]
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from exam_corpus import answer_key_text, build_docx, fixture_pairs, synthetic_exam  # noqa: E402
+from decoding import decode_bytes  # noqa: E402
+from docx_reader import read_answer_key  # noqa: E402
+from exporters import iter_csv, iter_parquet, iter_xlsx  # noqa: E402
+from parser import ExamParser  # noqa: E402
+
+STAGES = ('decode', 'read_answer_key', 'parse_answer_key', 'parse_content',
+          'create_dataframe', 'export_csv', 'export_xlsx', 'export_parquet')
+
+# Stages faster than this are too noisy to call a regression
+MIN_REGRESSION_SECONDS = 0.005
+
+
+def build_cases(sizes, keys, encoding):
+    """Yield ``(name, exam bytes, key bytes or None, key is docx, expected question count or None)``."""
+    for exam, key in fixture_pairs():
+        yield (f'fixture:{exam.name}', exam.read_bytes(), key.read_bytes() if key else None,
+               key is not None and key.suffix.lower() == '.docx', None)
+    # Runs in other encodings get their own case names so baselines never compare across them
+    suffix = '' if encoding == 'utf-8' else f' ({encoding})'
+    for size in sizes:
+        exam = synthetic_exam(size, seed=size).encode(encoding)
+        for key in keys:
+            name = f'synthetic-{size}/{key}{suffix}'
+            if key == 'txt':
+                yield name, exam, answer_key_text(size).encode(encoding), False, size
+            else:
+                yield name, exam, build_docx(size, key), True, size
+
+
+def timed(func, repeat):
+    """Best wall time of ``repeat`` calls, and the result of the last one."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run_case(exam_bytes, key_bytes, key_is_docx, repeat):
+    parser = ExamParser()
+    stages = {}
+
+    stages['decode'], content = timed(lambda: decode_bytes(exam_bytes).text, repeat)
+    key_text = None
+    if key_bytes is not None:
+        read = (lambda: read_answer_key(key_bytes)) if key_is_docx else (lambda: decode_bytes(key_bytes).text)
+        stages['read_answer_key'], key_text = timed(read, repeat)
+    # parse_content reports malformed question blocks on stdout
+    with contextlib.redirect_stdout(io.StringIO()):
+        if key_text is not None:
+            stages['parse_answer_key'], _ = timed(lambda: parser.parse_answer_key(key_text), repeat)
+        stages['parse_content'], questions = timed(lambda: parser.parse_content(content, key_text), repeat)
+    stages['create_dataframe'], _ = timed(lambda: parser.create_dataframe(questions), repeat)
+    stages['export_csv'], _ = timed(lambda: sum(len(chunk) for chunk in iter_csv(questions)), repeat)
+    stages['export_xlsx'], _ = timed(lambda: sum(len(chunk) for chunk in iter_xlsx(questions)), repeat)
+    stages['export_parquet'], _ = timed(lambda: sum(len(chunk) for chunk in iter_parquet(questions)), repeat)
+    return questions, stages
+
+
+def compare(results, baseline, tolerance):
+    """Return a description of every stage that is slower than in the baseline."""
+    regressions = []
+    for name, case in results['cases'].items():
+        previous = baseline.get('cases', {}).get(name)
+        if not previous:
+            continue
+        for stage, seconds in case['stages'].items():
+            before = previous['stages'].get(stage)
+            if before is None:
+                continue
+            if seconds > before * (1 + tolerance) and seconds - before > MIN_REGRESSION_SECONDS:
+                regressions.append(f'{name} {stage}: {before:.4f}s -> {seconds:.4f}s ({seconds / before:.2f}x)')
+    return regressions
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000],
+                            help='synthetic exam sizes in questions (up to 1000000)')
+    arg_parser.add_argument('--keys', nargs='+', choices=['txt', 'table', 'paragraphs'],
+                            default=['txt', 'table', 'paragraphs'], help='answer key layouts for synthetic exams')
+    arg_parser.add_argument('--encoding', default='utf-8', help='encoding of the synthetic exams and text keys')
+    arg_parser.add_argument('--no-fixtures', action='store_true', help='skip the files in attached_assets/')
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    arg_parser.add_argument('--json', help='write results to this file')
+    arg_parser.add_argument('--baseline', help='results file from an earlier run to compare against')
+    arg_parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='allowed slowdown per stage before it counts as a regression')
+    args = arg_parser.parse_args(argv)
+
+    results = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': args.repeat,
+        'cases': {},
+    }
+    print(f"{'case':<48} {'questions':>9} {'MB':>7} " + ' '.join(f'{stage:>16}' for stage in STAGES))
+    for name, exam_bytes, key_bytes, key_is_docx, expected in build_cases(args.sizes, args.keys, args.encoding):
+        if args.no_fixtures and name.startswith('fixture:'):
+            continue
+        questions, stages = run_case(exam_bytes, key_bytes, key_is_docx, args.repeat)
+        if expected is not None and (len(questions) != expected or not all(q.correct_answer for q in questions)):
+            print(f'WRONG OUTPUT for {name}: {len(questions)} questions, expected {expected} all answered')
+            return 1
+        results['cases'][name] = {
+            'questions': len(questions),
+            'bytes': len(exam_bytes),
+            'stages': {stage: round(seconds, 6) for stage, seconds in stages.items()},
+        }
+        cells = ' '.join(f'{stages[stage]:>16.4f}' if stage in stages else f"{'-':>16}" for stage in STAGES)
+        print(f'{name[:48]:<48} {len(questions):>9} {len(exam_bytes) / 1e6:>7.2f} {cells}')
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+    if args.baseline:
+        regressions = compare(results, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""Cold-start import time for each entry point, measured with ``python -X importtime``.
+
+Each entry point is imported in a fresh interpreter several times and the
+best total is reported together with the slowest modules it pulled in. The
+run fails if an entry point exceeds its budget or loads a heavy dependency
+that should only be imported on first use.
+
+Usage: python benchmarks/import_time.py [--repeat 5] [--top 8] [--json results.json]
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Entry point -> (budget in ms, heavy modules it must not import at startup)
+ENTRY_POINTS = {
+    'parser': (30, ('pandas', 'docx', 'chardet', 'pyarrow')),
+    'batch_convert': (100, ('pandas', 'docx', 'chardet', 'pyarrow')),
+    'flask_app': (400, ('pandas', 'docx', 'chardet', 'pyarrow')),
+    'wsgi': (400, ('pandas', 'docx', 'chardet', 'pyarrow')),
+    'app': (2000, ('docx', 'chardet')),
+    'apps.question_converter': (2000, ('docx', 'chardet')),
+}
+
+IMPORTTIME_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)')
+
+
+def measure(module):
+    """Import ``module`` in a fresh interpreter.
+
+    Returns ``(total_us, {name: self_us})`` for the entry point and everything
+    it imported, leaving out what the interpreter loaded at startup.
+    """
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=ROOT, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f'importing {module} failed:\n{result.stderr[-2000:]}')
+    # Lines come in completion order, so an entry point's imports are listed
+    # right before it, after the previous top-level import
+    modules = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        modules[name] = int(self_us)
+        if not indent:
+            if name == module:
+                return int(cumulative_us), modules
+            modules = {}
+    raise RuntimeError(f'no import time reported for {module}')
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--repeat', type=int, default=5, help='fresh interpreters per entry point')
+    arg_parser.add_argument('--top', type=int, default=8, help='slowest modules to list per entry point')
+    arg_parser.add_argument('--json', help='write results to this file')
+    args = arg_parser.parse_args(argv)
+
+    results = {}
+    failures = []
+    for entry_point, (budget_ms, forbidden) in ENTRY_POINTS.items():
+        runs = [measure(entry_point) for _ in range(args.repeat)]
+        total_us, modules = min(runs, key=lambda run: run[0])
+        total_ms = total_us / 1000
+        loaded_heavy = sorted(name for name in forbidden
+                              if any(loaded == name or loaded.startswith(name + '.') for loaded in modules))
+        slowest = sorted(modules.items(), key=lambda item: item[1], reverse=True)[:args.top]
+
+        status = 'ok'
+        if total_ms > budget_ms:
+            status = 'over budget'
+            failures.append(f'{entry_point}: {total_ms:.0f} ms > {budget_ms} ms')
+        if loaded_heavy:
+            status = 'eager imports'
+            failures.append(f'{entry_point}: imports {", ".join(loaded_heavy)} at startup')
+
+        print(f'{entry_point}: {total_ms:.1f} ms (budget {budget_ms} ms, {len(modules)} modules) {status}')
+        for name, self_us in slowest:
+            print(f'    {self_us / 1000:8.1f} ms  {name}')
+
+        results[entry_point] = {
+            'total_ms': round(total_ms, 2),
+            'budget_ms': budget_ms,
+            'modules': len(modules),
+            'heavy_imports': loaded_heavy,
+            'slowest': {name: round(self_us / 1000, 2) for name, self_us in slowest},
+        }
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+    for failure in failures:
+        print(f'FAIL {failure}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,171 @@
+"""Text decoding shared by every ingestion path.
+
+Encodings are chosen from the byte-order mark when there is one, then by
+trying UTF-8, and only then by running chardet on a bounded sample, so the
+cost of detection does not grow with the file size. read_upload is the one
+place an uploaded file becomes text: .docx answer keys are read for their
+entries, everything else is decoded.
+"""
+import codecs
+import time
+from typing import Optional, Tuple
+
+# Bytes handed to chardet; detection time is bounded by this, not the file size
+SAMPLE_SIZE = 16 * 1024
+
+# chardet answers below this confidence are ignored
+MIN_CONFIDENCE = 0.3
+
+# Used when detection gives no usable answer; every byte sequence is valid cp1252 or latin-1
+FALLBACK_ENCODINGS = ('cp1252', 'latin-1')
+
+# UTF-32 BOMs start with the UTF-16 ones, so they are checked first
+BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+class DecodeResult:
+    """Decoded text with the encoding that was used and how it was chosen."""
+    __slots__ = ('text', 'encoding', 'method', 'seconds')
+
+    def __init__(self, text: str, encoding: str, method: str, seconds: float):
+        self.text = text
+        self.encoding = encoding
+        self.method = method  # 'bom', 'utf-8', 'detected', 'fallback' or 'docx'
+        self.seconds = seconds
+
+    def describe(self) -> str:
+        return f"{self.encoding} ({self.method}, {self.seconds * 1000:.1f} ms)"
+
+def bom_encoding(data: bytes) -> Optional[str]:
+    """Return the encoding named by a byte-order mark at the start of data, if any."""
+    for bom, encoding in BOMS:
+        if data.startswith(bom):
+            return encoding
+    return None
+
+def detect_encoding(sample: bytes) -> Optional[str]:
+    """Run chardet on at most SAMPLE_SIZE bytes; None when it has no confident answer."""
+    import chardet
+
+    result = chardet.detect(sample[:SAMPLE_SIZE])
+    if not result['encoding'] or result['confidence'] < MIN_CONFIDENCE:
+        return None
+    try:
+        return codecs.lookup(result['encoding']).name
+    except LookupError:
+        return None
+
+def _decode_legacy(data: bytes, sample: bytes) -> Tuple[str, str, str]:
+    """Decode data that is not UTF-8, detecting the encoding from sample."""
+    detected = detect_encoding(sample)
+    if detected:
+        try:
+            return data.decode(detected), detected, 'detected'
+        except UnicodeDecodeError:
+            pass
+    for encoding in FALLBACK_ENCODINGS:
+        try:
+            return data.decode(encoding), encoding, 'fallback'
+        except UnicodeDecodeError:
+            continue
+    raise AssertionError("latin-1 decodes any bytes")
+
+def decode_bytes(data: bytes) -> DecodeResult:
+    """Decode a whole file's bytes, reporting the encoding chosen and the time taken."""
+    start = time.perf_counter()
+    encoding = bom_encoding(data)
+    if encoding:
+        text, method = data.decode(encoding), 'bom'
+    else:
+        try:
+            text, encoding, method = data.decode('utf-8'), 'utf-8', 'utf-8'
+        except UnicodeDecodeError as e:
+            # Sample from the first byte that is not UTF-8; the ASCII before it says nothing
+            text, encoding, method = _decode_legacy(data, data[e.start:e.start + SAMPLE_SIZE])
+    return DecodeResult(text, encoding, method, time.perf_counter() - start)
+
+def read_upload(filename: str, data: bytes) -> DecodeResult:
+    """Read an uploaded exam or answer key as text, choosing the reader from the file name.
+
+    A .docx file gives the ``number: letter`` lines of its answer key entries;
+    any other file is decoded with decode_bytes. Raises ValueError when a
+    .docx file cannot be read.
+    """
+    if not filename.lower().endswith('.docx'):
+        return decode_bytes(data)
+    from docx_reader import read_answer_key
+
+    start = time.perf_counter()
+    try:
+        text = read_answer_key(data)
+    except Exception as e:
+        raise ValueError(f"not a readable .docx file ({e})") from e
+    return DecodeResult(text, 'utf-8', 'docx', time.perf_counter() - start)
+
+class IncrementalTextDecoder:
+    """Decode a byte stream chunk by chunk with the same rules as decode_bytes.
+
+    The first SAMPLE_SIZE bytes are buffered to look for a BOM and validate
+    UTF-8. If a later chunk turns out not to be UTF-8, decoding switches to an
+    encoding detected from the bytes that failed; the text already returned
+    was valid UTF-8 and is kept.
+    """
+
+    def __init__(self, encoding: Optional[str] = None, errors: str = 'strict'):
+        self.encoding = encoding
+        self.method = 'given' if encoding else None
+        self.errors = errors
+        self.seconds = 0.0
+        self._pending = b''
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors) if encoding else None
+
+    def decode(self, data: bytes, final: bool = False) -> str:
+        start = time.perf_counter()
+        try:
+            if self._decoder is None:
+                self._pending += data
+                if len(self._pending) < SAMPLE_SIZE and not final:
+                    return ''
+                data, self._pending = self._pending, b''
+                self._choose(data)
+            return self._decode(data, final)
+        finally:
+            self.seconds += time.perf_counter() - start
+
+    def _choose(self, sample: bytes) -> None:
+        encoding = bom_encoding(sample)
+        if encoding:
+            self.method = 'bom'
+        else:
+            try:
+                codecs.getincrementaldecoder('utf-8')().decode(sample[:SAMPLE_SIZE])
+                encoding, self.method = 'utf-8', 'utf-8'
+            except UnicodeDecodeError as e:
+                encoding = detect_encoding(sample[e.start:])
+                self.method = 'detected' if encoding else 'fallback'
+                encoding = encoding or FALLBACK_ENCODINGS[0]
+        self._switch(encoding)
+
+    def _switch(self, encoding: str) -> None:
+        self.encoding = encoding
+        self._decoder = codecs.getincrementaldecoder(encoding)(self.errors)
+
+    def _decode(self, data: bytes, final: bool) -> str:
+        try:
+            return self._decoder.decode(data, final)
+        except UnicodeDecodeError as e:
+            # Encodings given by the caller or a BOM are trusted, and latin-1 never fails
+            if self.method in ('given', 'bom') or self.encoding == 'latin-1':
+                raise
+            # e.object holds the decoder's buffered bytes plus data; keep the valid prefix
+            valid = e.object[:e.start].decode(self.encoding)
+            rest = e.object[e.start:]
+            detected = detect_encoding(rest) if self.encoding == 'utf-8' else None
+            self.method = 'detected' if detected else 'fallback'
+            self._switch(detected or ('cp1252' if self.encoding == 'utf-8' else 'latin-1'))
+            return valid + self._decode(rest, final)
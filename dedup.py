@@ -0,0 +1,296 @@
+"""Find exact and near-duplicate questions across many exams.
+
+Each question's stem and answer choices are normalized: Unicode compatibility
+forms, case, punctuation and spacing are ignored, as is the order of the
+choices. Questions whose normalized text is identical are exact duplicates.
+For the rest, word shingles are summarized by a MinHash signature, and
+locality-sensitive hashing over bands of the signature proposes candidate
+pairs. Only those candidates are compared, so the work grows roughly linearly
+with the number of questions rather than with the number of pairs. A
+candidate pair counts as a near duplicate when the estimated Jaccard
+similarity of its shingle sets reaches the threshold.
+
+numpy is imported on first use.
+
+Usage:
+    python dedup.py attached_assets/ [--threshold 0.8] [--json duplicates.json]
+"""
+import argparse
+import hashlib
+import json
+import re
+import sys
+import unicodedata
+import zlib
+from itertools import chain
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set, Tuple
+
+from parser import Question
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Words per shingle
+SHINGLE_SIZE = 3
+
+# MinHash permutations; more give a better similarity estimate at a linear cost
+NUM_PERM = 128
+
+# Questions whose signatures are computed together
+BATCH_SIZE = 512
+
+# Buckets with more members than this only link each member to the first,
+# so boilerplate shared by thousands of questions cannot explode the pair count
+MAX_BUCKET_PAIRS = 32
+
+MASK_64 = (1 << 64) - 1
+
+# Odd 64-bit multipliers mixing the word hashes of a shingle; the high 32 bits are kept
+SHINGLE_MULTIPLIERS = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93,
+                       0xFF51AFD7ED558CCD, 0xC4CEB9FE1A85EC53, 0x94D049BB133111EB, 0xBF58476D1CE4E5B9)
+
+NON_WORD = re.compile(r'[\W_]+')
+
+# A question's place in the corpus: (source, question number)
+Ref = Tuple[str, str]
+
+def normalize(text: str) -> str:
+    """Lower-case words of the text, without punctuation or repeated spaces."""
+    return NON_WORD.sub(' ', unicodedata.normalize('NFKC', text).casefold()).strip()
+
+def question_text(question: Question) -> str:
+    """The normalized stem followed by the normalized non-empty choices in sorted order."""
+    choices = sorted(filter(None, (normalize(choice) for choice in question.choices)))
+    return ' '.join([normalize(question.text), *choices])
+
+def word_hashes(text: str) -> List[int]:
+    """32-bit hashes of the words of a normalized text."""
+    return list(map(zlib.crc32, text.encode('utf-8').split()))
+
+def shingle_hashes(text: str, size: int = SHINGLE_SIZE) -> Set[int]:
+    """32-bit hashes of the text's word shingles, as DuplicateFinder computes them.
+
+    A shingle hash mixes the hashes of its words, so a text is hashed word by
+    word once and its shingles are combined in bulk. Texts shorter than
+    ``size`` words are padded with empty words to form a single shingle.
+    """
+    words = word_hashes(text)
+    words += [0] * (size - len(words))
+    mixed = set()
+    for i in range(len(words) - size + 1):
+        value = 0
+        for j in range(size):
+            value = (value + words[i + j] * SHINGLE_MULTIPLIERS[j]) & MASK_64
+        mixed.add(value >> 32)
+    return mixed
+
+def lsh_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """Bands and rows per band whose S-curve turns steepest closest to ``threshold``."""
+    best = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        distance = abs((1 / bands) ** (1 / rows) - threshold)
+        if best is None or distance < best[0]:
+            best = distance, bands, rows
+    return best[1], best[2]
+
+class DuplicateGroup:
+    """Questions that are the same (``kind`` 'exact') or nearly the same ('near').
+
+    ``similarity`` is 1.0 for exact groups and otherwise the lowest estimated
+    Jaccard similarity among the pairs that joined the group.
+    """
+    __slots__ = ('kind', 'members', 'similarity')
+
+    def __init__(self, kind: str, members: List[Ref], similarity: float):
+        self.kind = kind
+        self.members = members
+        self.similarity = similarity
+
+    def as_dict(self) -> Dict:
+        return {'kind': self.kind, 'similarity': round(self.similarity, 3),
+                'members': [{'source': source, 'number': number} for source, number in self.members]}
+
+    def __repr__(self):
+        return f"DuplicateGroup({self.kind!r}, {len(self.members)} questions, similarity={self.similarity:.2f})"
+
+class DuplicateFinder:
+    """Collect questions from any number of exams, then group their duplicates.
+
+    Only a fixed-size MinHash signature is kept per distinct question, so
+    corpora of hundreds of thousands of questions fit in memory.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = NUM_PERM, shingle_size: int = SHINGLE_SIZE,
+                 seed: int = 1):
+        import numpy as np
+
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold must be between 0 and 1")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = lsh_bands(threshold, num_perm)
+        if not 1 <= shingle_size <= len(SHINGLE_MULTIPLIERS):
+            raise ValueError(f"shingle_size must be between 1 and {len(SHINGLE_MULTIPLIERS)}")
+        # Multiply-add-shift hashing: odd 64-bit multipliers, the high 32 bits of each product are kept
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(0, 1 << 63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self._b = rng.randint(0, 1 << 63, size=num_perm, dtype=np.uint64)
+
+        self.refs: List[Ref] = []
+        self._exact: Dict[bytes, List[int]] = {}  # text hash -> every ref with that text
+        self._distinct: List[int] = []  # ref of each signature row
+        self._pending: List[List[int]] = []  # word hashes awaiting a signature
+        self._signatures: List['np.ndarray'] = []
+
+    def add(self, question: Question, source: str = '') -> None:
+        text = question_text(question)
+        ref = len(self.refs)
+        self.refs.append((source, question.number))
+        digest = hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+        same = self._exact.get(digest)
+        if same is not None:
+            same.append(ref)
+            return
+        self._exact[digest] = [ref]
+        self._distinct.append(ref)
+        self._pending.append(word_hashes(text))
+        if len(self._pending) >= BATCH_SIZE:
+            self._flush()
+
+    def add_many(self, questions: Iterable[Question], source: str = '') -> None:
+        for question in questions:
+            self.add(question, source)
+
+    def _flush(self) -> None:
+        import numpy as np
+
+        if not self._pending:
+            return
+        size = self.shingle_size
+        # Pad short texts to one full shingle, then lay every text's words end to end
+        lengths = np.fromiter((max(len(words), size) for words in self._pending), dtype=np.int64,
+                              count=len(self._pending))
+        words = np.fromiter(chain.from_iterable(words if len(words) >= size else words + [0] * (size - len(words))
+                                                for words in self._pending),
+                            dtype=np.uint64, count=int(lengths.sum()))
+        ends = np.cumsum(lengths)
+        # Shingles start at every word but the last size - 1 of each text; the rest span two texts
+        count = len(words) - size + 1
+        mixed = np.zeros(count, dtype=np.uint64)
+        for j in range(size):
+            mixed += words[j:j + count] * np.uint64(SHINGLE_MULTIPLIERS[j])
+        valid = np.ones(count, dtype=bool)
+        for back in range(1, size):
+            valid[ends[:-1] - back] = False
+        shingles = mixed[valid] >> np.uint64(32)
+        offsets = np.concatenate(([0], np.cumsum(lengths - size + 1)[:-1]))
+        # One row per permutation, so each text's shingles are contiguous for the running minimum
+        permuted = (self._a[:, None] * shingles + self._b[:, None]) >> np.uint64(32)
+        self._signatures.append(np.minimum.reduceat(permuted, offsets, axis=1).T.astype(np.uint32))
+        self._pending = []
+
+    def _candidates(self, signatures: 'np.ndarray') -> 'np.ndarray':
+        """Pairs of signature rows that share at least one band, each pair once."""
+        import numpy as np
+
+        pairs = []
+        for band in range(self.bands):
+            keys = np.ascontiguousarray(signatures[:, band * self.rows:(band + 1) * self.rows])
+            keys = keys.view(np.dtype((np.void, keys.dtype.itemsize * self.rows))).ravel()
+            order = np.argsort(keys, kind='stable')
+            sorted_keys = keys[order]
+            starts = np.flatnonzero(np.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1])))
+            ends = np.append(starts[1:], len(keys))
+            for start, end in zip(starts[ends - starts > 1], ends[ends - starts > 1]):
+                members = order[start:end]
+                if len(members) <= MAX_BUCKET_PAIRS:
+                    first, second = np.triu_indices(len(members), 1)
+                    pairs.append(np.stack((members[first], members[second]), axis=1))
+                else:
+                    pairs.append(np.stack((np.full(len(members) - 1, members[0]), members[1:]), axis=1))
+        if not pairs:
+            return np.empty((0, 2), dtype=np.int64)
+        pairs = np.sort(np.concatenate(pairs), axis=1)
+        return np.unique(pairs, axis=0)
+
+    def find(self) -> List[DuplicateGroup]:
+        """Exact groups first, then near-duplicate groups, each ordered as the questions were added."""
+        import numpy as np
+
+        groups = [DuplicateGroup('exact', [self.refs[ref] for ref in refs], 1.0)
+                  for refs in self._exact.values() if len(refs) > 1]
+
+        self._flush()
+        if not self._signatures:
+            return groups
+        signatures = np.concatenate(self._signatures)
+        pairs = self._candidates(signatures)
+
+        # Union the candidate pairs whose estimated similarity reaches the threshold
+        parent = list(range(len(signatures)))
+        lowest: Dict[int, float] = {}
+
+        def root(row: int) -> int:
+            while parent[row] != row:
+                parent[row] = parent[parent[row]]
+                row = parent[row]
+            return row
+
+        for start in range(0, len(pairs), 1 << 16):
+            chunk = pairs[start:start + (1 << 16)]
+            similarity = (signatures[chunk[:, 0]] == signatures[chunk[:, 1]]).mean(axis=1)
+            for (left, right), value in zip(chunk[similarity >= self.threshold].tolist(),
+                                            similarity[similarity >= self.threshold].tolist()):
+                left, right = root(left), root(right)
+                low = min(value, lowest.get(left, 1.0), lowest.get(right, 1.0))
+                if left != right:
+                    left, right = min(left, right), max(left, right)
+                    parent[right] = left
+                lowest[left] = low
+
+        members: Dict[int, List[int]] = {}
+        for row in range(len(signatures)):
+            members.setdefault(root(row), []).append(row)
+        for top, rows in members.items():
+            if len(rows) > 1:
+                groups.append(DuplicateGroup('near', [self.refs[self._distinct[row]] for row in rows],
+                                             lowest.get(top, 1.0)))
+        return groups
+
+def main(argv=None) -> int:
+    from batch_convert import collect_inputs, pair_exams
+    from answer_key import AnswerKey
+    from decoding import decode_bytes
+    from parser import ExamParser
+
+    arg_parser = argparse.ArgumentParser(description="Find duplicate and near-duplicate questions across exams.")
+    arg_parser.add_argument('inputs', nargs='+', help="directories or glob patterns of exam and answer key files")
+    arg_parser.add_argument('--threshold', type=float, default=0.8,
+                            help="estimated Jaccard similarity at which questions count as near duplicates")
+    arg_parser.add_argument('--recursive', '-r', action='store_true', help="search directories recursively")
+    arg_parser.add_argument('--json', help="write the groups to this file")
+    args = arg_parser.parse_args(argv)
+
+    finder = DuplicateFinder(args.threshold)
+    pairs, _ = pair_exams(collect_inputs(args.inputs, args.recursive))
+    for exam, key in pairs:
+        answer_key: Optional[AnswerKey] = AnswerKey.from_file(key) if key else None
+        finder.add_many(ExamParser().parse_content(decode_bytes(exam.read_bytes()).text, answer_key), str(exam))
+
+    groups = finder.find()
+    for group in groups:
+        members = ', '.join(f"{source}#{number}" for source, number in group.members)
+        print(f"[{group.kind} {group.similarity:.2f}] {members}")
+    print(f"\n{len(finder.refs)} questions, {sum(len(g.members) for g in groups)} in "
+          f"{len(groups)} duplicate groups")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump([group.as_dict() for group in groups], f, ensure_ascii=False, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""Exam file dialects: how question numbers, answer choices and answer lines are written.
+
+Each dialect's patterns are compiled once, when it is registered. A file's
+dialect is detected from a bounded sample at its start: every registered
+dialect tokenizes the sample, and the one that recognizes the most answer
+choices and answer lines wins, the earliest registered on a tie. The chosen
+dialect then parses the whole file, so no dialect but the winner ever sees
+more than the sample.
+
+The ``standard`` dialect is the format the parser has always read: ``1.``
+numbering, ``A.``-``D.`` choices and asterisk-marked answers.
+"""
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+# Characters of a file sampled to detect its dialect
+DETECT_SAMPLE_CHARS = 64 * 1024
+
+# Matches a line such as "Answer: B", "Correct answer - (c)" or "ANS. D"
+ANSWER_LINE = r'\s*(?:correct\s+)?(?:answer|ans)\s*[:.=-]\s*\(?([A-Ja-j])\)?\s*\.?\s*$'
+
+class Dialect:
+    """The line patterns of one exam format, compiled for the tokenizer and the splitters.
+
+    ``number`` and ``choice`` are regex sources for the start of a question
+    line and of a choice line; each has one group, the question number or the
+    choice letter, and ``number`` must be ASCII so memory-mapped files can be
+    searched for it as bytes. ``answer`` matches a whole line naming the
+    correct choice, or is None when the format has no answer lines. With
+    ``sequential``, a choice line only counts when its letter is the next one
+    expected (A, then B, ...), so list items such as "I." in a stem stay text.
+    """
+    __slots__ = ('name', 'description', 'sequential', 'question_start', 'choice_start', 'answer_line',
+                 'question_split', 'question_line', 'question_line_cr', 'question_number')
+
+    def __init__(self, name: str, description: str, number: str, choice: str, answer: Optional[str] = None,
+                 sequential: bool = True):
+        self.name = name
+        self.description = description
+        self.sequential = sequential
+        self.question_start = re.compile(number)
+        self.choice_start = re.compile(choice)
+        self.answer_line = re.compile(answer, re.IGNORECASE) if answer else None
+        # The same number pattern without its group, to split text and to search mapped bytes
+        bare = number.replace('(', '(?:', 1)
+        self.question_split = re.compile(rf'\n(?={bare})')
+        self.question_line = re.compile(rf'\n{bare}'.encode('ascii'))
+        self.question_line_cr = re.compile(rf'[\r\n]{bare}'.encode('ascii'))
+        self.question_number = re.compile(bare.encode('ascii'))
+
+    def score(self, lines: Iterable[str]) -> int:
+        """Answer choices and answer lines this dialect recognizes in the lines."""
+        from parser import ExamParser
+
+        return sum(len(choices) + bool(answer) for _, _, choices, answer in ExamParser(self).tokenize(lines))
+
+    def __repr__(self):
+        return f"Dialect({self.name!r})"
+
+DIALECTS: Dict[str, Dialect] = {}
+
+def register_dialect(dialect: Dialect) -> Dialect:
+    """Add a dialect to detection, after those already registered; returns it."""
+    DIALECTS[dialect.name] = dialect
+    return dialect
+
+def get_dialect(dialect: Union[str, Dialect]) -> Dialect:
+    """The registered dialect of that name; a Dialect is returned as it is."""
+    if isinstance(dialect, Dialect):
+        return dialect
+    try:
+        return DIALECTS[dialect]
+    except KeyError:
+        raise ValueError(f"Unknown dialect: {dialect!r} (known: {', '.join(DIALECTS)})") from None
+
+def sample_lines(text: str, limit: int = DETECT_SAMPLE_CHARS) -> List[str]:
+    """Newline-normalized lines of the first ``limit`` characters of the text."""
+    return text[:limit].replace('\r\n', '\n').replace('\r', '\n').split('\n')
+
+def take_sample(lines: Iterator[str], limit: int = DETECT_SAMPLE_CHARS) -> List[str]:
+    """Consume lines from the iterator until they hold about ``limit`` characters, and return them."""
+    sample = []
+    size = 0
+    for line in lines:
+        sample.append(line)
+        size += len(line) + 1
+        if size >= limit:
+            break
+    return sample
+
+def detect_dialect(text: str) -> Dialect:
+    """The registered dialect that recognizes the most in the first DETECT_SAMPLE_CHARS characters of the text."""
+    lines = sample_lines(text)
+    best, best_score = STANDARD, 0
+    for dialect in DIALECTS.values():
+        score = dialect.score(lines)
+        if score > best_score:
+            best, best_score = dialect, score
+    return best
+
+STANDARD = register_dialect(Dialect(
+    'standard', "1. numbering, A.-D. choices, asterisk-marked answers",
+    number=r'(\d+)\.', choice=r'([A-Da-d])\.', sequential=False))
+register_dialect(Dialect(
+    'extended', "1. numbering, A.-J. choices, Answer: lines",
+    number=r'(\d+)\.', choice=r'([A-Ja-j])\.', answer=ANSWER_LINE))
+register_dialect(Dialect(
+    'parenthesis', "1. or 1) numbering, A)-J) choices, Answer: lines",
+    number=r'(\d+)[.)]', choice=r'([A-Ja-j])\)', answer=ANSWER_LINE))
+register_dialect(Dialect(
+    'bracketed', "1. or 1) numbering, (a)-(j) choices, Answer: lines",
+    number=r'(\d+)[.)]', choice=r'\(([A-Ja-j])\)', answer=ANSWER_LINE))
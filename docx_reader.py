@@ -0,0 +1,128 @@
+"""Streaming answer-key reader for .docx files.
+
+Reads ``word/document.xml`` straight out of the zip with an incremental XML
+parser instead of building the python-docx object model, and emits
+``number: letter`` pairs from both tables and plain paragraphs. Elements are
+discarded as soon as they are processed, so only the current table row (and
+the one above it, for vertically merged cells) is held in memory.
+"""
+import io
+import re
+import zipfile
+from typing import BinaryIO, Iterator, List, Tuple, Union
+from xml.etree.ElementTree import iterparse
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+BODY, TABLE, ROW, CELL, PARAGRAPH = W + 'body', W + 'tbl', W + 'tr', W + 'tc', W + 'p'
+TEXT, TAB, BREAKS = W + 't', W + 'tab', (W + 'br', W + 'cr')
+GRID_SPAN, VERTICAL_MERGE, VAL = W + 'gridSpan', W + 'vMerge', W + 'val'
+
+# A table cell holding just a question number, and one holding just an answer letter (A-J, as in the dialects)
+NUMBER_CELL = re.compile(r'(\d+)\.?\s*$')
+LETTER_CELL = re.compile(r'[A-Ja-j]$')
+# "1. c", "2: B" or "3) a" inside a paragraph, but not "1/1/25". The letter must end the entry: it is
+# followed by the end of a line, a tab, ";" or "," or another entry, so prose such as "1. A company ..."
+# or "see page 4. A summary" in an explanation after the key is not read as an answer
+PARAGRAPH_ENTRY = re.compile(r"(?<![\w/])(\d+)\s*[.:)]\s*([A-Ja-j])"
+                             r"(?=[ \t]*$|[ \t]*[;,\t]|\s+\d+\s*[.:)]\s*[A-Ja-j](?![\w'’]))", re.MULTILINE)
+
+Pair = Tuple[str, str]
+
+def _row_pairs(cells: List[str]) -> Iterator[Pair]:
+    """A number cell followed by a single-letter cell is an answer key entry."""
+    for i, cell_text in enumerate(cells[:-1]):
+        match = NUMBER_CELL.match(cell_text)
+        if match and LETTER_CELL.match(cells[i + 1]):
+            yield match.group(1), cells[i + 1]
+
+class _Table:
+    __slots__ = ('previous_row', 'row')
+
+    def __init__(self):
+        self.previous_row: List[str] = []  # cell text per grid column, for vertical merges
+        self.row: List[str] = []
+
+class _Cell:
+    __slots__ = ('paragraphs', 'span', 'continues')
+
+    def __init__(self):
+        self.paragraphs: List[str] = []
+        self.span = 1
+        self.continues = False
+
+def iter_answer_pairs(source: Union[bytes, BinaryIO]) -> Iterator[Pair]:
+    """Yield ``(question number, answer letter)`` pairs in document order.
+
+    ``source`` is the .docx file as bytes or a binary file object. Horizontally
+    merged cells repeat their text in every grid column they span and
+    vertically merged cells take the text of the cell above, as python-docx
+    does.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+
+    with zipfile.ZipFile(source) as archive, archive.open('word/document.xml') as document:
+        tables: List[_Table] = []
+        cells: List[_Cell] = []
+        runs: List[str] = []
+        body = None
+
+        for event, elem in iterparse(document, events=('start', 'end')):
+            tag = elem.tag
+            if event == 'start':
+                if tag == TABLE:
+                    tables.append(_Table())
+                elif tag == ROW and tables:
+                    tables[-1].row = []
+                elif tag == CELL:
+                    cells.append(_Cell())
+                elif tag == PARAGRAPH:
+                    runs = []
+                elif tag == BODY:
+                    body = elem
+                continue
+
+            if tag == TEXT:
+                runs.append(elem.text or '')
+            elif tag == TAB:
+                runs.append('\t')
+            elif tag in BREAKS:
+                runs.append('\n')
+            elif tag == GRID_SPAN and cells:
+                cells[-1].span = int(elem.get(VAL, '1'))
+            elif tag == VERTICAL_MERGE and cells:
+                cells[-1].continues = elem.get(VAL, 'continue') == 'continue'
+            elif tag == PARAGRAPH:
+                text = ''.join(runs)
+                if cells:
+                    cells[-1].paragraphs.append(text)
+                else:
+                    for match in PARAGRAPH_ENTRY.finditer(text):
+                        yield match.group(1), match.group(2)
+                elem.clear()
+            elif tag == CELL and cells:
+                cell = cells.pop()
+                table = tables[-1]
+                column = len(table.row)
+                if cell.continues:
+                    above = table.previous_row[column:column + cell.span]
+                    table.row.extend(above + [''] * (cell.span - len(above)))
+                else:
+                    table.row.extend(['\n'.join(cell.paragraphs).strip()] * cell.span)
+                elem.clear()
+            elif tag == ROW and tables:
+                table = tables[-1]
+                yield from _row_pairs(table.row)
+                table.previous_row = table.row
+                elem.clear()
+            elif tag == TABLE:
+                tables.pop()
+                elem.clear()
+
+            # Drop finished top-level elements so the tree never grows
+            if body is not None and not tables and not cells and tag in (PARAGRAPH, TABLE):
+                body.clear()
+
+def read_answer_key(source: Union[bytes, BinaryIO]) -> str:
+    """Answer key text with one ``number: letter`` line per entry, for ExamParser."""
+    return '\n'.join(f"{number}: {letter}" for number, letter in iter_answer_pairs(source))
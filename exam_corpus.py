@@ -0,0 +1,194 @@
+"""Exams and answer keys shared by the tests and the benchmarks.
+
+Synthetic exams have multi-line stems, blank lines, lowercase choice letters
+and asterisk-marked answers; answer keys come as ``N: L`` text or as .docx
+files laid out either as a table or as one paragraph per entry. Everything
+is seeded, so the same size always produces the same bytes. Alongside them
+are the real fixtures, a sample exam per dialect, the answer precedence edge
+cases and the regex parser ExamParser used before the tokenizer, which every
+parsing path is checked against.
+"""
+import io
+import random
+import re
+import zipfile
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from batch_convert import collect_inputs, pair_exams
+
+ROOT = Path(__file__).resolve().parent
+ASSETS = ROOT / 'attached_assets'
+
+# A few words outside ASCII so legacy encodings exercise the detection path
+WORDS = ("annuity premium deferred income tax basis contract owner beneficiary "
+         "payment rate value estate trust credit deduction exemption limit "
+         "résumé naïve façade").split()
+LETTERS = 'ABCD'
+
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '</Types>'
+)
+RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/></Relationships>'
+)
+DOCUMENT = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>{}</w:body></w:document>'
+)
+
+
+def sentence(rng, low=4, high=14):
+    return ' '.join(rng.choices(WORDS, k=rng.randint(low, high)))
+
+
+def key_letter(number):
+    """The correct letter for a question in every generated answer key."""
+    return LETTERS[number % 4]
+
+
+def synthetic_exam(count, seed=0):
+    """Build an exam with multi-line stems, blank lines and asterisk-marked answers."""
+    rng = random.Random(seed)
+    lines = ['Final Exam', '']
+    for number in range(1, count + 1):
+        lines.append(f'{number}. {sentence(rng)}?')
+        if rng.random() < 0.3:
+            lines.append(sentence(rng))
+        if rng.random() < 0.2:
+            lines.append('')
+        starred = rng.randrange(4) if rng.random() < 0.5 else -1
+        for index, letter in enumerate(LETTERS):
+            mark = '*' if index == starred else ''
+            lines.append(f'{letter if rng.random() < 0.8 else letter.lower()}. {mark}{sentence(rng, 1, 6)}')
+        if rng.random() < 0.5:
+            lines.append('')
+    return '\n'.join(lines)
+
+
+def answer_key_text(count):
+    """A plain-text answer key with one ``N: L`` line per question."""
+    return '\n'.join(f'{number}: {key_letter(number)}' for number in range(1, count + 1))
+
+
+def paragraph(text):
+    return f'<w:p><w:r><w:t xml:space="preserve">{escape(text)}</w:t></w:r></w:p>'
+
+
+def cell(text):
+    return f'<w:tc>{paragraph(text)}</w:tc>'
+
+
+def build_docx(count, layout='table', columns=4):
+    """A .docx answer key with ``count`` entries, as a table of number/letter cell pairs or as paragraphs."""
+    body = [paragraph('Answer Key')]
+    if layout == 'table':
+        rows = []
+        for start in range(1, count + 1, columns):
+            numbers = range(start, min(start + columns, count + 1))
+            rows.append('<w:tr>' + ''.join(cell(f'{n}.') + cell(key_letter(n)) for n in numbers) + '</w:tr>')
+        body.append('<w:tbl>' + ''.join(rows) + '</w:tbl>')
+    else:
+        body.extend(paragraph(f'{n}. {key_letter(n).lower()}') for n in range(1, count + 1))
+    return docx_bytes(body)
+
+
+def docx_bytes(body):
+    """A minimal .docx file whose document body is the given WordprocessingML elements."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', CONTENT_TYPES)
+        archive.writestr('_rels/.rels', RELS)
+        archive.writestr('word/document.xml', DOCUMENT.format(''.join(body)))
+    return buffer.getvalue()
+
+
+def fixture_pairs():
+    """The real exams in attached_assets/ with their answer keys (or None), paired like batch_convert does."""
+    pairs, _ = pair_exams(collect_inputs([str(ASSETS)]))
+    return pairs
+
+
+def fixture_exams():
+    """The real exams in attached_assets/ as (file name, text); they predate UTF-8, so they are read as latin-1."""
+    return [(path.name, path.read_bytes().decode('latin-1')) for path in sorted(ASSETS.glob('*.txt'))]
+
+
+# One small exam per non-standard dialect, by dialect name
+DIALECT_SAMPLES = {
+    'parenthesis': ("Exam preamble\n1) Which one is a fruit?\na) Carrot\nb) Apple\nc) Potato\nd) Onion\ne) Leek\n"
+                    "Answer: B\n2) Pick the list:\nI) first\nII) second\nA) Both\nB) Neither\n"
+                    "Correct answer - (a)\n"),
+    'bracketed': ("1. What is 2+2?\n(a) 3\n(b) 4*\n(c) 5\n(d) 6\n2) Capital of France?\n(A) Berlin\n(B) Madrid\n"
+                  "(C) Paris\n(D) Rome\n(E) Lisbon\nANS: c\n"),
+    'extended': ("1. Choose the prime.\nA. 4\nB. 6\nC. 7\nD. 8\nE. 9\nF. 10\nAnswer: C\n2. Which are listed?\n"
+                 "A. one\nC. three\nB. two\n"),
+}
+
+# (description, exam, answer key) whose answers must be resolved alike on every parsing path
+EDGE_CASES = [
+    ('answer line naming a missing choice, with a key',
+     '1. Q\nA. a\nB. b\nC. c\nD. d\nAnswer: E\n2. R\nA. a\nB. b\nC. c\nD. d\n', '1: B\n2: C'),
+    ('answer line against the key', '1. Q\nA. a\nB. b\nC. c\nD. d\nE. e\nAnswer: E\n', '1: B'),
+    ('asterisk against an answer line and the key', '1. Q\nA. a\nB. b*\nC. c\nD. d\nE. e\nAnswer: E\n', '1: A'),
+    ('key letter beyond D', '1. Q\n(a) a\n(b) b\n(c) c\n(d) d\n(e) e\n(f) f\n', '1: F'),
+]
+
+# The regex engine ExamParser used before the tokenizer, kept as the reference output
+REFERENCE_QUESTION = r'(\d+)\.\s*(.*?)(?=\s*(?:\n[A-Da-d]\.|\Z))'
+REFERENCE_ANSWER = r'(?:^|\n)\s*([A-Da-d])\.\s*(.*?)(?=\s*(?:\n[A-Da-d]\.|\Z|\n\d+\.|\Z))'
+
+
+def reference_parse(content, answer_key):
+    """Parse as ExamParser did before the tokenizer, into the dicts of Question.as_dict."""
+    content = content.replace('\r\n', '\n').replace('\r', '\n')
+    parsed = []
+    for block in re.split(r'\n(?=\d+\.)', content):
+        if not block.strip():
+            continue
+        match = re.match(REFERENCE_QUESTION, block, re.DOTALL | re.MULTILINE)
+        if not match:
+            continue
+        number = match.group(1)
+        question = match.group(2).strip().strip('"')
+        if question.isdigit():
+            continue
+        answers = {'A': '', 'B': '', 'C': '', 'D': ''}
+        correct = ''
+        section = block[len(match.group(0)):].strip()
+        for choice in re.finditer(REFERENCE_ANSWER, '\n' + section, re.DOTALL | re.MULTILINE):
+            letter, text = choice.groups()
+            letter = letter.upper()
+            text = text.strip().strip('"').strip()
+            if text:
+                answers[letter] = text
+                if '*' in text:
+                    correct = text.replace('*', '').strip()
+                    answers[letter] = correct
+        if not correct and number in answer_key and answer_key[number] in answers:
+            correct = answers[answer_key[number]]
+        if question:
+            parsed.append({
+                'Question': question,
+                'answer choice A': answers['A'],
+                'answer choice B': answers['B'],
+                'answer choice C': answers['C'],
+                'answer choice D': answers['D'],
+                'Correct Answer': correct,
+            })
+    return parsed
+
+
+def as_dicts(questions):
+    """Questions as the dicts reference_parse returns."""
+    return [question.as_dict() for question in questions]
@@ -0,0 +1,239 @@
+"""Streaming CSV, XLSX, Parquet and Arrow exporters that work directly on parsed questions.
+
+All exporters are generators: rows are serialized as they are consumed, so
+memory stays constant and the first bytes are available immediately no
+matter how many questions are exported. The columnar formats hold one row
+group or record batch in memory at a time.
+
+Parquet and Arrow need pyarrow, which is imported on first use.
+"""
+import csv
+import io
+import re
+import zipfile
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Optional, Sequence
+from xml.sax.saxutils import escape
+
+from parser import DEFAULT_CHOICE_COUNT, Question, choice_count, columns
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+# Rows serialized between yields
+ROWS_PER_CHUNK = 256
+
+# Rows per Parquet row group and per Arrow record batch
+ROWS_PER_GROUP = 64 * 1024
+
+# Parquet compresses well with zstd at little cost; Arrow files stay uncompressed so they can be memory-mapped
+PARQUET_COMPRESSION = 'zstd'
+
+# Control characters that are not allowed in XML 1.0
+ILLEGAL_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Sheet1" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+SHEET_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+SHEET_FOOTER = '</sheetData></worksheet>'
+
+def _choice_columns(questions: Iterable[Question], count: Optional[int]) -> int:
+    """Choice columns to export: the widest question of a list, else the default four."""
+    if count is None:
+        return choice_count(questions) if isinstance(questions, Sequence) else DEFAULT_CHOICE_COUNT
+    return count
+
+def iter_csv(questions: Iterable[Question], choices: Optional[int] = None) -> Iterator[str]:
+    """Yield CSV text for the questions, a header row first, a chunk of rows at a time."""
+    choices = _choice_columns(questions, choices)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(columns(choices))
+
+    for count, question in enumerate(questions, 1):
+        writer.writerow(question.row(choices))
+        if count % ROWS_PER_CHUNK == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
+
+class _ChunkSink:
+    """Write-only, non-seekable file object that collects zip or pyarrow output between yields."""
+
+    closed = False
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+def _column_letter(index: int) -> str:
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+def _xlsx_row(row_number: int, values: List[str], letters: List[str]) -> str:
+    cells = []
+    for letter, value in zip(letters, values):
+        if value:
+            text = escape(ILLEGAL_XML_CHARS.sub('', str(value)))
+            cells.append(f'<c r="{letter}{row_number}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+    return f'<row r="{row_number}">{"".join(cells)}</row>'
+
+def iter_xlsx(questions: Iterable[Question], choices: Optional[int] = None) -> Iterator[bytes]:
+    """Yield an XLSX workbook for the questions as it is written.
+
+    The worksheet uses inline strings so no shared-string table has to be
+    built up front, and the zip archive is written with data descriptors so
+    it never needs to seek back; memory use does not depend on row count.
+    """
+    choices = _choice_columns(questions, choices)
+    header = columns(choices)
+    letters = [_column_letter(index) for index in range(len(header))]
+    sink = _ChunkSink()
+
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, xml in XLSX_PARTS.items():
+            archive.writestr(name, xml)
+        yield sink.drain()
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w') as sheet:
+            sheet.write((SHEET_HEADER + _xlsx_row(1, header, letters)).encode('utf-8'))
+            rows = []
+            for row_number, question in enumerate(questions, 2):
+                rows.append(_xlsx_row(row_number, question.row(choices), letters))
+                if len(rows) == ROWS_PER_CHUNK:
+                    sheet.write(''.join(rows).encode('utf-8'))
+                    rows.clear()
+                    yield sink.drain()
+            sheet.write((''.join(rows) + SHEET_FOOTER).encode('utf-8'))
+
+    yield sink.drain()
+
+def arrow_schema(choices: int = DEFAULT_CHOICE_COUNT) -> 'pa.Schema':
+    """Schema of the columnar exports: the question number, then the columns of the CSV export.
+
+    Numbers are kept as the strings they were parsed from, as any number of
+    digits may number a question; empty choices and missing correct answers
+    are null.
+    """
+    import pyarrow as pa
+
+    return pa.schema([pa.field('Number', pa.string())] + [pa.field(name, pa.string()) for name in columns(choices)])
+
+def iter_record_batches(questions: Iterable[Question], choices: int = DEFAULT_CHOICE_COUNT,
+                        rows_per_batch: int = ROWS_PER_GROUP) -> Iterator['pa.RecordBatch']:
+    """Yield the questions as Arrow record batches of ``rows_per_batch`` rows."""
+    schema = arrow_schema(choices)
+    batch: List[Question] = []
+    for question in questions:
+        batch.append(question)
+        if len(batch) == rows_per_batch:
+            yield _record_batch(schema, batch, choices)
+            batch = []
+    if batch:
+        yield _record_batch(schema, batch, choices)
+
+def _record_batch(schema: 'pa.Schema', questions: List[Question], choices: int) -> 'pa.RecordBatch':
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    # Whole columns are converted at once, and empty strings become nulls in Arrow rather than value by value
+    width = max(choices, DEFAULT_CHOICE_COUNT)
+    padded = [question.choices + ('',) * (width - len(question.choices)) for question in questions]
+    texts = [[question.text for question in questions], *map(list, zip(*padded)),
+             [question.correct_answer for question in questions]]
+    null = pa.scalar(None, pa.string())
+    arrays = [pa.array([question.number for question in questions], pa.string())]
+    for values in texts:
+        array = pa.array(values, pa.string())
+        arrays.append(pc.if_else(pc.equal(array, ''), null, array))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+def iter_parquet(questions: Iterable[Question], choices: Optional[int] = None,
+                 compression: str = PARQUET_COMPRESSION, row_group_size: int = ROWS_PER_GROUP) -> Iterator[bytes]:
+    """Yield a Parquet file for the questions, one row group at a time.
+
+    Parquet keeps its metadata in a footer, so the file is written front to
+    back without seeking, like the XLSX export.
+    """
+    import pyarrow.parquet as pq
+
+    choices = _choice_columns(questions, choices)
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, arrow_schema(choices), compression=compression) as writer:
+        for batch in iter_record_batches(questions, choices, row_group_size):
+            writer.write_batch(batch, row_group_size=row_group_size)
+            yield sink.drain()
+    yield sink.drain()
+
+def iter_arrow(questions: Iterable[Question], choices: Optional[int] = None, compression: Optional[str] = None,
+               rows_per_batch: int = ROWS_PER_GROUP) -> Iterator[bytes]:
+    """Yield an Arrow IPC file (Feather v2) for the questions, one record batch at a time.
+
+    Uncompressed, the file can be opened with ``pyarrow.memory_map`` and
+    read without copying; pass ``compression='zstd'`` or ``'lz4'`` for a
+    smaller file that has to be decompressed to be read.
+    """
+    import pyarrow as pa
+
+    choices = _choice_columns(questions, choices)
+    sink = _ChunkSink()
+    options = pa.ipc.IpcWriteOptions(compression=compression)
+    with pa.ipc.new_file(sink, arrow_schema(choices), options=options) as writer:
+        for batch in iter_record_batches(questions, choices, rows_per_batch):
+            writer.write_batch(batch)
+            yield sink.drain()
+    yield sink.drain()
@@ -1,11 +1,22 @@
-from flask import Flask, request, render_template_string, send_file
+from flask import Flask, Response, request, render_template_string, jsonify, redirect, url_for
+from parser import ExamParser, ParseStats, choice_count, columns
+from answer_key import AnswerKey
+from exporters import iter_arrow, iter_csv, iter_parquet, iter_xlsx
+from decoding import read_upload
+from parse_cache import ParseCache, estimate_size
+from incremental import BlockCache, QuestionDiff, diff_questions
+from result_store import ResultStore
+from question_bank import QuestionBank, content_hash
+from metrics import Metrics
+from jobs import JobQueue, QueueFull
+from batch_convert import is_answer_key, pair_exams
+from dialects import DETECT_SAMPLE_CHARS
 import io
-from parser import ExamParser
-import pandas as pd
-import chardet
-from docx import Document
-import re
+import json
 import os
+import tempfile
+import time
+from pathlib import Path
 
 app = Flask(__name__)
 
@@ -19,6 +30,9 @@ HTML_TEMPLATE = """
 <html>
 <head>
     <title>Exam Question Converter</title>
+    {% if job and job.status in ('queued', 'running') %}
+    <meta http-equiv="refresh" content="2">
+    {% endif %}
     <style>
         body {
             font-family: Arial, sans-serif;
@@ -137,6 +151,18 @@ HTML_TEMPLATE = """
                 <input type="file" id="answer_key_file" name="answer_key_file" accept=".txt,.docx">
             </div>
             
+            <div class="file-upload">
+                <label for="background">
+                    <input type="checkbox" id="background" name="background">
+                    Convert in the background (large files always are)
+                </label>
+            </div>
+            
+            {% if result_id %}
+            <input type="hidden" name="previous_result_id" value="{{ result_id }}">
+            <p>Uploading an edited version of this exam reparses only the changed questions and lists what changed.</p>
+            {% endif %}
+            
             <button type="submit">Process Files</button>
         </form>
         
@@ -148,13 +174,48 @@ HTML_TEMPLATE = """
             <div class="success-box">{{ success }}</div>
         {% endif %}
         
-        {% if df_html %}
+        {% if job and job.status in ('queued', 'running') %}
+            <div class="info-box">
+                Conversion {{ job.status }}... this page refreshes until it is done.
+            </div>
+        {% endif %}
+        
+        {% if changes is defined and changes is not none %}
+            <div class="info-box">
+                Compared with the previous upload: {{ changes.describe() }}.
+                {% if changes.added %}<br>Added: {{ changes.added|join(', ') }}{% endif %}
+                {% if changes.removed %}<br>Removed: {{ changes.removed|join(', ') }}{% endif %}
+                {% if changes.changed %}<br>Changed: {{ changes.changed|join(', ') }}{% endif %}
+            </div>
+        {% endif %}
+        
+        {% if result_id %}
             <h2>Preview of Parsed Questions</h2>
-            {{ df_html|safe }}
+            <p>
+                <label for="preview_filter">Show:</label>
+                <select id="preview_filter">
+                    <option value="">All questions</option>
+                    <option value="missing_choices">Missing answer choices</option>
+                    <option value="missing_correct">Missing correct answer</option>
+                </select>
+                <span id="preview_count">Showing {{ preview_rows|length }} of {{ total_questions }}</span>
+            </p>
+            <table id="preview" data-result-id="{{ result_id }}" data-page-size="{{ page_size }}">
+                <thead>
+                    <tr><th>#</th>{% for column in preview_columns %}<th>{{ column }}</th>{% endfor %}</tr>
+                </thead>
+                <tbody>
+                    {% for number, row in preview_rows %}
+                    <tr><th>{{ number }}</th>{% for value in row %}<td>{{ value }}</td>{% endfor %}</tr>
+                    {% endfor %}
+                </tbody>
+            </table>
+            <button type="button" id="preview_more"{% if preview_rows|length >= total_questions %} style="display: none;"{% endif %}>Show more</button>
             
             <h2>Export Options</h2>
-            <a href="/download/excel" class="button">Download as Excel</a>
-            <a href="/download/csv" class="button">Download as CSV</a>
+            <a href="/download/excel?result_id={{ result_id }}" class="button">Download as Excel</a>
+            <a href="/download/csv?result_id={{ result_id }}" class="button">Download as CSV</a>
+            <a href="/download/parquet?result_id={{ result_id }}" class="button">Download as Parquet</a>
             
             <div class="success-box">
                 Processing complete! 🎉
@@ -163,17 +224,11 @@ HTML_TEMPLATE = """
             <h2>File Statistics</h2>
             <p>Total questions parsed: {{ total_questions }}</p>
             
-            {% if missing_answers > 0 %}
+            {% for warning in stats.warnings() %}
                 <div class="warning-box">
-                    Found {{ missing_answers }} questions with missing answer choices
+                    {{ warning }}
                 </div>
-            {% endif %}
-            
-            {% if missing_correct > 0 %}
-                <div class="warning-box">
-                    Found {{ missing_correct }} questions with missing correct answers
-                </div>
-            {% endif %}
+            {% endfor %}
         {% endif %}
         
         <details>
@@ -234,99 +289,154 @@ D. All of the above
         document.getElementById('has_separate_answers').addEventListener('change', function() {
             document.getElementById('answer_key_div').style.display = this.checked ? 'block' : 'none';
         });
+
+        // Fetch further preview pages from the stored result
+        const preview = document.getElementById('preview');
+        if (preview) {
+            const body = preview.querySelector('tbody');
+            const more = document.getElementById('preview_more');
+            const filter = document.getElementById('preview_filter');
+            const count = document.getElementById('preview_count');
+            let offset = body.rows.length;
+
+            function loadPage(reset) {
+                const params = new URLSearchParams({offset: reset ? 0 : offset, limit: preview.dataset.pageSize});
+                if (filter.value) params.set('filter', filter.value);
+                fetch('/results/' + preview.dataset.resultId + '/questions?' + params)
+                    .then(response => response.json())
+                    .then(page => {
+                        if (reset) {
+                            body.innerHTML = '';
+                            offset = 0;
+                        }
+                        page.rows.forEach(row => {
+                            const tr = body.insertRow();
+                            const number = document.createElement('th');
+                            number.textContent = row.number;
+                            tr.appendChild(number);
+                            page.columns.forEach(column => { tr.insertCell().textContent = row[column]; });
+                        });
+                        offset += page.rows.length;
+                        count.textContent = 'Showing ' + offset + ' of ' + page.matched;
+                        more.style.display = offset < page.matched ? '' : 'none';
+                    });
+            }
+            more.addEventListener('click', () => loadPage(false));
+            filter.addEventListener('change', () => loadPage(true));
+        }
     </script>
 </body>
 </html>
 """
 
-# Store the dataframe in memory for downloads
-global_df = None
+# Parsed results shared by all workers, so any worker can serve a download
+result_store = ResultStore(
+    os.environ.get('RESULT_STORE_PATH', os.path.join(tempfile.gettempdir(), 'exam_quiz_results.sqlite3')),
+    ttl_seconds=float(os.environ.get('RESULT_TTL_SECONDS', 3600)),
+    max_bytes=int(os.environ.get('RESULT_STORE_MAX_BYTES', 256 * 1024 * 1024))
+)
 
-def read_docx_content(file_bytes):
-    """Read content from a .docx file."""
-    try:
-        # Create a BytesIO object from the file bytes
-        doc = Document(io.BytesIO(file_bytes))
-
-        # Extract text from paragraphs and tables
-        content = []
-
-        # Process tables
-        for table_idx, table in enumerate(doc.tables):
-            for row_idx, row in enumerate(table.rows):
-                row_text = [cell.text.strip() for cell in row.cells]
-
-                # Skip empty rows
-                if not any(row_text):
-                    continue
-
-                # Process each cell in the row
-                for i in range(len(row_text)):
-                    # Try to find question number and answer pairs
-                    cell_text = row_text[i].strip()
-
-                    # Skip empty cells
-                    if not cell_text:
-                        continue
-
-                    # Check if this cell contains a question number
-                    match = re.match(r'(\d+)\.?\s*$', cell_text)
-                    if match and i + 1 < len(row_text):
-                        question_num = match.group(1)
-                        # Look at the next cell for the answer
-                        answer = row_text[i + 1].strip()
-                        if answer and re.match(r'^[A-Da-d]$', answer):
-                            content.append(f"{question_num}: {answer}")
-
-        # Join all content with newlines
-        full_content = '\n'.join(content)
-
-        # Clean up the content
-        full_content = re.sub(r'\s+', ' ', full_content)  # Replace multiple spaces with single space
-        full_content = re.sub(r'\n\s*\n', '\n', full_content)  # Remove empty lines
-
-        return full_content, None
-    except Exception as e:
-        return None, f"Error reading .docx file: {str(e)}"
-
-def read_file_content(file):
-    """Read file content with appropriate encoding."""
-    try:
-        # Check if file is .docx
-        if file.filename.lower().endswith('.docx'):
-            return read_docx_content(file.read())
-
-        # For .txt files, use existing logic
-        bytes_data = file.read()
-        encodings = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1', 'utf-16']
-        content = None
-        used_encoding = None
-
-        for encoding in encodings:
-            try:
-                content = bytes_data.decode(encoding)
-                used_encoding = encoding
-                break
-            except UnicodeDecodeError:
-                continue
-
-        if content is None:
-            detected = chardet.detect(bytes_data)
-            try:
-                content = bytes_data.decode(detected['encoding'] if detected['encoding'] else 'utf-8')
-                used_encoding = detected['encoding']
-            except:
-                raise UnicodeDecodeError("Could not decode file with any supported encoding")
-
-        return content, None
-    except Exception as e:
-        detailed_error = f"Error reading file: {str(e)}"
-        return None, detailed_error
+# Data that outlives results and restarts; the instance folder next to the app unless DATA_DIR is set
+DATA_DIR = os.environ.get('DATA_DIR', app.instance_path)
+
+# Every converted exam's questions, kept for search and re-export after results expire
+question_bank_path = os.environ.get('QUESTION_BANK_PATH')
+if question_bank_path is None:
+    os.makedirs(DATA_DIR, exist_ok=True)
+    question_bank_path = os.path.join(DATA_DIR, 'question_bank.sqlite3')
+question_bank = QuestionBank(question_bank_path)
+
+# Parse results keyed on upload contents, so resubmitting the same files skips decode and parse
+parse_cache = ParseCache(max_bytes=int(os.environ.get('PARSE_CACHE_MAX_BYTES', 64 * 1024 * 1024)))
+
+# Questions of recently parsed blocks, so re-uploading an edited exam only parses what changed
+block_cache = BlockCache(max_entries=int(os.environ.get('BLOCK_CACHE_MAX_ENTRIES', 100000)))
+
+# Stage timings and counters; every worker writes snapshots here and /metrics sums them
+metrics = Metrics(os.environ.get('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'exam_quiz_metrics')))
+
+def record_job(status, seconds):
+    metrics.observe('exam_stage_seconds', seconds, stage='job')
+    metrics.inc('exam_requests_total', endpoint='job', outcome='ok' if status == 'done' else 'error')
+
+# Background conversions; uploads above the size threshold always run as jobs
+job_queue = JobQueue(
+    result_store,
+    question_bank=question_bank,
+    workers=int(os.environ.get('JOB_WORKERS', 2)),
+    max_pending=int(os.environ.get('JOB_QUEUE_DEPTH', 16)),
+    timeout_seconds=float(os.environ.get('JOB_TIMEOUT_SECONDS', 900)),
+    on_finish=record_job
+)
+JOB_SIZE_THRESHOLD = int(os.environ.get('JOB_SIZE_THRESHOLD', 1024 * 1024))
+
+def conversion_error(error, status=200):
+    """Render the form with an error and count the failed conversion."""
+    metrics.inc('exam_requests_total', endpoint='convert', outcome='error')
+    return render_template_string(HTML_TEMPLATE, error=error), status
+
+# Rows rendered with the page; the rest are fetched from /results/<result_id>/questions
+PREVIEW_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Preview filters: name -> predicate on (question, number of choice columns)
+PREVIEW_FILTERS = {
+    'missing_choices': lambda question, count: not all(question.choices),
+    'missing_correct': lambda question, count: not question.correct_answer,
+}
+
+def store_result(parsed_questions, stats):
+    """Store parsed questions with the statistics gathered while parsing them; returns the result ID."""
+    with metrics.time('store'):
+        result_id = result_store.put(parsed_questions)
+        result_store.put_artifact(result_id, 'stats', json.dumps(stats.as_dict()).encode('utf-8'))
+    return result_id
+
+def stored_stats(result_id, parsed_questions):
+    """The statistics stored with a result."""
+    data = result_store.get_artifact(result_id, 'stats')
+    if data is not None:
+        return ParseStats.from_dict(json.loads(data))
+    # Results stored before statistics were kept; asterisk and key conflicts are unknown
+    parser = ExamParser()
+    for _ in parser.track(parsed_questions, {}):
+        pass
+    return parser.stats
+
+def stored_changes(result_id):
+    """The changes stored with a result uploaded from an earlier result's page, or None."""
+    data = result_store.get_artifact(result_id, 'changes')
+    return QuestionDiff.from_dict(json.loads(data)) if data is not None else None
+
+def render_result(parsed_questions, result_id, stats, changes=None):
+    """Render the first preview page, statistics and download links for a stored result.
+
+    ``stats`` is the ParseStats gathered while parsing, ``changes`` the
+    QuestionDiff against the previous upload, if there was one.
+    """
+    count = choice_count(parsed_questions)
+
+    # Render template with results
+    with metrics.time('render'):
+        return render_template_string(
+            HTML_TEMPLATE,
+            success="Files processed successfully",
+            preview_columns=columns(count),
+            preview_rows=[(q.number, q.row(count)) for q in parsed_questions[:PREVIEW_PAGE_SIZE]],
+            page_size=PREVIEW_PAGE_SIZE,
+            result_id=result_id,
+            total_questions=len(parsed_questions),
+            stats=stats,
+            changes=changes
+        )
+
+def upload_cache_key(question_bytes, answer_key_name, answer_key_bytes):
+    """The ParseCache key of an upload, under which background jobs also record their results."""
+    return ParseCache.make_key(question_bytes, answer_key_bytes,
+                               settings=(answer_key_bytes is not None, answer_key_name.lower().endswith('.docx')))
 
 @app.route('/', methods=['GET', 'POST'])
 def index_or_health():
-    global global_df
-    
     # Just return "OK" for simple health checks with no Accept header
     # This supports DigitalOcean's health checks
     if 'Accept' not in request.headers or request.headers['Accept'] == '*/*':
@@ -336,11 +446,11 @@ def index_or_health():
     if request.method == 'POST':
         # Check if files were uploaded
         if 'question_file' not in request.files:
-            return render_template_string(HTML_TEMPLATE, error="No question file uploaded")
+            return conversion_error("No question file uploaded")
             
         question_file = request.files['question_file']
         if question_file.filename == '':
-            return render_template_string(HTML_TEMPLATE, error="No question file selected")
+            return conversion_error("No question file selected")
             
         # Check if we have a separate answer key
         has_separate_answers = 'has_separate_answers' in request.form
@@ -351,85 +461,404 @@ def index_or_health():
             if answer_key_file.filename == '':
                 answer_key_file = None
                 
-        # Read and parse files
-        content, error = read_file_content(question_file)
-        
-        if error:
-            return render_template_string(HTML_TEMPLATE, error=error)
-            
+        question_bytes = question_file.read()
+        answer_key_bytes = answer_key_file.read() if has_separate_answers and answer_key_file else None
+        answer_key_name = answer_key_file.filename.lower() if answer_key_bytes is not None else ''
+        metrics.inc('exam_bytes_total', len(question_bytes) + len(answer_key_bytes or b''), direction='upload')
+
         try:
             # Initialize parser
             parser = ExamParser()
-            
-            # Process answer key if provided
-            answer_key_content = None
-            if has_separate_answers and answer_key_file:
-                answer_key_content, key_error = read_file_content(answer_key_file)
-                if key_error:
-                    return render_template_string(HTML_TEMPLATE, error=f"Error reading answer key file: {key_error}")
-                    
-            # Parse content with optional answer key
-            df = parser.process_file(content, answer_key_content if has_separate_answers else None)
-            
-            # Store dataframe for downloads
-            global_df = df
-            
-            # Calculate statistics
-            total_questions = len(df)
-            missing_answers = len(df[df[['answer choice A', 'answer choice B', 'answer choice C', 'answer choice D']].isna().any(axis=1)])
-            missing_correct = len(df[df['Correct Answer'].isna()])
-            
-            # Render template with results
-            return render_template_string(
-                HTML_TEMPLATE,
-                success="Files processed successfully",
-                df_html=df.to_html(classes='table table-striped'),
-                total_questions=total_questions,
-                missing_answers=missing_answers,
-                missing_correct=missing_correct
-            )
+
+            # Reuse the parse result when these exact files were processed before
+            cache_key = upload_cache_key(question_bytes, answer_key_name, answer_key_bytes)
+            cached = parse_cache.get(cache_key)
+            metrics.inc('exam_parse_cache_total', result='miss' if cached is None else 'hit')
+            parsed_questions, stats = cached if cached is not None else (None, None)
+
+            # A re-upload from a result page lists what changed since that result
+            previous_result_id = request.form.get('previous_result_id', '')
+            previous_questions = None
+
+            # Large uploads are converted by the job pool so they never hold up this worker
+            upload_size = len(question_bytes) + len(answer_key_bytes or b'')
+            background = 'background' in request.form
+            queue_job = parsed_questions is None and (background or upload_size > JOB_SIZE_THRESHOLD)
+            if queue_job and previous_result_id and not background:
+                # A large re-upload of a stored result is parsed here instead: the block cache, which the pool
+                # processes do not share, then only rebuilds the questions that changed
+                previous_questions = result_store.get(previous_result_id)
+                queue_job = previous_questions is None
+            if queue_job:
+                # Jobs record their results in the shared store, so any worker can serve a repeat upload;
+                # a re-upload is converted again to list its own changes
+                if not previous_result_id:
+                    stored_id = result_store.find(cache_key)
+                    metrics.inc('exam_result_reuse_total', result='miss' if stored_id is None else 'hit')
+                    if stored_id is not None:
+                        return redirect(url_for('show_result', result_id=stored_id), 303)
+                try:
+                    job_id = job_queue.submit(question_file.filename, question_bytes, answer_key_name,
+                                              answer_key_bytes, cache_key, previous_result_id or None)
+                except QueueFull:
+                    return conversion_error("The server is busy converting other files. Please try again shortly.", 503)
+                return redirect(url_for('job_status', job_id=job_id), 303)
+
+            if parsed_questions is None:
+                # Read and parse files
+                try:
+                    with metrics.time('decode'):
+                        decoded = read_upload(question_file.filename, question_bytes)
+                except Exception as e:
+                    return conversion_error(f"Error reading file: {str(e)}")
+                app.logger.info("Decoded %s as %s", question_file.filename, decoded.describe())
+                content = decoded.text
+
+                # Process answer key if provided
+                answer_key_content = None
+                if answer_key_bytes is not None:
+                    try:
+                        with metrics.time('read_answer_key'):
+                            answer_key_content = read_upload(answer_key_name, answer_key_bytes).text
+                    except Exception as e:
+                        return conversion_error(f"Error reading answer key file: {str(e)}")
+
+                # Parse content with optional answer key
+                with metrics.time('parse'):
+                    parsed_questions = parser.parse_content(content, answer_key_content, block_cache)
+                stats = parser.stats
+                metrics.inc('exam_questions_total', len(parsed_questions))
+                if parser.error_count:
+                    metrics.inc('exam_parse_errors_total', parser.error_count)
+                parse_cache.put(cache_key, (parsed_questions, stats), estimate_size(parsed_questions))
+
+            # Store results for downloads, and the questions in the bank
+            result_id = store_result(parsed_questions, stats)
+            with metrics.time('bank'):
+                question_bank.add(question_file.filename, content_hash(question_bytes, answer_key_bytes),
+                                  parsed_questions)
+
+            changes = None
+            if previous_result_id and previous_questions is None:
+                previous_questions = result_store.get(previous_result_id)
+            if previous_questions is not None:
+                changes = diff_questions(previous_questions, parsed_questions)
+                result_store.put_artifact(result_id, 'changes', json.dumps(changes.as_dict()).encode('utf-8'))
+
+            page = render_result(parsed_questions, result_id, stats, changes)
+            metrics.inc('exam_requests_total', endpoint='convert', outcome='ok')
+            return page
             
         except Exception as e:
-            return render_template_string(HTML_TEMPLATE, error=f"Error processing file: {str(e)}")
+            return conversion_error(f"Error processing file: {str(e)}")
             
     # GET request - show the form
     return render_template_string(HTML_TEMPLATE)
 
+# Download format -> (file extension, mimetype, streaming exporter)
+DOWNLOADS = {
+    'excel': ('xlsx', "application/vnd.ms-excel", iter_xlsx),
+    'csv': ('csv', "text/csv", iter_csv),
+    'parquet': ('parquet', "application/vnd.apache.parquet", iter_parquet),
+    'arrow': ('arrow', "application/vnd.apache.arrow.file", iter_arrow),
+}
+
 @app.route('/download/<format>')
 def download(format):
-    global global_df
-    
-    if global_df is None:
+    result_id = request.args.get('result_id', '')
+    if format not in DOWNLOADS:
+        metrics.inc('exam_requests_total', endpoint='download', outcome='error')
+        return "Invalid format specified", 400
+    extension, mimetype, exporter = DOWNLOADS[format]
+    headers = {'Content-Disposition': f'attachment; filename=exam_questions.{extension}'}
+
+    # Background jobs build their exports ahead of time
+    artifact = result_store.get_artifact(result_id, extension) if result_id else None
+    if artifact is not None:
+        metrics.inc('exam_requests_total', endpoint='download', outcome='ok')
+        metrics.inc('exam_bytes_total', len(artifact), direction='download', format=extension)
+        return Response(artifact, mimetype=mimetype, headers=headers)
+
+    with metrics.time('load'):
+        parsed_questions = result_store.get(result_id) if result_id else None
+    if parsed_questions is None:
+        metrics.inc('exam_requests_total', endpoint='download', outcome='error')
         return "No data available for download. Please process files first.", 400
-        
-    if format == 'excel':
-        # Create Excel file
-        output = io.BytesIO()
-        global_df.to_excel(output, index=False)
-        output.seek(0)
-        
-        return send_file(
-            output,
-            as_attachment=True,
-            download_name="exam_questions.xlsx",
-            mimetype="application/vnd.ms-excel"
-        )
-        
-    elif format == 'csv':
-        # Create CSV file
-        output = io.BytesIO()
-        output.write(global_df.to_csv(index=False).encode('utf-8'))
-        output.seek(0)
-        
-        return send_file(
-            output,
-            as_attachment=True,
-            download_name="exam_questions.csv",
-            mimetype="text/csv"
-        )
-        
-    else:
+
+    # Stream the file as it is written
+    metrics.inc('exam_requests_total', endpoint='download', outcome='ok')
+    return Response(
+        metrics.timed_stream(f'export_{extension}', exporter(parsed_questions),
+                             direction='download', format=extension),
+        mimetype=mimetype,
+        headers=headers
+    )
+
+def result_links(result_id):
+    """URLs of a stored result's page and downloads, for JSON responses."""
+    return {'downloads': {name: url_for('download', format=name, result_id=result_id) for name in DOWNLOADS},
+            'result_url': url_for('show_result', result_id=result_id)}
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """Queue a conversion; responds 202 with the job ID straight away."""
+    question_file = request.files.get('question_file')
+    if question_file is None or question_file.filename == '':
+        return jsonify(error="No question file uploaded"), 400
+    answer_key_file = request.files.get('answer_key_file')
+    if answer_key_file is not None and answer_key_file.filename == '':
+        answer_key_file = None
+
+    question_bytes = question_file.read()
+    answer_key_bytes = answer_key_file.read() if answer_key_file else None
+    answer_key_name = answer_key_file.filename if answer_key_file else ''
+    metrics.inc('exam_bytes_total', len(question_bytes) + len(answer_key_bytes or b''), direction='upload')
+
+    # The same files converted before by any worker are answered with the stored result, unless the
+    # upload is compared with an earlier result
+    cache_key = upload_cache_key(question_bytes, answer_key_name, answer_key_bytes)
+    previous_result_id = request.form.get('previous_result_id') or None
+    if previous_result_id is None:
+        stored_id = result_store.find(cache_key)
+        metrics.inc('exam_result_reuse_total', result='miss' if stored_id is None else 'hit')
+        if stored_id is not None:
+            return jsonify(status='done', result_id=stored_id, **result_links(stored_id))
+    try:
+        job_id = job_queue.submit(question_file.filename, question_bytes, answer_key_name, answer_key_bytes,
+                                  cache_key, previous_result_id)
+    except QueueFull as e:
+        return jsonify(error=str(e)), 503, {'Retry-After': '5'}
+    status_url = url_for('job_status', job_id=job_id)
+    return jsonify(job_id=job_id, status='queued', status_url=status_url), 202, {'Location': status_url}
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Job status as JSON, or for browsers a page that refreshes until the result is ready."""
+    job = job_queue.get(job_id)
+    # API clients get JSON; only browsers, which ask for HTML explicitly, get the refreshing page
+    if 'text/html' not in request.headers.get('Accept', ''):
+        if job is None:
+            return jsonify(error="Unknown job"), 404
+        body = {key: job[key] for key in ('status', 'questions', 'error', 'result_id')}
+        body['job_id'] = job_id
+        if job['status'] == 'done':
+            body.update(result_links(job['result_id']))
+        return jsonify(body)
+
+    if job is None:
+        return render_template_string(HTML_TEMPLATE, error="Unknown or expired conversion job"), 404
+    if job['status'] == 'done':
+        return redirect(url_for('show_result', result_id=job['result_id']), 303)
+    if job['status'] == 'failed':
+        return render_template_string(HTML_TEMPLATE, error=f"Error processing file: {job['error']}")
+    return render_template_string(HTML_TEMPLATE, job=job)
+
+@app.route('/results/<result_id>')
+def show_result(result_id):
+    with metrics.time('load'):
+        parsed_questions = result_store.get(result_id)
+    if parsed_questions is None:
+        return render_template_string(HTML_TEMPLATE, error="This result has expired. Please process the files again."), 404
+    return render_result(parsed_questions, result_id, stored_stats(result_id, parsed_questions),
+                         stored_changes(result_id))
+
+@app.route('/results/<result_id>/questions')
+def result_questions(result_id):
+    """A page of a stored result as JSON: ?offset=&limit=, optionally &filter=missing_choices|missing_correct."""
+    try:
+        offset = max(int(request.args.get('offset', 0)), 0)
+        limit = min(max(int(request.args.get('limit', PREVIEW_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify(error="offset and limit must be integers"), 400
+    filter_name = request.args.get('filter', '')
+    if filter_name and filter_name not in PREVIEW_FILTERS:
+        return jsonify(error=f"Unknown filter: {filter_name}"), 400
+
+    with metrics.time('load'):
+        parsed_questions = result_store.get(result_id)
+    if parsed_questions is None:
+        return jsonify(error="Unknown or expired result"), 404
+
+    count = choice_count(parsed_questions)
+    matching = parsed_questions
+    if filter_name:
+        keep = PREVIEW_FILTERS[filter_name]
+        matching = [question for question in parsed_questions if keep(question, count)]
+
+    return jsonify(
+        result_id=result_id,
+        total=len(parsed_questions),
+        matched=len(matching),
+        offset=offset,
+        limit=limit,
+        columns=columns(count),
+        rows=[dict(number=q.number, **q.as_dict(count)) for q in matching[offset:offset + limit]]
+    )
+
+@app.route('/results/<result_id>/changes')
+def result_changes(result_id):
+    """Questions added, removed and changed in a result since ?since=<earlier result ID>, as JSON."""
+    since = request.args.get('since', '')
+    with metrics.time('load'):
+        parsed_questions = result_store.get(result_id)
+        previous_questions = result_store.get(since) if since else None
+    if parsed_questions is None or previous_questions is None:
+        return jsonify(error="Unknown or expired result"), 404
+    return jsonify(result_id=result_id, since=since, **diff_questions(previous_questions, parsed_questions).as_dict())
+
+def looks_like_answer_key(path, data):
+    """Whether an upload is an answer key: named as one, a .docx, or text with more key entries than questions.
+
+    Only the start of a text file is read.
+    """
+    if is_answer_key(path) or path.suffix.lower() == '.docx':
+        return True
+    # Key entries and question numbers are ASCII, so a sample cut inside a character still shows them
+    sample = data[:DETECT_SAMPLE_CHARS].decode('utf-8', 'replace')
+    parser = ExamParser()
+    return len(parser.parse_answer_key(sample)) > len(parser.parse_content(sample))
+
+def pair_uploads(uploads):
+    """Pair uploaded exams with answer keys by file name, as batch_convert pairs files on disk.
+
+    ``uploads`` maps file names (as Paths) to their bytes. Returns (pairs of
+    (exam, key or None), names left unpaired). A single exam uploaded with a
+    single key is paired whatever the names: of two uploads, the one that
+    looks_like_answer_key is the key of the other, if that one is a .txt exam.
+    """
+    if len(uploads) == 2:
+        first, second = sorted(uploads)
+        for exam, key in ((first, second), (second, first)):
+            if exam.suffix.lower() == '.txt' and looks_like_answer_key(key, uploads[key]) \
+                    and not looks_like_answer_key(exam, uploads[exam]):
+                return [(exam, key)], []
+    pairs, unmatched = pair_exams(sorted(uploads))
+    paired = {path for pair in pairs for path in pair}
+    return pairs, [path for path in sorted(uploads) if path not in paired]
+
+def iter_records(uploads, pairs, leftovers):
+    """Yield one record per parsed question, tagged with its source file, as each file is parsed.
+
+    Each exam is added to the question bank once it has been parsed.
+    """
+    for exam, key in pairs:
+        source = {'source': str(exam), 'answer_key': str(key) if key else None}
+        parser = ExamParser()
+        questions = []
+        try:
+            answer_key = AnswerKey.from_bytes(key.name, uploads[key]) if key is not None else None
+            start = time.perf_counter()
+            for question in parser.iter_questions(io.BytesIO(uploads[exam]), answer_key):
+                questions.append(question)
+                yield {'type': 'question', **source, 'number': question.number, 'question': question.text,
+                       'choices': {chr(ord('A') + i): text for i, text in enumerate(question.choices)},
+                       'correct_answer': question.correct_answer}
+            metrics.observe('exam_stage_seconds', time.perf_counter() - start, stage='parse')
+            question_bank.add(str(exam), content_hash(uploads[exam], uploads[key] if key is not None else None),
+                              questions)
+        except Exception as e:
+            yield {'type': 'error', **source, 'error': str(e)}
+            continue
+        finally:
+            metrics.inc('exam_questions_total', len(questions))
+            if parser.error_count:
+                metrics.inc('exam_parse_errors_total', parser.error_count)
+        record = {'type': 'file', **source, 'questions': len(questions), 'parse_errors': parser.error_count,
+                  'dialect': parser.dialect.name, 'stats': parser.stats.as_dict()}
+        if answer_key is not None:
+            record['coverage'] = answer_key.coverage(questions).as_dict()
+        yield record
+    for path in leftovers:
+        error = "No exam matches this answer key" if is_answer_key(path) else "Exams must be .txt files"
+        yield {'type': 'error', 'source': str(path), 'answer_key': None, 'error': error}
+
+def iter_json_array(items):
+    yield '['
+    for i, item in enumerate(items):
+        yield ',\n' + item if i else item
+    yield ']\n'
+
+@app.route('/api/convert', methods=['POST'])
+def api_convert():
+    """Convert any number of exams and answer keys in one multipart request.
+
+    Streams NDJSON (or, with ?format=json, a JSON array): one ``question``
+    record per parsed question tagged with its source file, a ``file``
+    record after each exam and ``error`` records for files that failed.
+    """
+    # Read now: Flask closes uploaded files before a streamed response runs
+    uploads = {Path(upload.filename): upload.read()
+               for _, upload in request.files.items(multi=True) if upload.filename}
+    if not uploads:
+        return jsonify(error="No files uploaded"), 400
+    output = request.args.get('format', 'ndjson')
+    if output not in ('ndjson', 'json'):
+        return jsonify(error=f"Unknown format: {output}"), 400
+    metrics.inc('exam_requests_total', endpoint='api', outcome='ok')
+    metrics.inc('exam_bytes_total', request.content_length or 0, direction='upload')
+
+    pairs, leftovers = pair_uploads(uploads)
+    lines = (json.dumps(record, ensure_ascii=False) for record in iter_records(uploads, pairs, leftovers))
+    if output == 'json':
+        return Response(iter_json_array(lines), mimetype='application/json')
+    return Response((line + '\n' for line in lines), mimetype='application/x-ndjson')
+
+def bank_filter():
+    """The search words and source ID of a bank request; raises ValueError for a non-integer source."""
+    source = request.args.get('source', '')
+    return request.args.get('q', ''), int(source) if source else None
+
+@app.route('/bank/search')
+def bank_search():
+    """Search the question bank: ?q=words&source=<source ID>&offset=&limit=&order=relevance|bank, as JSON."""
+    try:
+        query, source_id = bank_filter()
+        offset = max(int(request.args.get('offset', 0)), 0)
+        limit = min(max(int(request.args.get('limit', PREVIEW_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify(error="source, offset and limit must be integers"), 400
+    order = request.args.get('order', 'relevance')
+    if order not in ('relevance', 'bank'):
+        return jsonify(error=f"Unknown order: {order}"), 400
+
+    with metrics.time('bank_search'):
+        total, rows = question_bank.search(query, source_id, limit, offset, ranked=order == 'relevance')
+    return jsonify(query=query, source=source_id, total=total, offset=offset, limit=limit, rows=rows)
+
+@app.route('/bank/export/<format>')
+def bank_export(format):
+    """Stream every bank question matching ?q=&source= as a download, in bank order."""
+    if format not in DOWNLOADS:
         return "Invalid format specified", 400
+    try:
+        query, source_id = bank_filter()
+    except ValueError:
+        return "source must be an integer", 400
+    extension, mimetype, exporter = DOWNLOADS[format]
+    questions = question_bank.iter_questions(query, source_id)
+    return Response(
+        metrics.timed_stream(f'export_{extension}', exporter(questions, question_bank.choice_count(query, source_id)),
+                             direction='download', format=extension),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=question_bank.{extension}'}
+    )
+
+@app.route('/bank/sources')
+def bank_sources():
+    """Every exam in the question bank, with the bank's totals."""
+    return jsonify(totals=question_bank.stats(), sources=question_bank.sources())
+
+@app.route('/jobs/stats')
+def job_stats():
+    return jsonify(job_queue.stats())
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/cache/stats')
+def cache_stats():
+    return jsonify(**parse_cache.stats(), blocks=block_cache.stats())
 
 # Add a health check route
 @app.route('/health')
@@ -0,0 +1,105 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from parser import Question
+
+def block_digest(text: str, key_letter: str = '', dialect: str = 'standard') -> bytes:
+    """Hash the raw text of one question block together with its answer key letter and dialect name."""
+    return hashlib.blake2b(f"{dialect}\0{key_letter}\0{text}".encode('utf-8', 'surrogatepass'),
+                           digest_size=16).digest()
+
+class BlockCache:
+    """LRU cache of built questions keyed on a hash of their raw block text.
+
+    Passed to ExamParser.parse_content, it lets a re-upload of an edited exam
+    rebuild only the question blocks that changed; every other block reuses
+    the Question built last time. Bounded by entry count and safe to share
+    between threads.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[bytes, Question]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    key = staticmethod(block_digest)
+
+    def get(self, key: bytes) -> Optional[Question]:
+        with self._lock:
+            question = self._entries.get(key)
+            if question is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return question
+
+    def put(self, key: bytes, question: Question) -> None:
+        with self._lock:
+            self._entries[key] = question
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'entries': len(self._entries), 'max_entries': self.max_entries,
+                    'hits': self.hits, 'misses': self.misses}
+
+class QuestionDiff:
+    """Questions added, removed and changed between two versions of an exam.
+
+    Questions are matched by number; when a number repeats, its first
+    occurrence is matched with the first, the second with the second, and so on.
+    """
+    __slots__ = ('added', 'removed', 'changed', 'unchanged')
+
+    def __init__(self, added: List[str], removed: List[str], changed: List[str], unchanged: int):
+        self.added = added
+        self.removed = removed
+        self.changed = changed
+        self.unchanged = unchanged
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    def as_dict(self) -> Dict:
+        return {'added': self.added, 'removed': self.removed, 'changed': self.changed, 'unchanged': self.unchanged}
+
+    @classmethod
+    def from_dict(cls, values: Dict) -> 'QuestionDiff':
+        """Rebuild a diff from ``as_dict()`` output, e.g. after a JSON round trip."""
+        return cls(list(values['added']), list(values['removed']), list(values['changed']), values['unchanged'])
+
+    def describe(self) -> str:
+        if not self:
+            return "no questions changed"
+        return f"{len(self.added)} added, {len(self.removed)} removed, {len(self.changed)} changed"
+
+def _by_number(questions: List[Question]) -> Dict[Tuple[str, int], Question]:
+    seen: Dict[str, int] = {}
+    indexed = {}
+    for question in questions:
+        occurrence = seen[question.number] = seen.get(question.number, 0) + 1
+        indexed[question.number, occurrence] = question
+    return indexed
+
+def diff_questions(old: List[Question], new: List[Question]) -> QuestionDiff:
+    """Compare two parse results of the same exam."""
+    before = _by_number(old)
+    after = _by_number(new)
+    changed = [key[0] for key, question in after.items() if key in before and before[key] != question]
+    return QuestionDiff(
+        added=[key[0] for key in after if key not in before],
+        removed=[key[0] for key in before if key not in after],
+        changed=changed,
+        unchanged=sum(1 for key in after if key in before) - len(changed),
+    )
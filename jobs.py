@@ -0,0 +1,191 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import closing
+from typing import Callable, Dict, Optional
+
+from answer_key import AnswerKey
+from decoding import read_upload
+from exporters import iter_csv, iter_xlsx
+from incremental import diff_questions
+from parallel import make_executor
+from parser import ExamParser
+from question_bank import QuestionBank, content_hash
+from result_store import ResultStore
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    result_id TEXT,
+    questions INTEGER,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, updated);
+"""
+
+PENDING = ('queued', 'running')
+
+class QueueFull(Exception):
+    """Raised when as many jobs as the queue allows are already queued or running."""
+
+def _connect(path: str) -> sqlite3.Connection:
+    return sqlite3.connect(path, timeout=30, isolation_level=None)
+
+def _set_status(path: str, job_id: str, status: str, **fields) -> None:
+    fields.update(status=status, updated=time.time())
+    assignments = ', '.join(f"{name} = ?" for name in fields)
+    with closing(_connect(path)) as conn:
+        conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+def run_job(path: str, result_store: ResultStore, job_id: str, question_name: str, question_bytes: bytes,
+            answer_key_name: str, answer_key_bytes: Optional[bytes],
+            question_bank: Optional[QuestionBank] = None, cache_key: Optional[str] = None,
+            previous_result_id: Optional[str] = None) -> str:
+    """Parse the uploads, store the result, its statistics and its CSV and XLSX exports; runs in a pool process.
+
+    With ``question_bank``, the questions are also added to the bank. With
+    ``cache_key``, the result is recorded under it in the result store. With
+    ``previous_result_id``, the questions added, removed and changed since
+    that result are stored as the 'changes' artifact, if it has not expired.
+    """
+    _set_status(path, job_id, 'running')
+    try:
+        content = read_upload(question_name, question_bytes).text
+        answer_key = AnswerKey.from_bytes(answer_key_name, answer_key_bytes) if answer_key_bytes is not None else None
+        parser = ExamParser()
+        parsed_questions = parser.parse_content(content, answer_key)
+
+        result_id = result_store.put(parsed_questions)
+        result_store.put_artifact(result_id, 'stats', json.dumps(parser.stats.as_dict()).encode('utf-8'))
+        result_store.put_artifact(result_id, 'csv', ''.join(iter_csv(parsed_questions)).encode('utf-8'))
+        result_store.put_artifact(result_id, 'xlsx', b''.join(iter_xlsx(parsed_questions)))
+        previous_questions = result_store.get(previous_result_id) if previous_result_id else None
+        if previous_questions is not None:
+            changes = diff_questions(previous_questions, parsed_questions)
+            result_store.put_artifact(result_id, 'changes', json.dumps(changes.as_dict()).encode('utf-8'))
+        if question_bank is not None:
+            question_bank.add(question_name, content_hash(question_bytes, answer_key_bytes), parsed_questions)
+        if cache_key is not None:
+            result_store.put_key(cache_key, result_id)
+    except Exception as e:
+        _set_status(path, job_id, 'failed', error=str(e))
+        return 'failed'
+    _set_status(path, job_id, 'done', result_id=result_id, questions=len(parsed_questions))
+    return 'done'
+
+class JobQueue:
+    """Conversions run by a bounded process pool, with their status kept in SQLite.
+
+    Job rows live in the result store's database, so a job submitted to one
+    gunicorn worker can be polled through any other. At most ``max_pending``
+    jobs may be queued or running across all workers; further submissions
+    raise QueueFull. Each worker starts its own pool of ``workers`` processes
+    on first use, and a new one if a pool process dies (its running jobs
+    fail). Jobs still pending after ``timeout_seconds`` (for example
+    because their worker was restarted) are reported as failed. Converted
+    questions are added to ``question_bank`` if one is given.
+    """
+
+    def __init__(self, result_store: ResultStore, workers: int = 2, max_pending: int = 16,
+                 timeout_seconds: float = 900, on_finish: Optional[Callable[[str, float], None]] = None,
+                 question_bank: Optional[QuestionBank] = None):
+        self.path = result_store.path
+        self.result_store = result_store
+        self.question_bank = question_bank
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout_seconds = timeout_seconds
+        self.on_finish = on_finish  # called with (status, seconds) when a job ends
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+        with closing(_connect(self.path)) as conn:
+            conn.executescript(SCHEMA)
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            # A pool created before gunicorn forked belongs to the parent
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = make_executor(self.workers)
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def _discard(self, executor: ProcessPoolExecutor) -> None:
+        """Drop a pool broken by a dead process, so the next job starts a new one."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+
+    def submit(self, question_name: str, question_bytes: bytes,
+               answer_key_name: str = '', answer_key_bytes: Optional[bytes] = None,
+               cache_key: Optional[str] = None, previous_result_id: Optional[str] = None) -> str:
+        """Queue a conversion and return its job ID without waiting for it.
+
+        The result is recorded under ``cache_key``, if given, for
+        ResultStore.find, and compared with ``previous_result_id``; see run_job.
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with closing(_connect(self.path)) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM jobs WHERE updated < ?", (now - self.result_store.ttl_seconds,))
+            pending, = conn.execute("SELECT COUNT(*) FROM jobs WHERE status IN (?, ?) AND updated >= ?",
+                                    (*PENDING, now - self.timeout_seconds)).fetchone()
+            if pending >= self.max_pending:
+                conn.execute("ROLLBACK")
+                raise QueueFull(f"The conversion queue is full ({pending} jobs pending)")
+            conn.execute("INSERT INTO jobs (id, status, created, updated) VALUES (?, 'queued', ?, ?)",
+                         (job_id, now, now))
+            conn.execute("COMMIT")
+
+        args = (run_job, self.path, self.result_store, job_id, question_name, question_bytes,
+                answer_key_name, answer_key_bytes, self.question_bank, cache_key, previous_result_id)
+        try:
+            pool = self._pool()
+            try:
+                future = pool.submit(*args)
+            except BrokenProcessPool:
+                # A process died (e.g. out of memory) after the last job was submitted
+                self._discard(pool)
+                pool = self._pool()
+                future = pool.submit(*args)
+        except Exception as e:
+            _set_status(self.path, job_id, 'failed', error=str(e))
+            raise
+        future.add_done_callback(lambda f: self._finished(job_id, now, f, pool))
+        return job_id
+
+    def _finished(self, job_id: str, submitted: float, future: Future, pool: ProcessPoolExecutor) -> None:
+        error = future.exception()
+        if error is not None:
+            # The pool process died before run_job could record the outcome
+            _set_status(self.path, job_id, 'failed', error=str(error) or type(error).__name__)
+            if isinstance(error, BrokenProcessPool):
+                self._discard(pool)
+        if self.on_finish:
+            self.on_finish('failed' if error is not None else future.result(), time.time() - submitted)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Return the job's status record, or None if the ID is unknown or expired."""
+        with closing(_connect(self.path)) as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        if job['status'] in PENDING and job['updated'] < time.time() - self.timeout_seconds:
+            job.update(status='failed', error="The conversion did not finish in time")
+        return job
+
+    def stats(self) -> Dict[str, int]:
+        with closing(_connect(self.path)) as conn:
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return {'workers': self.workers, 'max_pending': self.max_pending, **counts}
@@ -0,0 +1,114 @@
+"""Parse an exam file on disk through a memory map, decoding only its question blocks.
+
+Reading a file the usual way holds its bytes, the decoded text, the
+newline-normalized copy and the list of its lines at the same time. Here the
+file is mapped instead, question starts (ASCII digits and a period at the
+start of a line) are found by a regex scanning the mapped bytes, and each
+question block is copied out, decoded and split into lines on its own. Only
+one block of text is alive at a time besides the parsed questions.
+
+This works for encodings in which line breaks, digits and periods are single
+ASCII bytes: UTF-8 and the legacy single-byte encodings. Files with a UTF-16
+or UTF-32 byte-order mark are parsed through a stream instead.
+"""
+import mmap
+import re
+from pathlib import Path
+from typing import Iterator, List, Optional, Union
+
+from decoding import FALLBACK_ENCODINGS, SAMPLE_SIZE, bom_encoding, detect_encoding
+from dialects import DETECT_SAMPLE_CHARS, STANDARD, Dialect
+from parser import AnswerKeyInput, ExamParser, Question
+
+# Question starts are found in the mapped bytes with a dialect's question_number and
+# question_line patterns. Searching for LF alone is several times faster, so the
+# question_line_cr pattern is only used for files with lone CR line breaks.
+BARE_CR = re.compile(rb'\r(?!\n)')
+
+# Files at least this large are mapped by batch_convert rather than read into memory
+MAPPED_MIN_BYTES = 64 * 1024 * 1024
+
+class BlockDecoder:
+    """Decode blocks of one file with the rules of decode_bytes.
+
+    UTF-8 is tried first; the first block that is not valid UTF-8 switches
+    decoding to an encoding detected from a sample starting at that block.
+    Blocks already decoded as UTF-8 are kept, as IncrementalTextDecoder does.
+    """
+
+    def __init__(self, encoding: str = 'utf-8', method: str = 'utf-8'):
+        self.encoding = encoding
+        self.method = method
+
+    def decode(self, data: mmap.mmap, begin: int, end: int) -> str:
+        block = data[begin:end]
+        try:
+            return block.decode(self.encoding)
+        except UnicodeDecodeError:
+            if self.method in ('given', 'bom') or self.encoding == 'latin-1':
+                raise
+        detected = detect_encoding(data[begin:begin + SAMPLE_SIZE]) if self.encoding == 'utf-8' else None
+        self.method = 'detected' if detected else 'fallback'
+        self.encoding = detected or (FALLBACK_ENCODINGS[0] if self.encoding == 'utf-8' else 'latin-1')
+        return self.decode(data, begin, end)
+
+def iter_block_lines(data: mmap.mmap, decoder: BlockDecoder, start: int = 0,
+                     dialect: Dialect = STANDARD) -> Iterator[str]:
+    """Yield the lines of every question block of the dialect, decoding one block at a time.
+
+    Lines ending in a lone CR are recognized as question starts only if the
+    first SAMPLE_SIZE bytes of the file have one.
+    """
+    cr = BARE_CR.search(data[start:start + SAMPLE_SIZE])
+    pattern = dialect.question_line_cr if cr else dialect.question_line
+    begin = start if dialect.question_number.match(data, start) else None
+    for match in pattern.finditer(data, start):
+        # Each block keeps its final line break, so the next one starts after it
+        if begin is not None:
+            yield from _block_lines(data, decoder, begin, match.start() + 1)
+        begin = match.start() + 1
+    if begin is not None:
+        yield from _block_lines(data, decoder, begin, len(data))
+
+def _block_lines(data: mmap.mmap, decoder: BlockDecoder, begin: int, end: int) -> List[str]:
+    text = decoder.decode(data, begin, end)
+    lines = text.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    if end < len(data):
+        # The line break before the next question separates blocks rather than ending a line of this one
+        lines.pop()
+    return lines
+
+def iter_mapped_questions(path: Union[str, Path], answer_key_content: AnswerKeyInput = None,
+                          encoding: Optional[str] = None, parser: Optional[ExamParser] = None) -> Iterator[Question]:
+    """Stream questions from a file on disk without reading it into memory.
+
+    Yields what ExamParser.iter_questions yields for the same file opened in
+    binary mode, except that only ASCII digits start a question. The dialect
+    is detected from the first DETECT_SAMPLE_CHARS bytes.
+    """
+    parser = parser or ExamParser()
+    with open(path, 'rb') as f:
+        if f.seek(0, 2) == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            start = 0
+            if encoding:
+                decoder = BlockDecoder(encoding, 'given')
+            else:
+                bom = bom_encoding(data[:4])
+                if bom in ('utf-16', 'utf-32'):
+                    f.seek(0)
+                    yield from parser.iter_questions(f, answer_key_content)
+                    return
+                decoder = BlockDecoder('utf-8', 'bom' if bom else 'utf-8')
+                start = 3 if bom else 0
+            answer_key = parser.resolve_answer_key(answer_key_content)
+            # The patterns are ASCII, so a sample cut inside a character still shows the markers
+            dialect = parser.select_dialect(data[start:start + DETECT_SAMPLE_CHARS].decode(decoder.encoding, 'replace'))
+            questions = parser.iter_parsed(iter_block_lines(data, decoder, start, dialect), answer_key)
+            yield from parser.track(questions, answer_key)
+
+def parse_mapped(path: Union[str, Path], answer_key_content: AnswerKeyInput = None,
+                 encoding: Optional[str] = None, parser: Optional[ExamParser] = None) -> List[Question]:
+    """Parse a file on disk through a memory map; see iter_mapped_questions."""
+    return list(iter_mapped_questions(path, answer_key_content, encoding, parser))
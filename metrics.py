@@ -0,0 +1,268 @@
+"""Counters and timing histograms, exported in the Prometheus text format.
+
+Each process records into its own in-memory table and writes a snapshot to
+``<directory>/<pid>-<token>.json`` at most once per ``flush_interval``
+seconds; the random token keeps a new process that reuses an old PID from
+overwriting the old snapshot. The /metrics view sums the snapshots of every
+process, so the numbers cover all gunicorn workers no matter which one
+answers the scrape. Snapshots of processes that have exited are folded into
+``aggregate.json`` and removed, so counters never go backwards and the
+directory does not grow with every worker restart.
+"""
+import atexit
+import fcntl
+import json
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Upper bounds in seconds; the last bucket (+Inf) is implicit
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# name -> (type, help text); only declared metrics can be recorded
+METRICS = {
+    'exam_stage_seconds': ('histogram', 'Time spent in each stage of the upload-to-download path.'),
+    'exam_requests_total': ('counter', 'Conversion requests by outcome.'),
+    'exam_bytes_total': ('counter', 'Bytes received in uploads and sent in downloads.'),
+    'exam_questions_total': ('counter', 'Questions parsed from uploads.'),
+    'exam_parse_errors_total': ('counter', 'Question blocks that failed to parse.'),
+    'exam_parse_cache_total': ('counter', 'Parse cache lookups by result.'),
+    'exam_result_reuse_total': ('counter', 'Stored results looked up before starting a background job, by result.'),
+}
+
+Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+# A process snapshot, named by its PID (and, since PIDs are reused, a random token)
+SNAPSHOT_NAME = re.compile(r'(\d+)(?:-[0-9a-f]+)?\.json$')
+AGGREGATE_NAME = 'aggregate.json'
+LOCK_NAME = '.lock'
+
+def _key(name: str, labels: Dict[str, str]) -> Key:
+    if name not in METRICS:
+        raise KeyError(f"Unknown metric: {name}")
+    return name, tuple(sorted(labels.items()))
+
+class Metrics:
+    """Process-local metrics that are merged across processes through snapshot files."""
+
+    def __init__(self, directory: str, flush_interval: float = 1.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        os.makedirs(directory, exist_ok=True)
+        self._reset()
+        # A forked worker starts empty; the parent's numbers stay in the parent's snapshot
+        os.register_at_fork(after_in_child=self._reset)
+        atexit.register(self.flush)
+
+    def _reset(self) -> None:
+        self._snapshot_path = os.path.join(self.directory, f"{os.getpid()}-{os.urandom(4).hex()}.json")
+        self._lock = threading.Lock()
+        self._counters: Dict[Key, float] = {}
+        self._histograms: Dict[Key, List[float]] = {}  # bucket counts, then sum
+        self._next_flush = 0.0
+        self._dirty = False
+        self._timer = None
+
+    def inc(self, name: str, amount: float = 1, **labels: str) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+            self._dirty = True
+        self._maybe_flush()
+
+    def observe(self, name: str, seconds: float, **labels: str) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            values = self._histograms.get(key)
+            if values is None:
+                values = self._histograms[key] = [0] * (len(BUCKETS) + 2)
+            values[bisect_left(BUCKETS, seconds)] += 1
+            values[-1] += seconds
+            self._dirty = True
+        self._maybe_flush()
+
+    @contextmanager
+    def time(self, stage: str) -> Iterator[None]:
+        """Record the duration of the block under ``exam_stage_seconds{stage=...}``."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('exam_stage_seconds', time.perf_counter() - start, stage=stage)
+
+    def timed_stream(self, stage: str, chunks: Iterator, **byte_labels: str) -> Iterator:
+        """Pass a streamed response through, timing it and counting the bytes sent."""
+        start = time.perf_counter()
+        sent = 0
+        try:
+            for chunk in chunks:
+                sent += len(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+                yield chunk
+        finally:
+            self.observe('exam_stage_seconds', time.perf_counter() - start, stage=stage)
+            self.inc('exam_bytes_total', sent, **byte_labels)
+
+    def _maybe_flush(self) -> None:
+        delay = self._next_flush - time.monotonic()
+        if delay <= 0:
+            self.flush()
+        elif self._timer is None:
+            # Make sure the last records of a burst are written even if the worker goes idle
+            with self._lock:
+                if self._timer is None:
+                    self._timer = threading.Timer(delay, self._timed_flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+
+    def _timed_flush(self) -> None:
+        self._timer = None
+        self.flush()
+
+    def flush(self) -> None:
+        """Write this process's snapshot if anything changed since the last write."""
+        with self._lock:
+            if not self._dirty:
+                return
+            snapshot = {
+                'counters': [[name, dict(labels), value] for (name, labels), value in self._counters.items()],
+                'histograms': [[name, dict(labels), values] for (name, labels), values in self._histograms.items()],
+            }
+            self._dirty = False
+            self._next_flush = time.monotonic() + self.flush_interval
+        _write_json(self._snapshot_path, snapshot)
+
+    def _fold_exited(self) -> None:
+        """Add the snapshots of exited processes to the aggregate and remove them.
+
+        The aggregate lists the snapshots folded into it, so one whose removal
+        was interrupted is removed next time rather than added twice.
+        """
+        exited = [filename for filename in os.listdir(self.directory)
+                  if (match := SNAPSHOT_NAME.match(filename)) and not _is_running(int(match.group(1)))
+                  and os.path.join(self.directory, filename) != self._snapshot_path]
+        if not exited:
+            return
+        # Another process may be folding the same snapshots, or reading them
+        with _locked(self.directory, fcntl.LOCK_EX):
+            aggregate_path = os.path.join(self.directory, AGGREGATE_NAME)
+            aggregate = _read_json(aggregate_path) or {'counters': [], 'histograms': [], 'folded': []}
+            folded = set(aggregate['folded'])
+            counters, histograms = _merge([aggregate])
+            added = []
+            for filename in exited:
+                snapshot = None if filename in folded else _read_json(os.path.join(self.directory, filename))
+                if snapshot is not None:
+                    counters, histograms = _merge([snapshot], counters, histograms)
+                    added.append(filename)
+            if added:
+                _write_json(aggregate_path, {
+                    'counters': [[name, dict(labels), value] for (name, labels), value in counters.items()],
+                    'histograms': [[name, dict(labels), values] for (name, labels), values in histograms.items()],
+                    # Names still on disk, the only ones that could be seen again
+                    'folded': sorted(name for name in folded | set(added)
+                                     if os.path.exists(os.path.join(self.directory, name))),
+                })
+            for filename in exited:
+                try:
+                    os.remove(os.path.join(self.directory, filename))
+                except FileNotFoundError:
+                    pass
+
+    def collect(self) -> Tuple[Dict[Key, float], Dict[Key, List[float]]]:
+        """Sum the snapshots of every process, including this one and those folded into the aggregate."""
+        self.flush()
+        self._fold_exited()
+        snapshots = []
+        # Not while a snapshot is in the aggregate and also still on disk
+        with _locked(self.directory, fcntl.LOCK_SH):
+            for filename in os.listdir(self.directory):
+                if filename == AGGREGATE_NAME or SNAPSHOT_NAME.match(filename):
+                    snapshot = _read_json(os.path.join(self.directory, filename))
+                    if snapshot is not None:
+                        snapshots.append(snapshot)
+        return _merge(snapshots)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        counters, histograms = self.collect()
+        lines = []
+        for name, (kind, help_text) in METRICS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == 'counter':
+                for (metric, labels), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_labels(labels)} {_number(value)}")
+                continue
+            for (metric, labels), values in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(BUCKETS + (float('inf'),), values):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {_number(cumulative)}")
+                lines.append(f"{name}_sum{_labels(labels)} {values[-1]:.6f}")
+                lines.append(f"{name}_count{_labels(labels)} {_number(cumulative)}")
+        return '\n'.join(lines) + '\n'
+
+@contextmanager
+def _locked(directory: str, operation: int) -> Iterator[None]:
+    """Hold a shared (LOCK_SH) or exclusive (LOCK_EX) lock on the snapshot directory."""
+    with open(os.path.join(directory, LOCK_NAME), 'a') as lock:
+        fcntl.flock(lock, operation)
+        yield
+
+def _is_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def _read_json(path: str) -> Optional[Dict]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_json(path: str, data: Dict) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+def _merge(snapshots: List[Dict], counters: Optional[Dict[Key, float]] = None,
+           histograms: Optional[Dict[Key, List[float]]] = None) -> Tuple[Dict[Key, float], Dict[Key, List[float]]]:
+    """Sum snapshots, into ``counters`` and ``histograms`` if given."""
+    counters = {} if counters is None else counters
+    histograms = {} if histograms is None else histograms
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(sorted(labels.items())))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, values in snapshot['histograms']:
+            key = (name, tuple(sorted(labels.items())))
+            merged = histograms.setdefault(key, [0] * len(values))
+            for i, value in enumerate(values):
+                merged[i] += value
+    return counters, histograms
+
+def _labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ''
+    escaped = (f'{k}="{_escape(str(v))}"' for k, v in labels)
+    return '{' + ','.join(escaped) + '}'
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
@@ -0,0 +1,82 @@
+"""Parse one very large exam on several cores.
+
+The text is cut into chunks at lines starting with ``N.``, which is where the
+tokenizer starts a new question anyway, so every chunk tokenizes exactly as
+it would inside the whole file. Each chunk is parsed in a process pool with
+the same dialect and answer key, by the same build_question, so the merged
+result matches a sequential parse.
+"""
+import multiprocessing
+import os
+import re
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+from typing import Dict, List, Optional, Tuple
+
+from dialects import Dialect
+from parser import QUESTION_SPLIT, AnswerKeyInput, ExamParser, Question
+
+# Below this many characters, starting a pool costs more than it saves
+PARALLEL_MIN_CHARS = 4 * 1024 * 1024
+
+# Chunks per worker, so one slow chunk does not leave the other cores idle
+CHUNKS_PER_WORKER = 4
+
+def split_content(content: str, parts: int, question_split: re.Pattern = QUESTION_SPLIT) -> List[str]:
+    """Cut newline-normalized text into about ``parts`` chunks at question boundaries (a dialect's question_split)."""
+    size = len(content)
+    chunks = []
+    start = 0
+    for part in range(1, parts):
+        match = question_split.search(content, max(start, size * part // parts))
+        if match is None:
+            break
+        chunks.append(content[start:match.start()])
+        start = match.end()
+    chunks.append(content[start:])
+    return chunks
+
+def _parse_chunk(dialect: Dialect, answer_key: Dict[str, str], text: str) -> Tuple[List[Tuple], int]:
+    parser = ExamParser(dialect)
+    # Plain tuples pickle several times faster than Question objects
+    return [question.astuple() for question in parser.iter_parsed(text.split('\n'), answer_key)], parser.error_count
+
+def default_workers() -> int:
+    return len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+
+def make_executor(workers: int) -> ProcessPoolExecutor:
+    # Pool processes start clean rather than forking a threaded caller
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+
+def parse_parallel(content: str, answer_key_content: AnswerKeyInput = None, workers: Optional[int] = None,
+                   executor: Optional[Executor] = None, min_chars: int = PARALLEL_MIN_CHARS,
+                   parser: Optional[ExamParser] = None) -> List[Question]:
+    """Parse exam content on ``workers`` processes; the result equals ExamParser.parse_content.
+
+    Content shorter than ``min_chars``, or a single worker, takes the
+    sequential path. Pass an executor to reuse a pool across calls; otherwise
+    one is started for this call. Parse errors are counted on ``parser``,
+    and its ``stats`` gathered as the chunks are merged.
+    """
+    parser = parser or ExamParser()
+    workers = workers or default_workers()
+    if workers <= 1 or len(content) < min_chars:
+        return parser.parse_content(content, answer_key_content)
+
+    content = content.replace('\r\n', '\n').replace('\r', '\n')
+    answer_key = parser.resolve_answer_key(answer_key_content)
+    # Every chunk is parsed in the dialect detected at the start of the whole file
+    dialect = parser.select_dialect(content)
+    chunks = split_content(content, workers * CHUNKS_PER_WORKER, dialect.question_split)
+
+    pool = executor or make_executor(workers)
+    try:
+        questions: List[Question] = []
+        for rows, error_count in pool.map(partial(_parse_chunk, dialect, dict(answer_key)), chunks):
+            questions.extend(Question(*row) for row in rows)
+            parser.error_count += error_count
+    finally:
+        if executor is None:
+            pool.shutdown()
+    return list(parser.track(questions, answer_key))
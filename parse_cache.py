@@ -0,0 +1,83 @@
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Optional
+
+from parser import Question
+
+class ParseCache:
+    """Content-addressed LRU cache of parse results with a size bound in bytes.
+
+    Entries are keyed on a hash of the uploaded bytes plus the parser settings,
+    so resubmitting identical files returns the stored result without decoding
+    or parsing again. Safe to share between threads.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(question_bytes: bytes, answer_key_bytes: Optional[bytes], settings: Iterable[Hashable] = ()) -> str:
+        """Hash the inputs and settings into a cache key."""
+        digest = hashlib.sha256()
+        for part in (question_bytes, answer_key_bytes or b'', repr(tuple(settings)).encode('utf-8')):
+            # Length-prefix each part so different splits of the same bytes never collide
+            digest.update(len(part).to_bytes(8, 'big'))
+            digest.update(part)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, value: Any, size: int) -> None:
+        """Store a value, evicting least recently used entries to stay within max_bytes."""
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+def estimate_size(parsed_questions: List[Question]) -> int:
+    """Approximate memory held by a list of parsed questions."""
+    size = sys.getsizeof(parsed_questions)
+    for question in parsed_questions:
+        size += (sys.getsizeof(question) + sys.getsizeof(question.text) + sys.getsizeof(question.correct_answer)
+                 + sys.getsizeof(question.choices) + sum(sys.getsizeof(choice) for choice in question.choices))
+    return size
@@ -1,13 +1,245 @@
+import io
 import re
-import pandas as pd
-from typing import Dict, List, Tuple
+from itertools import chain
+from typing import IO, TYPE_CHECKING, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
+
+from decoding import IncrementalTextDecoder
+from dialects import STANDARD, Dialect, detect_dialect, get_dialect, take_sample
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from incremental import BlockCache
+
+# Line markers of the standard dialect, compiled once per process.
+# A question starts with "N." at the beginning of a line, an answer choice with "A."-"D.".
+QUESTION_START = STANDARD.question_start
+CHOICE_START = STANDARD.choice_start
+# Splits newline-normalized text into raw question blocks
+QUESTION_SPLIT = STANDARD.question_split
+# An answer key entry, "12: B", with a letter A-J as in the dialects. E-J must stand alone, so
+# "3: Every ..." is not read as E; A-D entries match as they always have.
+ANSWER_KEY_ENTRY = re.compile(r'(\d+)\s*:\s*([A-Da-d]|[E-Je-j](?![A-Za-z]))', re.MULTILINE | re.IGNORECASE)
+
+# Every question has at least choices A-D; formats with more choices add columns
+DEFAULT_CHOICE_COUNT = 4
+
+def columns(choice_count: int = DEFAULT_CHOICE_COUNT) -> List[str]:
+    """Output column names for questions with up to ``choice_count`` choices."""
+    letters = [chr(ord('A') + index) for index in range(max(choice_count, DEFAULT_CHOICE_COUNT))]
+    return ['Question'] + [f'answer choice {letter}' for letter in letters] + ['Correct Answer']
+
+# Output columns, in order
+COLUMNS = columns()
+
+# A tokenized question block: (number, stem lines, [(choice letter, choice lines), ...], answer line letter)
+Block = Tuple[str, List[str], List[Tuple[str, List[str]]], str]
+
+READ_CHUNK_SIZE = 1 << 16
+
+# An answer key as text to parse, or already parsed (an AnswerKey or any number -> letter mapping)
+AnswerKeyInput = Union[str, Mapping[str, str], None]
+
+class Question:
+    """A parsed question.
+
+    Slotted, with the choices in a tuple ordered A, B, C, ..., so a large bank
+    costs little more than its text. Missing choices are empty strings.
+    """
+    __slots__ = ('number', 'text', 'choices', 'correct_answer')
+
+    def __init__(self, number: str, text: str, choices: Tuple[str, ...], correct_answer: str = ''):
+        self.number = number
+        self.text = text
+        self.choices = choices
+        self.correct_answer = correct_answer
+
+    def choice(self, letter: str) -> str:
+        index = ord(letter.upper()) - ord('A')
+        return self.choices[index] if 0 <= index < len(self.choices) else ''
+
+    def row(self, choice_count: int = DEFAULT_CHOICE_COUNT) -> List[str]:
+        """Values in the order of ``columns(choice_count)``."""
+        padding = [''] * (max(choice_count, DEFAULT_CHOICE_COUNT) - len(self.choices))
+        return [self.text, *self.choices, *padding, self.correct_answer]
+
+    def as_dict(self, choice_count: int = DEFAULT_CHOICE_COUNT) -> Dict[str, str]:
+        return dict(zip(columns(max(choice_count, len(self.choices))), self.row(choice_count)))
+
+    def astuple(self) -> Tuple:
+        return self.number, self.text, self.choices, self.correct_answer
+
+    @classmethod
+    def from_tuple(cls, values) -> 'Question':
+        """Rebuild a question from ``astuple()`` output, e.g. after a JSON round trip."""
+        number, text, choices, correct_answer = values
+        return cls(number, text, tuple(choices), correct_answer)
+
+    def __eq__(self, other):
+        if not isinstance(other, Question):
+            return NotImplemented
+        return self.astuple() == other.astuple()
+
+    def __repr__(self):
+        return f'Question(number={self.number!r}, text={self.text!r}, choices={self.choices!r}, ' \
+               f'correct_answer={self.correct_answer!r})'
+
+# Question numbers listed per problem in ParseStats.warnings(), and skipped numbers kept at all
+LISTED_NUMBERS = 10
+
+# Longer gaps between question numbers start a new numbering (a year, a section) rather than skip questions
+MAX_SKIPPED_GAP = 100
+
+class ParseStats:
+    """Validation statistics gathered while an exam is parsed.
+
+    Each problem lists the numbers of the questions that have it:
+    missing_choices (an empty answer choice), unresolved (no correct answer),
+    duplicates (a number seen before), skipped (numbers missing from the
+    sequence) and conflicts (the asterisk or an answer line marks a different
+    choice than the answer key). Only the first LISTED_NUMBERS skipped
+    numbers are kept, with their total in skipped_count.
+    """
+    __slots__ = ('total', 'missing_choices', 'unresolved', 'duplicates', 'conflicts', '_seen', '_skipped',
+                 '_skipped_count')
 
-class ExamParser:
     def __init__(self):
-        # Updated pattern to fix invalid escape sequence and handle company names with Inc., Ltd., etc.
-        self.question_pattern = r'(\d+)\.\s*(.*?)(?=\s*(?:\n[A-Da-d]\.|\Z))'
-        # Modified answer pattern to be more strict about answer format and fix escape sequence
-        self.answer_pattern = r'(?:^|\n)\s*([A-Da-d])\.\s*(.*?)(?=\s*(?:\n[A-Da-d]\.|\Z|\n\d+\.|\Z))'
+        self.total = 0
+        self.missing_choices: List[str] = []
+        self.unresolved: List[str] = []
+        self.duplicates: List[str] = []
+        self.conflicts: List[str] = []
+        self._seen = set()
+        # Counted from _seen when first asked for, again after new numbers are added
+        self._skipped: Optional[List[str]] = None
+        self._skipped_count = 0
+
+    def add(self, question: Question, answer_key: Mapping[str, str]) -> None:
+        number = question.number
+        self.total += 1
+        if not all(question.choices):
+            self.missing_choices.append(number)
+        if not question.correct_answer:
+            self.unresolved.append(number)
+        elif number in answer_key and question.choice(answer_key[number]) != question.correct_answer:
+            # The key would have picked another choice, so the asterisk decided
+            self.conflicts.append(number)
+        if number in self._seen:
+            self.duplicates.append(number)
+        else:
+            self._seen.add(number)
+            self._skipped = None
+
+    def _count_skipped(self) -> None:
+        """Count the numbers missing between consecutive question numbers, listing the first few.
+
+        Gaps of more than MAX_SKIPPED_GAP are not counted, so a stem line
+        starting with a year does not skip thousands of questions.
+        """
+        numbers = sorted({int(number) for number in self._seen if number.isdecimal()})
+        listed: List[str] = []
+        count = 0
+        for low, high in zip(numbers, numbers[1:]):
+            gap = high - low - 1
+            if gap > MAX_SKIPPED_GAP:
+                continue
+            count += gap
+            listed.extend(str(number) for number in range(low + 1, min(high, low + 1 + LISTED_NUMBERS - len(listed))))
+        self._skipped, self._skipped_count = listed, count
+
+    @property
+    def skipped(self) -> List[str]:
+        """The first LISTED_NUMBERS numbers missing from the sequence of question numbers."""
+        if self._skipped is None:
+            self._count_skipped()
+        return self._skipped
+
+    @property
+    def skipped_count(self) -> int:
+        """How many numbers are missing from the sequence of question numbers."""
+        if self._skipped is None:
+            self._count_skipped()
+        return self._skipped_count
+
+    def as_dict(self) -> Dict:
+        return {'total': self.total, 'missing_choices': self.missing_choices, 'unresolved': self.unresolved,
+                'duplicates': self.duplicates, 'skipped': self.skipped, 'skipped_count': self.skipped_count,
+                'conflicts': self.conflicts}
+
+    @classmethod
+    def from_dict(cls, values: Dict) -> 'ParseStats':
+        """Rebuild statistics from ``as_dict()`` output, e.g. after a JSON round trip."""
+        stats = cls()
+        stats.total = values['total']
+        stats.missing_choices = list(values['missing_choices'])
+        stats.unresolved = list(values['unresolved'])
+        stats.duplicates = list(values['duplicates'])
+        stats.conflicts = list(values['conflicts'])
+        stats._skipped = list(values['skipped'])[:LISTED_NUMBERS]
+        # Statistics stored before skipped numbers were capped listed all of them
+        stats._skipped_count = values.get('skipped_count', len(values['skipped']))
+        return stats
+
+    def warnings(self) -> List[str]:
+        """One message per kind of problem found, for display."""
+        messages = []
+        for numbers, count, text in (
+                (self.missing_choices, len(self.missing_choices), "questions with missing answer choices"),
+                (self.unresolved, len(self.unresolved), "questions with missing correct answers"),
+                (self.duplicates, len(self.duplicates), "repeated question numbers"),
+                (self.skipped, self.skipped_count, "question numbers skipped"),
+                (self.conflicts, len(self.conflicts), "questions where the marked answer and the answer key disagree")):
+            if count:
+                listed = ', '.join(numbers[:LISTED_NUMBERS]) + (', ...' if count > LISTED_NUMBERS else '')
+                messages.append(f"Found {count} {text} ({listed})")
+        return messages
+
+def choice_count(questions: Iterable[Question]) -> int:
+    """Number of choice columns needed to export the questions."""
+    return max((len(question.choices) for question in questions), default=DEFAULT_CHOICE_COUNT)
+
+def iter_lines(stream: IO, encoding: Optional[str] = None, errors: str = 'strict',
+               chunk_size: int = READ_CHUNK_SIZE) -> Iterator[str]:
+    """Yield lines from a text or binary file object without reading it all at once.
+
+    Binary streams are decoded incrementally with ``encoding``, or with the
+    encoding detected by IncrementalTextDecoder when it is None. CRLF, CR and LF
+    all end a line, and the final (possibly empty) line is always yielded, so
+    the result matches splitting the newline-normalized text on LF.
+    """
+    decoder = None
+    buffer = ''
+    while True:
+        chunk = stream.read(chunk_size)
+        if isinstance(chunk, (bytes, bytearray)):
+            if decoder is None:
+                decoder = IncrementalTextDecoder(encoding, errors)
+            text = decoder.decode(chunk, final=not chunk)
+        else:
+            text = chunk
+        if not chunk:
+            break
+
+        buffer += text
+        # A trailing '\r' may be the first half of a '\r\n' split across chunks
+        carry = ''
+        if buffer.endswith('\r'):
+            buffer, carry = buffer[:-1], '\r'
+        lines = buffer.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+        buffer = lines.pop() + carry
+        yield from lines
+
+    buffer += text
+    yield from buffer.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+
+class ExamParser:
+    def __init__(self, dialect: Union[str, Dialect, None] = None):
+        # With no dialect, each parse detects one from the start of its file
+        self.fixed_dialect = get_dialect(dialect) if dialect else None
+        self.dialect = self.fixed_dialect or STANDARD  # of the latest parse
+        self.answer_key_pattern = ANSWER_KEY_ENTRY
+        self.error_count = 0  # question blocks that failed to parse
+        self.stats = ParseStats()  # of the latest parse
 
     def parse_answer_key(self, answer_key_content: str) -> Dict[str, str]:
         """Parse answer key content into a dictionary."""
@@ -16,106 +248,217 @@ class ExamParser:
 
         answers = {}
 
-        # Simple pattern to match question number and answer letter
-        # This pattern looks for "number: letter" format
-        pattern = r'(\d+)\s*:\s*([A-Da-d])'
-
-        matches = re.finditer(pattern, answer_key_content, re.MULTILINE | re.IGNORECASE)
-        for match in matches:
+        # Looks for "number: letter" entries anywhere in the content
+        for match in self.answer_key_pattern.finditer(answer_key_content):
             question_num, answer_letter = match.groups()
             # Clean up and store the answer
             answers[question_num.strip()] = answer_letter.strip().upper()
 
-        # Debug print
-        print("Found answers:", answers)
-
         return answers
 
-    def parse_content(self, content: str, answer_key_content: str = None) -> List[Dict]:
-        """Parse exam content into structured format."""
-        content = content.replace('\r\n', '\n').replace('\r', '\n')
-        parsed_questions = []
+    def resolve_answer_key(self, answer_key: AnswerKeyInput) -> Mapping[str, str]:
+        """Parse answer key text; an already parsed key is used as it is."""
+        if not answer_key:
+            return {}
+        if isinstance(answer_key, str):
+            return self.parse_answer_key(answer_key)
+        return answer_key
 
-        # Parse answer key if provided
-        answer_key = self.parse_answer_key(answer_key_content) if answer_key_content else {}
+    def select_dialect(self, text: str) -> Dialect:
+        """Set ``self.dialect`` for a parse of the text: the parser's own, or the one detected at its start."""
+        self.dialect = self.fixed_dialect or detect_dialect(text)
+        return self.dialect
 
-        # Split content into question blocks
-        questions_raw = re.split(r'\n(?=\d+\.)', content)
+    def tokenize(self, lines: Iterable[str]) -> Iterator[Block]:
+        """Group lines into question blocks in a single forward pass, with the markers of ``self.dialect``.
 
-        for question_block in questions_raw:
-            try:
-                # Skip empty blocks
-                if not question_block.strip():
+        A line starting with a question number (``N.`` in the standard dialect)
+        opens a new block and anything before the first one is ignored. A line
+        starting with a choice letter (``A.``-``D.``) opens a new answer
+        choice, but only once the current stem or choice already holds some
+        text; until then it is part of that text. In a sequential
+        dialect, only the next letter opens a choice. An answer line, in
+        dialects that have them, sets the block's answer letter and is not
+        part of any text. Lines must not contain line breaks.
+        """
+        dialect = self.dialect
+        question_match = dialect.question_start.match
+        choice_match = dialect.choice_start.match
+        answer_match = dialect.answer_line.match if dialect.answer_line is not None else None
+        sequential = dialect.sequential
+
+        number = None
+        stem: List[str] = []
+        choices: List[Tuple[str, List[str]]] = []
+        answer = ''
+        current = stem
+        has_text = False
+
+        for line in lines:
+            match = question_match(line) if line[:1].isdecimal() else None
+            if match:
+                if number is not None:
+                    yield number, stem, choices, answer
+                number = match.group(1)
+                rest = line[match.end():]
+                stem = [rest]
+                choices = []
+                answer = ''
+                current = stem
+                has_text = bool(rest.strip())
+                continue
+
+            # Skip any preamble before the first question
+            if number is None:
+                continue
+
+            if answer_match is not None:
+                match = answer_match(line)
+                if match:
+                    answer = match.group(1).upper()
                     continue
 
-                # Match question
-                question_match = re.match(self.question_pattern, question_block, re.DOTALL | re.MULTILINE)
-                if not question_match:
+            if has_text:
+                match = choice_match(line)
+                if match and (not sequential or ord(match.group(1).upper()) - ord('A') == len(choices)):
+                    rest = line[match.end():]
+                    current = [rest]
+                    choices.append((match.group(1), current))
+                    has_text = bool(rest.strip())
                     continue
+            else:
+                has_text = bool(line.strip())
 
-                question_num = question_match.group(1)
-                question_text = question_match.group(2).strip().strip('"')
+            current.append(line)
 
-                # Skip if it's just a year
-                if question_text.isdigit():
-                    continue
+        if number is not None:
+            yield number, stem, choices, answer
+
+    def build_question(self, block: Block, answer_key: Mapping[str, str]) -> Optional[Question]:
+        """Turn a tokenized block into a Question, or None if it is not a question."""
+        question_num, stem, choices, answer_letter = block
+        question_text = '\n'.join(stem).strip().strip('"')
+
+        # Skip empty stems and stems that are just a year
+        if not question_text or question_text.isdigit():
+            return None
+
+        # Initialize answers with empty strings
+        answers = [''] * DEFAULT_CHOICE_COUNT
+        correct_answer_text = ''
 
-                # Initialize answers with empty strings
-                answers = {'A': '', 'B': '', 'C': '', 'D': ''}
-                correct_answer_text = ''
-
-                # Get the answer section after the question
-                answer_section = question_block[len(question_match.group(0)):].strip()
-
-                # Find all answer choices
-                answer_matches = list(re.finditer(self.answer_pattern, '\n' + answer_section, re.DOTALL | re.MULTILINE))
-
-                # Process each answer choice
-                for match in answer_matches:
-                    letter, text = match.groups()
-                    letter = letter.upper()
-                    text = text.strip().strip('"').strip()
-
-                    if text:  # Only store non-empty answers
-                        answers[letter] = text
-
-                        # Check for asterisk marking correct answer
-                        if '*' in text:
-                            correct_answer_text = text.replace('*', '').strip()
-                            answers[letter] = correct_answer_text
-
-                # Check answer key
-                if not correct_answer_text and question_num in answer_key:
-                    correct_letter = answer_key[question_num]
-                    if correct_letter in answers:
-                        correct_answer_text = answers[correct_letter]
-
-                # Only add if we have a question
-                if question_text:
-                    question_dict = {
-                        'Question': question_text,
-                        'answer choice A': answers['A'],
-                        'answer choice B': answers['B'],
-                        'answer choice C': answers['C'],
-                        'answer choice D': answers['D'],
-                        'Correct Answer': correct_answer_text
-                    }
-                    parsed_questions.append(question_dict)
+        for letter, parts in choices:
+            text = '\n'.join(parts).strip().strip('"').strip()
 
+            if text:  # Only store non-empty answers
+                index = ord(letter.upper()) - ord('A')
+                if index >= len(answers):
+                    answers.extend([''] * (index + 1 - len(answers)))
+
+                # Check for asterisk marking correct answer
+                if '*' in text:
+                    text = correct_answer_text = text.replace('*', '').strip()
+                answers[index] = text
+
+        # An answer line in the file comes before the answer key
+        if not correct_answer_text:
+            letter = answer_letter or answer_key.get(question_num)
+            if letter:
+                index = ord(letter) - ord('A')
+                if index < len(answers):
+                    correct_answer_text = answers[index]
+
+        return Question(question_num, question_text, tuple(answers), correct_answer_text)
+
+    def iter_parsed(self, lines: Iterable[str], answer_key: Mapping[str, str]) -> Iterator[Question]:
+        """Yield questions from lines as soon as each one is complete."""
+        for block in self.tokenize(lines):
+            try:
+                question = self.build_question(block, answer_key)
+                if question is not None:
+                    yield question
             except Exception as e:
+                self.error_count += 1
                 print(f"Error parsing question: {str(e)}")
                 continue
 
-        return parsed_questions
+    def iter_cached(self, content: str, answer_key: Mapping[str, str], block_cache: 'BlockCache') -> Iterator[Question]:
+        """Yield questions from newline-normalized content, reusing unchanged blocks.
+
+        The content is cut into raw question blocks at each line starting with
+        ``N.``, which is exactly where the tokenizer starts a new question. A
+        block whose text, answer key entry and dialect are in the cache yields
+        the Question built before; only new or edited blocks are parsed.
+        """
+        dialect = self.dialect
+        question_match = dialect.question_start.match
+        for text in dialect.question_split.split(content):
+            match = question_match(text)
+            # Skip any preamble before the first question
+            if match is None:
+                continue
+            key = block_cache.key(text, answer_key.get(match.group(1), ''), dialect.name)
+            question = block_cache.get(key)
+            if question is None:
+                for question in self.iter_parsed(text.split('\n'), answer_key):
+                    block_cache.put(key, question)
+                    yield question
+            else:
+                yield question
+
+    def track(self, questions: Iterable[Question], answer_key: Mapping[str, str]) -> Iterator[Question]:
+        """Pass questions through, gathering a fresh ``self.stats`` in the same pass."""
+        self.stats = stats = ParseStats()
+        for question in questions:
+            stats.add(question, answer_key)
+            yield question
+
+    def iter_questions(self, stream: IO, answer_key_content: AnswerKeyInput = None,
+                       encoding: Optional[str] = None, errors: str = 'strict') -> Iterator[Question]:
+        """Stream questions from a text or binary file object.
 
-    def create_dataframe(self, parsed_questions: List[Dict]) -> pd.DataFrame:
+        Only the current question is held in memory; each record is yielded
+        once the next question starts or the stream ends. The dialect is
+        detected from the first lines, which are then parsed with the rest.
+        ``self.stats`` is complete once the iterator is exhausted.
+        """
+        answer_key = self.resolve_answer_key(answer_key_content)
+        lines = iter_lines(stream, encoding, errors)
+        sample = take_sample(lines) if self.fixed_dialect is None else []
+        self.select_dialect('\n'.join(sample))
+        yield from self.track(self.iter_parsed(chain(sample, lines), answer_key), answer_key)
+
+    def parse_content(self, content: str, answer_key_content: AnswerKeyInput = None,
+                      block_cache: Optional['BlockCache'] = None) -> List[Question]:
+        """Parse exam content into structured format.
+
+        The answer key may be given as text or as a parsed AnswerKey, which
+        lets one key be applied to many exams without parsing it again. Pass
+        a BlockCache to reparse an edited exam incrementally: only question
+        blocks that changed since an earlier parse are built again.
+        """
+        content = content.replace('\r\n', '\n').replace('\r', '\n')
+        self.select_dialect(content)
+
+        # Parse answer key if provided
+        answer_key = self.resolve_answer_key(answer_key_content)
+
+        if block_cache is not None:
+            questions = self.iter_cached(content, answer_key, block_cache)
+        else:
+            questions = self.iter_parsed(content.split('\n'), answer_key)
+        return list(self.track(questions, answer_key))
+
+    def create_dataframe(self, parsed_questions: List[Question]) -> 'pd.DataFrame':
         """Convert parsed questions to pandas DataFrame."""
-        if not parsed_questions:
-            return pd.DataFrame(columns=['Question', 'answer choice A', 'answer choice B', 
-                                      'answer choice C', 'answer choice D', 'Correct Answer'])
-        return pd.DataFrame(parsed_questions)
-
-    def process_file(self, content: str, answer_key_content: str = None) -> pd.DataFrame:
-        """Process file content and return DataFrame."""
-        parsed_questions = self.parse_content(content, answer_key_content)
-        return self.create_dataframe(parsed_questions)
\ No newline at end of file
+        import pandas as pd
+
+        count = choice_count(parsed_questions)
+        return pd.DataFrame([question.row(count) for question in parsed_questions], columns=columns(count))
+
+    def process_file(self, content: Union[str, IO], answer_key_content: AnswerKeyInput = None) -> 'pd.DataFrame':
+        """Process file content (a string or file object) and return DataFrame."""
+        if isinstance(content, str):
+            content = io.StringIO(content)
+        parsed_questions = list(self.iter_questions(content, answer_key_content))
+        return self.create_dataframe(parsed_questions)
@@ -0,0 +1,242 @@
+"""A persistent bank of every converted question, searchable by full text.
+
+Questions are stored in a local SQLite file, tagged with the name and content
+hash of the exam they came from, and indexed with FTS5 over their stems and
+choices. Adding an exam whose content hash is already in the bank does
+nothing, so a file converted twice is stored once. Searches and exports read
+only the bank, never the original files.
+"""
+import hashlib
+import json
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from parser import DEFAULT_CHOICE_COUNT, Question
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    content_hash TEXT NOT NULL UNIQUE,
+    added REAL NOT NULL,
+    questions INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS questions (
+    id INTEGER PRIMARY KEY,
+    source_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    number TEXT NOT NULL,
+    text TEXT NOT NULL,
+    choices TEXT NOT NULL,
+    correct_answer TEXT NOT NULL,
+    question_hash TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS questions_source ON questions (source_id, position);
+CREATE INDEX IF NOT EXISTS questions_hash ON questions (question_hash);
+CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5(
+    text, choices, content='questions', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+"""
+
+# Questions inserted per executemany call; each source is still added in a single transaction
+INSERT_BATCH = 5000
+
+# Rows fetched at a time while exporting
+EXPORT_BATCH = 1000
+
+HashInput = Union[bytes, Path, None]
+
+def content_hash(question_data: HashInput, answer_key_data: HashInput = None) -> str:
+    """Hash an exam together with its answer key; each may be bytes or a file, which is read in chunks."""
+    digest = hashlib.sha256()
+    for part in (question_data, answer_key_data):
+        if isinstance(part, Path):
+            with open(part, 'rb') as f:
+                digest.update(hashlib.file_digest(f, 'sha256').digest())
+        else:
+            digest.update(hashlib.sha256(part or b'').digest())
+    return digest.hexdigest()
+
+def question_hash(question: Question) -> str:
+    """Hash of a question's stem and choices, shared by copies of it in different exams."""
+    data = json.dumps([question.text, *question.choices], ensure_ascii=False)
+    return hashlib.blake2b(data.encode('utf-8', 'surrogatepass'), digest_size=16).hexdigest()
+
+def match_query(text: str) -> str:
+    """An FTS5 query matching rows that contain every word of ``text``.
+
+    Each word is quoted, so FTS5 operators and punctuation are searched for
+    literally; a trailing ``*`` still matches any word with that prefix.
+    """
+    terms = []
+    for word in text.split():
+        prefix = word.endswith('*') and len(word) > 1
+        word = word.rstrip('*') if prefix else word
+        terms.append('"' + word.replace('"', '""') + '"' + ('*' if prefix else ''))
+    return ' '.join(terms)
+
+class QuestionBank:
+    """Questions of every converted exam in a local SQLite file with a full-text index.
+
+    Like ResultStore, every call opens its own short-lived connection, so one
+    bank can be shared by threads, forked web workers and pool processes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        # Safe with WAL: a crash may lose the last commits but never corrupts the bank
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def add(self, name: str, digest: str, questions: Iterable[Question]) -> Tuple[int, bool]:
+        """Store the questions of one exam in a single transaction.
+
+        ``digest`` is the exam's content_hash. Returns (source ID, whether the
+        exam was added); an exam already in the bank is left as it is and
+        ``questions`` is not consumed.
+        """
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT id FROM sources WHERE content_hash = ?", (digest,)).fetchone()
+                if row is not None:
+                    conn.execute("ROLLBACK")
+                    return row[0], False
+                source_id = conn.execute("INSERT INTO sources (name, content_hash, added) VALUES (?, ?, ?)",
+                                         (name, digest, time.time())).lastrowid
+                count = 0
+                rows = []
+                for question in questions:
+                    rows.append((source_id, count, question.number, question.text,
+                                 json.dumps(question.choices, ensure_ascii=False), question.correct_answer,
+                                 question_hash(question)))
+                    count += 1
+                    if len(rows) == INSERT_BATCH:
+                        self._insert(conn, rows)
+                        rows = []
+                self._insert(conn, rows)
+                # Index the whole source at once rather than row by row
+                conn.execute("""
+                    INSERT INTO questions_fts (rowid, text, choices)
+                    SELECT id, text, choices FROM questions WHERE source_id = ?""", (source_id,))
+                conn.execute("UPDATE sources SET questions = ? WHERE id = ?", (count, source_id))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return source_id, True
+
+    @staticmethod
+    def _insert(conn: sqlite3.Connection, rows: List[Tuple]) -> None:
+        conn.executemany("""
+            INSERT INTO questions (source_id, position, number, text, choices, correct_answer, question_hash)
+            VALUES (?, ?, ?, ?, ?, ?, ?)""", rows)
+
+    def remove(self, source_id: int) -> bool:
+        """Delete a source and its questions; returns False if there is no such source."""
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("""
+                INSERT INTO questions_fts (questions_fts, rowid, text, choices)
+                SELECT 'delete', id, text, choices FROM questions WHERE source_id = ?""", (source_id,))
+            conn.execute("DELETE FROM questions WHERE source_id = ?", (source_id,))
+            removed = conn.execute("DELETE FROM sources WHERE id = ?", (source_id,)).rowcount
+            conn.execute("COMMIT")
+        return bool(removed)
+
+    def sources(self) -> List[Dict]:
+        """Every stored exam, most recently added first."""
+        with closing(self._connect()) as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute("SELECT * FROM sources ORDER BY added DESC, id DESC").fetchall()
+        return [dict(row) for row in rows]
+
+    @staticmethod
+    def _where(conn: sqlite3.Connection, query: str, source_id: Optional[int]) -> Tuple[str, str, List]:
+        """FROM and WHERE clauses selecting the questions matching a search, and their parameters.
+
+        A source's questions are inserted in one transaction, so their IDs
+        are consecutive and a source is selected as a range of full-text index
+        rows rather than by matching its questions one at a time.
+        """
+        match = match_query(query)
+        tables = "questions_fts CROSS JOIN questions ON questions.id = questions_fts.rowid" if match else "questions"
+        row_id = "questions_fts.rowid" if match else "questions.id"
+        conditions, params = [], []
+        if match:
+            conditions.append("questions_fts MATCH ?")
+            params.append(match)
+        if source_id is not None:
+            conditions.append(f"{row_id} BETWEEN ? AND ?")
+            params.extend(conn.execute("SELECT MIN(id), MAX(id) FROM questions WHERE source_id = ?",
+                                       (source_id,)).fetchone())
+        return tables, ' AND '.join(conditions) or '1', params
+
+    def search(self, query: str = '', source_id: Optional[int] = None, limit: int = 50, offset: int = 0,
+               ranked: bool = True) -> Tuple[int, List[Dict]]:
+        """Return (number of matches, one page of them) for questions containing every word of ``query``.
+
+        Matches are ranked by relevance (BM25), or listed in bank order without
+        a query or ``ranked``; ranking takes time in proportion to the number
+        of matches. Each is a dict shaped like the question records of /api/convert.
+        """
+        match = match_query(query)
+        with closing(self._connect()) as conn:
+            tables, where, params = self._where(conn, query, source_id)
+            # The conditions only refer to the full-text index, which is all that counting needs
+            counted = "questions_fts" if match else "questions"
+            total, = conn.execute(f"SELECT COUNT(*) FROM {counted} WHERE {where}", params).fetchone()
+            # Bank order is the order of the index rows, which the index returns without sorting
+            order = ("bm25(questions_fts)" if ranked else "questions_fts.rowid") if match else "questions.id"
+            rows = conn.execute(f"""
+                SELECT questions.id, sources.name, questions.source_id, questions.number, questions.text,
+                       questions.choices, questions.correct_answer, questions.question_hash
+                FROM {tables} JOIN sources ON sources.id = questions.source_id
+                WHERE {where} ORDER BY {order} LIMIT ? OFFSET ?""", (*params, limit, offset)).fetchall()
+        return total, [self._record(row) for row in rows]
+
+    @staticmethod
+    def _record(row: Tuple) -> Dict:
+        question_id, source, source_id, number, text, choices, correct_answer, digest = row
+        return {'id': question_id, 'source': source, 'source_id': source_id, 'number': number, 'question': text,
+                'choices': {chr(ord('A') + i): choice for i, choice in enumerate(json.loads(choices))},
+                'correct_answer': correct_answer, 'question_hash': digest}
+
+    def choice_count(self, query: str = '', source_id: Optional[int] = None) -> int:
+        """Choice columns needed to export the matching questions, as parser.choice_count."""
+        with closing(self._connect()) as conn:
+            tables, where, params = self._where(conn, query, source_id)
+            count, = conn.execute(f"SELECT MAX(json_array_length(questions.choices)) FROM {tables} WHERE {where}",
+                                  params).fetchone()
+        return count or DEFAULT_CHOICE_COUNT
+
+    def iter_questions(self, query: str = '', source_id: Optional[int] = None) -> Iterator[Question]:
+        """Yield every matching question in bank order, reading the bank in batches."""
+        order = "questions_fts.rowid" if match_query(query) else "questions.id"
+        with closing(self._connect()) as conn:
+            tables, where, params = self._where(conn, query, source_id)
+            cursor = conn.execute(f"""
+                SELECT questions.number, questions.text, questions.choices, questions.correct_answer
+                FROM {tables} WHERE {where} ORDER BY {order}""", params)
+            while True:
+                rows = cursor.fetchmany(EXPORT_BATCH)
+                if not rows:
+                    break
+                for number, text, choices, correct_answer in rows:
+                    yield Question(number, text, tuple(json.loads(choices)), correct_answer)
+
+    def stats(self) -> Dict[str, int]:
+        with closing(self._connect()) as conn:
+            sources, questions = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(questions), 0) FROM sources").fetchone()
+            distinct, = conn.execute("SELECT COUNT(DISTINCT question_hash) FROM questions").fetchone()
+        return {'sources': sources, 'questions': questions, 'distinct_questions': distinct}
@@ -0,0 +1,131 @@
+import json
+import sqlite3
+import time
+import uuid
+from contextlib import closing
+from typing import Dict, List, Optional
+
+from parser import Question
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id TEXT PRIMARY KEY,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL,
+    size INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed);
+CREATE TABLE IF NOT EXISTS artifacts (
+    result_id TEXT NOT NULL,
+    format TEXT NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (result_id, format)
+);
+CREATE TABLE IF NOT EXISTS result_keys (
+    key TEXT PRIMARY KEY,
+    result_id TEXT NOT NULL
+);
+"""
+
+class ResultStore:
+    """Parsed results shared by every worker process through a local SQLite file.
+
+    Each result is stored once under a random ID, so any gunicorn worker can
+    serve downloads for it without reparsing. Results expire ``ttl_seconds``
+    after their last access, and the least recently used ones are evicted
+    once the stored payloads exceed ``max_bytes``. A result can also be
+    recorded under a key of the inputs it was parsed from, so any worker can
+    find it again instead of parsing the same files twice.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = 3600, max_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # A short-lived connection per call keeps the store safe across threads and forked workers
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def put(self, parsed_questions: List[Question]) -> str:
+        """Store parsed questions and return the new result ID."""
+        result_id = uuid.uuid4().hex
+        rows = [question.astuple() for question in parsed_questions]
+        data = json.dumps(rows, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("INSERT INTO results (id, created, accessed, size, data) VALUES (?, ?, ?, ?, ?)",
+                         (result_id, now, now, len(data), data))
+            self._evict(conn, now)
+            conn.execute("COMMIT")
+        return result_id
+
+    def get(self, result_id: str) -> Optional[List[Question]]:
+        """Return the stored questions, or None if the ID is unknown or expired."""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT data FROM results WHERE id = ? AND accessed >= ?",
+                               (result_id, now - self.ttl_seconds)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE results SET accessed = ? WHERE id = ?", (now, result_id))
+        return [Question.from_tuple(values) for values in json.loads(row[0])]
+
+    def put_artifact(self, result_id: str, fmt: str, data: bytes) -> None:
+        """Store a pre-built export or other data derived from a result; it counts toward the result's size."""
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            updated = conn.execute("UPDATE results SET size = size + ? WHERE id = ?", (len(data), result_id)).rowcount
+            if updated:
+                conn.execute("INSERT OR REPLACE INTO artifacts (result_id, format, data) VALUES (?, ?, ?)",
+                             (result_id, fmt, data))
+                self._evict(conn, time.time())
+            conn.execute("COMMIT")
+
+    def get_artifact(self, result_id: str, fmt: str) -> Optional[bytes]:
+        """Return a pre-built export, or None if there is none or its result has expired."""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            row = conn.execute("""
+                SELECT artifacts.data FROM artifacts JOIN results ON results.id = artifacts.result_id
+                WHERE artifacts.result_id = ? AND artifacts.format = ? AND results.accessed >= ?""",
+                (result_id, fmt, now - self.ttl_seconds)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE results SET accessed = ? WHERE id = ?", (now, result_id))
+        return row[0]
+
+    def put_key(self, key: str, result_id: str) -> None:
+        """Record that the inputs hashed into ``key`` (a ParseCache key) were parsed into a stored result."""
+        with closing(self._connect()) as conn:
+            conn.execute("INSERT OR REPLACE INTO result_keys (key, result_id) VALUES (?, ?)", (key, result_id))
+
+    def find(self, key: str) -> Optional[str]:
+        """Return the ID of the result recorded under ``key``, or None if there is none or it has expired."""
+        with closing(self._connect()) as conn:
+            row = conn.execute("""
+                SELECT results.id FROM result_keys JOIN results ON results.id = result_keys.result_id
+                WHERE result_keys.key = ? AND results.accessed >= ?""", (key, time.time() - self.ttl_seconds)).fetchone()
+        return row[0] if row is not None else None
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM results WHERE accessed < ?", (now - self.ttl_seconds,))
+        # Keep the most recently used results that fit in max_bytes
+        conn.execute("""
+            DELETE FROM results WHERE id IN (
+                SELECT id FROM (
+                    SELECT id, SUM(size) OVER (ORDER BY accessed DESC, created DESC) AS running FROM results
+                ) WHERE running > ?
+            )""", (self.max_bytes,))
+        conn.execute("DELETE FROM artifacts WHERE result_id NOT IN (SELECT id FROM results)")
+        conn.execute("DELETE FROM result_keys WHERE result_id NOT IN (SELECT id FROM results)")
+
+    def stats(self) -> Dict[str, int]:
+        with closing(self._connect()) as conn:
+            count, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        return {'results': count, 'bytes': size, 'max_bytes': self.max_bytes}
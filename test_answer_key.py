@@ -0,0 +1,36 @@
+"""AnswerKey parsed once and applied to many exams."""
+import pickle
+
+from exam_corpus import answer_key_text, build_docx, key_letter, synthetic_exam
+from answer_key import AnswerKey
+from parser import ExamParser
+
+
+def test_text_and_docx_keys_agree():
+    from_text = AnswerKey.from_bytes('key.txt', answer_key_text(40).encode('utf-8'))
+    from_docx = AnswerKey.from_bytes('KEY.DOCX', build_docx(40))
+    assert dict(from_text) == dict(from_docx) == {str(n): key_letter(n) for n in range(1, 41)}
+    assert from_docx.source == 'KEY.DOCX'
+
+
+def test_letters_are_upper_case_and_the_key_is_immutable():
+    key = AnswerKey({1: 'b', '2': 'C'})
+    assert dict(key) == {'1': 'B', '2': 'C'}
+    assert not hasattr(key, '__dict__')
+    assert pickle.loads(pickle.dumps(key)) == key
+
+
+def test_one_key_applies_like_its_text():
+    key_text = answer_key_text(30)
+    key = AnswerKey.from_text(key_text)
+    for seed in range(3):
+        content = synthetic_exam(50, seed=seed)
+        assert ExamParser().parse_content(content, key) == ExamParser().parse_content(content, key_text)
+
+
+def test_coverage():
+    key = AnswerKey.from_text('1: A\n2: B\n9: C')
+    coverage = key.coverage(ExamParser().parse_content(synthetic_exam(3, seed=0)))
+    assert coverage.as_dict() == {'matched': 2, 'unkeyed': ['3'], 'unused': ['9']}
+    assert coverage.describe() == 'key covers 2 questions, 1 not in key, 1 key entries unused'
+    assert key.coverage(['1', '2', '9']).describe() == 'key covers 3 questions'
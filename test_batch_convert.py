@@ -0,0 +1,36 @@
+"""Pairing exams with their answer keys and converting a directory of them."""
+import csv
+from pathlib import Path
+
+from batch_convert import collect_inputs, main, pair_exams
+from exam_corpus import ASSETS, answer_key_text, synthetic_exam
+
+
+def test_fixture_exam_pairs_with_its_docx_key():
+    pairs, unmatched = pair_exams(collect_inputs([str(ASSETS)]))
+    keys = {exam.name: key.name if key else None for exam, key in pairs}
+    assert keys['cleaned_easyup-MiniCourse-FinalExamQues40-6hr-40per8for2025.txt'] == \
+        'easyup-MiniCourse-AnswerKeyforFinalExamQues40-6hr-40per8for2025.docx'
+    assert unmatched == []
+
+
+def test_pair_exams_by_name():
+    paths = [Path('a/exam1.txt'), Path('a/exam1_key.txt'), Path('a/exam2.txt'), Path('b/exam1 answers.txt'),
+             Path('b/notes.docx')]
+    pairs, unmatched = pair_exams(paths)
+    assert pairs == [(Path('a/exam1.txt'), Path('a/exam1_key.txt')), (Path('a/exam2.txt'), None)]
+    assert unmatched == [Path('b/exam1 answers.txt')]
+
+
+def test_main_converts_a_directory_and_resumes(tmp_path, capsys):
+    for name, count in (('first', 20), ('second', 30)):
+        (tmp_path / f'{name}.txt').write_text(synthetic_exam(count, seed=count), encoding='utf-8')
+    (tmp_path / 'first_key.txt').write_text(answer_key_text(20), encoding='utf-8')
+
+    assert main([str(tmp_path), '--format', 'csv', '--jobs', '2']) == 0
+    with open(tmp_path / 'second.csv', encoding='utf-8', newline='') as f:
+        assert len(list(csv.reader(f))) == 31
+    assert '2 converted' in capsys.readouterr().out
+
+    assert main([str(tmp_path), '--format', 'csv', '--resume']) == 0
+    assert '0 converted, 2 skipped' in capsys.readouterr().out
@@ -0,0 +1,87 @@
+"""Encoding choice in decode_bytes and IncrementalTextDecoder, and reading uploads with read_upload."""
+import codecs
+
+import pytest
+
+from exam_corpus import build_docx
+from decoding import SAMPLE_SIZE, IncrementalTextDecoder, bom_encoding, decode_bytes, read_upload
+from docx_reader import read_answer_key
+
+TEXT = '1. Which résumé is naïve? – “quoted” €5\nA. façade*\n'
+
+
+def decode_in_chunks(data, size, decoder=None):
+    decoder = decoder or IncrementalTextDecoder()
+    text = ''.join(decoder.decode(data[i:i + size]) for i in range(0, len(data), size))
+    return text + decoder.decode(b'', final=True), decoder
+
+
+@pytest.mark.parametrize('encoding, bom', [('utf-8-sig', codecs.BOM_UTF8), ('utf-16-le', codecs.BOM_UTF16_LE),
+                                           ('utf-16-be', codecs.BOM_UTF16_BE), ('utf-32-le', codecs.BOM_UTF32_LE)])
+def test_byte_order_marks(encoding, bom):
+    data = bom + TEXT.encode(encoding.replace('-sig', ''))
+    result = decode_bytes(data)
+    assert result.text == TEXT
+    assert result.method == 'bom'
+    assert bom_encoding(data) is not None
+    assert decode_in_chunks(data, 3)[0] == TEXT
+
+
+def test_utf8():
+    result = decode_bytes(TEXT.encode('utf-8'))
+    assert (result.text, result.encoding, result.method) == (TEXT, 'utf-8', 'utf-8')
+
+
+def test_legacy_text_is_detected_or_falls_back():
+    data = (TEXT * 50).encode('cp1252')
+    result = decode_bytes(data)
+    assert result.method in ('detected', 'fallback')
+    assert result.text == TEXT * 50
+
+
+def test_undetectable_bytes_fall_back_to_a_single_byte_encoding():
+    data = b'1. Q\x81\x8d\x8f\x90\x9d\n'
+    result = decode_bytes(data)
+    assert result.encoding in ('cp1252', 'latin-1') or result.method == 'detected'
+    assert len(result.text) == len(data)
+
+
+@pytest.mark.parametrize('size', [1, 2, 5, 4096])
+def test_incremental_decoding_matches_decode_bytes(size):
+    data = (TEXT * 20).encode('utf-8')
+    text, decoder = decode_in_chunks(data, size)
+    assert text == TEXT * 20
+    assert (decoder.encoding, decoder.method) == ('utf-8', 'utf-8')
+
+
+def test_incremental_decoder_switches_when_late_bytes_are_not_utf8():
+    head = ('a' * 100 + 'é\n') * (SAMPLE_SIZE // 50)
+    tail = TEXT * 20
+    data = head.encode('utf-8') + tail.encode('cp1252')
+    text, decoder = decode_in_chunks(data, 1000)
+    assert text.startswith(head)
+    assert text[len(head):] == tail
+    assert decoder.method in ('detected', 'fallback')
+    assert decoder.encoding != 'utf-8'
+
+
+def test_given_encoding_is_trusted():
+    data = TEXT.encode('cp1252')
+    text, decoder = decode_in_chunks(data, 7, IncrementalTextDecoder('cp1252'))
+    assert text == TEXT
+    assert decoder.method == 'given'
+    with pytest.raises(UnicodeDecodeError):
+        decode_in_chunks(data, 7, IncrementalTextDecoder('utf-8'))
+
+
+def test_read_upload_decodes_text_and_reads_docx_keys():
+    decoded = read_upload('exam.txt', TEXT.encode('cp1252'))
+    assert (decoded.text, decoded.method) == (TEXT, decode_bytes(TEXT.encode('cp1252')).method)
+    key = read_upload('Key.DOCX', build_docx(10))
+    assert (key.text, key.encoding, key.method) == (read_answer_key(build_docx(10)), 'utf-8', 'docx')
+    assert key.describe().startswith('utf-8 (docx, ')
+
+
+def test_read_upload_rejects_unreadable_docx():
+    with pytest.raises(ValueError, match='not a readable .docx file'):
+        read_upload('key.docx', TEXT.encode('utf-8'))
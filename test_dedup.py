@@ -0,0 +1,75 @@
+"""Exact and near-duplicate question groups."""
+import json
+import random
+
+import pytest
+
+from exam_corpus import sentence, synthetic_exam
+from dedup import DuplicateFinder, lsh_bands, main, normalize, question_text, shingle_hashes
+from parser import ExamParser, Question
+
+
+def test_normalized_text_ignores_case_punctuation_spacing_and_choice_order():
+    assert normalize('  The ＡＢＣ  of  Taxes, revised!  ') == 'the abc of taxes revised'
+    first = Question('1', 'What is a trust?', ('An asset', 'A contract', '', ''))
+    second = Question('9', 'what is a TRUST', ('a contract.', 'an asset', '', ''))
+    assert question_text(first) == question_text(second) == 'what is a trust a contract an asset'
+
+
+def test_short_texts_form_one_shingle():
+    assert len(shingle_hashes('one')) == 1
+    assert len(shingle_hashes('one two three four')) == 2
+
+
+def test_bands_turn_near_the_threshold():
+    bands, rows = lsh_bands(0.8, 128)
+    assert bands * rows == 128
+    assert abs((1 / bands) ** (1 / rows) - 0.8) < 0.1
+
+
+def test_exact_and_near_duplicates_across_exams():
+    stem = ('Which of the following best describes the duty owed by a trustee to the beneficiaries of a trust '
+            'that was created under a will when the trust instrument says nothing about investments and the '
+            'beneficiaries include both income beneficiaries and remainder beneficiaries')
+    finder = DuplicateFinder(threshold=0.7)
+    finder.add_many([Question('1', stem + '?', ('Loyalty', 'Care', 'Both', 'Neither')),
+                     Question('2', 'An unrelated question about annuities', ('a', 'b', 'c', 'd'))], 'a.txt')
+    finder.add_many([Question('5', stem.upper(), ('Neither', 'Both', 'Care', 'Loyalty')),
+                     Question('6', stem.replace('created', 'set up'), ('Loyalty', 'Care', 'Both', 'Neither'))], 'b.txt')
+    groups = finder.find()
+    assert [(group.kind, group.members) for group in groups] == [
+        ('exact', [('a.txt', '1'), ('b.txt', '5')]),
+        ('near', [('a.txt', '1'), ('b.txt', '6')])]
+    assert 0.7 <= groups[1].similarity < 1
+    assert groups[0].as_dict()['members'][1] == {'source': 'b.txt', 'number': '5'}
+
+
+def test_distinct_questions_are_not_grouped():
+    finder = DuplicateFinder()
+    finder.add_many(Question(str(n), sentence(random.Random(n), 12), ()) for n in range(2000))
+    assert finder.find() == []
+
+
+def test_batches_agree_with_single_questions(monkeypatch):
+    questions = ExamParser().parse_content(synthetic_exam(300, seed=5))
+    whole = DuplicateFinder()
+    whole.add_many(questions + questions[:50], 'exam')
+    monkeypatch.setattr('dedup.BATCH_SIZE', 7)
+    batched = DuplicateFinder()
+    batched.add_many(questions + questions[:50], 'exam')
+    assert [group.as_dict() for group in whole.find()] == [group.as_dict() for group in batched.find()]
+
+
+def test_threshold_must_be_a_similarity():
+    with pytest.raises(ValueError):
+        DuplicateFinder(threshold=0)
+
+
+def test_command_line(tmp_path, capsys):
+    content = synthetic_exam(20, seed=9)
+    (tmp_path / 'one.txt').write_text(content, encoding='utf-8')
+    (tmp_path / 'two.txt').write_text(content, encoding='utf-8')
+    assert main([str(tmp_path), '--json', str(tmp_path / 'groups.json')]) == 0
+    groups = json.loads((tmp_path / 'groups.json').read_text(encoding='utf-8'))
+    assert len(groups) >= 20 and all(len(group['members']) >= 2 for group in groups)
+    assert '40 questions' in capsys.readouterr().out
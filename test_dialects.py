@@ -0,0 +1,70 @@
+"""Dialect detection, and answer letters up to J in every dialect and answer key format."""
+import pytest
+
+from answer_key import AnswerKey
+from exam_corpus import DIALECT_SAMPLES, EDGE_CASES, cell, docx_bytes, paragraph, synthetic_exam
+from dialects import DETECT_SAMPLE_CHARS, detect_dialect, get_dialect
+from parser import ExamParser
+
+
+@pytest.mark.parametrize('dialect', sorted(DIALECT_SAMPLES))
+def test_dialect_detection(dialect):
+    parser = ExamParser()
+    parser.parse_content(DIALECT_SAMPLES[dialect])
+    assert parser.dialect.name == dialect
+
+
+def test_standard_exams_stay_standard():
+    assert detect_dialect(synthetic_exam(50, seed=1)).name == 'standard'
+    assert detect_dialect('no questions here').name == 'standard'
+
+
+def test_detection_reads_only_the_sample():
+    content = synthetic_exam(2000, seed=2)
+    assert len(content) > DETECT_SAMPLE_CHARS
+    assert detect_dialect(content + DIALECT_SAMPLES['bracketed'] * 2000).name == 'standard'
+
+
+def test_samples_parse_as_written():
+    assert [(q.choices, q.correct_answer) for q in ExamParser().parse_content(DIALECT_SAMPLES['parenthesis'])] == [
+        (('Carrot', 'Apple', 'Potato', 'Onion', 'Leek'), 'Apple'), (('Both', 'Neither', '', ''), 'Both')]
+    first, second = ExamParser().parse_content(DIALECT_SAMPLES['bracketed'])
+    assert first.correct_answer == '4' and second.correct_answer == 'Paris'
+    assert ExamParser().parse_content(DIALECT_SAMPLES['extended'])[0].choices == ('4', '6', '7', '8', '9', '10')
+
+
+def test_a_fixed_dialect_is_not_detected():
+    parser = ExamParser('standard')
+    parser.parse_content(DIALECT_SAMPLES['bracketed'])
+    assert parser.dialect is get_dialect('standard')
+    with pytest.raises(ValueError, match='Unknown dialect'):
+        ExamParser('yaml')
+
+
+@pytest.mark.parametrize('name, content, key_text', EDGE_CASES, ids=[case[0] for case in EDGE_CASES])
+def test_edge_cases(name, content, key_text):
+    expected = {
+        # The answer line decides, even when it names a missing choice; the question is reported unresolved
+        'answer line naming a missing choice, with a key': ['', 'c'],
+        'answer line against the key': ['e'],
+        'asterisk against an answer line and the key': ['b'],
+        'key letter beyond D': ['f'],
+    }[name]
+    assert [question.correct_answer for question in ExamParser().parse_content(content, key_text)] == expected
+
+
+def test_answer_key_letters_beyond_d():
+    key = AnswerKey.from_text('1: E\n2: f\n3 : J\n4: Every\n5: D')
+    assert dict(key) == {'1': 'E', '2': 'F', '3': 'J', '5': 'D'}
+
+
+@pytest.mark.parametrize('layout', ['table', 'paragraphs'])
+def test_docx_answer_key_letters_beyond_d(layout):
+    letters = 'ABCDEFGHIJ'
+    if layout == 'table':
+        body = ['<w:tbl><w:tr>' + ''.join(cell(f'{n}.') + cell(letter) for n, letter in enumerate(letters, 1))
+                + '</w:tr></w:tbl>']
+    else:
+        body = [paragraph(f'{n}. {letter.lower()}') for n, letter in enumerate(letters, 1)]
+    key = AnswerKey.from_bytes('key.docx', docx_bytes(body))
+    assert dict(key) == {str(n): letter for n, letter in enumerate(letters, 1)}
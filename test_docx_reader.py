@@ -0,0 +1,77 @@
+"""Answer key entries read from .docx tables and paragraphs."""
+from exam_corpus import ASSETS, build_docx, cell, docx_bytes, key_letter, paragraph
+from docx_reader import iter_answer_pairs, read_answer_key
+
+ATTACHED_KEY = ASSETS / 'easyup-MiniCourse-AnswerKeyforFinalExamQues40-6hr-40per8for2025.docx'
+
+
+def tcell(text, properties=''):
+    return f'<w:tc><w:tcPr>{properties}</w:tcPr>{paragraph(text)}</w:tc>'
+
+
+def table(*rows):
+    return '<w:tbl>' + ''.join('<w:tr>' + ''.join(row) + '</w:tr>' for row in rows) + '</w:tbl>'
+
+
+def expected(count):
+    return [(str(n), key_letter(n)) for n in range(1, count + 1)]
+
+
+def test_table_layout():
+    assert list(iter_answer_pairs(build_docx(50, 'table', columns=4))) == expected(50)
+
+
+def test_paragraph_layout():
+    assert [(n, letter.upper()) for n, letter in iter_answer_pairs(build_docx(50, 'paragraphs'))] == expected(50)
+
+
+def test_attached_key():
+    pairs = list(iter_answer_pairs(ATTACHED_KEY.read_bytes()))
+    assert [number for number, _ in pairs] == [str(n) for n in range(1, 31)]
+    assert all(letter.upper() in 'ABCD' for _, letter in pairs)
+
+
+def test_file_objects_and_text_output():
+    with open(ATTACHED_KEY, 'rb') as f:
+        text = read_answer_key(f)
+    assert text.splitlines()[0].startswith('1: ')
+    assert len(text.splitlines()) == 30
+
+
+def test_horizontally_merged_cells_repeat_in_every_column():
+    body = table([tcell('1.', '<w:gridSpan w:val="2"/>'), cell('C'), cell('2'), cell('d')])
+    assert list(iter_answer_pairs(docx_bytes([body]))) == [('1', 'C'), ('2', 'd')]
+
+
+def test_vertically_merged_cells_take_the_text_above():
+    body = table([cell('1.'), tcell('B', '<w:vMerge w:val="restart"/>')],
+                 [cell('2.'), tcell('', '<w:vMerge/>')],
+                 [cell('3.'), cell('A')])
+    assert list(iter_answer_pairs(docx_bytes([body]))) == [('1', 'B'), ('2', 'B'), ('3', 'A')]
+
+
+def test_cells_that_are_not_entries_are_ignored():
+    body = table([cell('Question'), cell('Answer')], [cell('1.'), cell('Because')], [cell('2'), cell('b')])
+    assert list(iter_answer_pairs(docx_bytes([paragraph('Answer Key'), body]))) == [('2', 'b')]
+
+
+def test_paragraph_entries_beside_dates_and_words():
+    body = [paragraph('Issued 1/1/25. As of 2025'), paragraph('1. c\t2: B  3) a'), paragraph('4. As of today')]
+    assert list(iter_answer_pairs(docx_bytes(body))) == [('1', 'c'), ('2', 'B'), ('3', 'a')]
+
+
+def test_rationale_prose_after_the_table_does_not_replace_answers():
+    body = [table([cell('1'), cell('C')], [cell('2'), cell('D')]),
+            paragraph('Rationale'),
+            paragraph('1. A company must disclose its liabilities, so C is correct.'),
+            paragraph('See page 4. A summary of the rules is in the appendix.'),
+            paragraph('2. B’s answer is wrong because the rate is fixed.')]
+    assert dict(iter_answer_pairs(docx_bytes(body))) == {'1': 'C', '2': 'D'}
+
+
+def test_paragraph_entries_end_at_a_separator_or_the_next_entry():
+    body = [paragraph('1. c, 2. B; 3) a\t4: d'), paragraph('5. e 6. F'),
+            '<w:p><w:r><w:t>7. a</w:t><w:br/><w:t>The reason is given below.</w:t></w:r></w:p>',
+            paragraph('8. B 9. Assets are listed')]
+    assert list(iter_answer_pairs(docx_bytes(body))) == [
+        ('1', 'c'), ('2', 'B'), ('3', 'a'), ('4', 'd'), ('5', 'e'), ('6', 'F'), ('7', 'a')]
@@ -0,0 +1,106 @@
+"""Contents of the streamed CSV, XLSX, Parquet and Arrow exports."""
+import csv
+import io
+
+from exam_corpus import synthetic_exam
+import pytest
+
+from exporters import ROWS_PER_CHUNK, arrow_schema, iter_arrow, iter_csv, iter_parquet, iter_xlsx
+from parser import ExamParser, Question, columns
+
+QUESTIONS = ExamParser().parse_content(synthetic_exam(ROWS_PER_CHUNK * 2 + 10, seed=6))
+
+SPECIAL = [
+    Question('1', 'Quotes "inside", commas, and\na line break', ('<tag> & amp', 'résumé', '', 'd'), 'résumé'),
+    Question('2', 'Control\x0bcharacter', ('a', 'b', 'c', 'd', 'e'), 'e'),
+]
+
+
+def rows(questions, choices):
+    return [columns(choices)] + [question.row(choices) for question in questions]
+
+
+def read_csv(chunks):
+    return list(csv.reader(io.StringIO(''.join(chunks))))
+
+
+def read_xlsx(chunks):
+    import openpyxl
+
+    sheet = openpyxl.load_workbook(io.BytesIO(b''.join(chunks)), read_only=True).active
+    values = [['' if value is None else value for value in row] for row in sheet.iter_rows(values_only=True)]
+    # Empty cells are not written, so a row may end early
+    return [row + [''] * (len(values[0]) - len(row)) for row in values]
+
+
+def test_csv_rows():
+    chunks = list(iter_csv(QUESTIONS))
+    assert len(chunks) > 2
+    assert read_csv(chunks) == rows(QUESTIONS, 4)
+
+
+def test_csv_quotes_special_characters_and_widens_for_extra_choices():
+    assert read_csv(iter_csv(SPECIAL)) == rows(SPECIAL, 5)
+
+
+def test_csv_of_a_generator_uses_the_given_choice_count():
+    assert read_csv(iter_csv(iter(SPECIAL), choices=5)) == rows(SPECIAL, 5)
+
+
+def test_xlsx_rows():
+    chunks = list(iter_xlsx(QUESTIONS))
+    assert len(chunks) > 2
+    assert read_xlsx(chunks) == rows(QUESTIONS, 4)
+
+
+def test_xlsx_escapes_markup_and_drops_illegal_characters():
+    expected = rows(SPECIAL, 5)
+    expected[2][0] = 'Controlcharacter'
+    assert read_xlsx(iter_xlsx(SPECIAL)) == expected
+
+
+def read_columnar(format, chunks):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    data = b''.join(chunks)
+    return pq.read_table(io.BytesIO(data)) if format == 'parquet' else pa.ipc.open_file(pa.BufferReader(data)).read_all()
+
+
+COLUMNAR = {'parquet': iter_parquet, 'arrow': iter_arrow}
+
+
+@pytest.mark.parametrize('format', sorted(COLUMNAR))
+def test_columnar_rows_across_groups(format):
+    pytest.importorskip('pyarrow')
+    grouping = {'parquet': 'row_group_size', 'arrow': 'rows_per_batch'}[format]
+    table = read_columnar(format, COLUMNAR[format](QUESTIONS, **{grouping: 100}))
+    assert table.schema == arrow_schema()
+    assert table.column('Number').to_pylist() == [question.number for question in QUESTIONS]
+    assert [[value or '' for value in row.values()] for row in table.drop(['Number']).to_pylist()] == \
+        rows(QUESTIONS, 4)[1:]
+
+
+@pytest.mark.parametrize('format', sorted(COLUMNAR))
+def test_columnar_numbers_are_strings_and_empty_values_null(format):
+    pytest.importorskip('pyarrow')
+    questions = SPECIAL + [Question('123456789012345678901234567890', 'Big', ('x', '', '', ''))]
+    table = read_columnar(format, COLUMNAR[format](questions))
+    assert table.column_names == ['Number'] + columns(5)
+    assert table.column('Number').to_pylist() == ['1', '2', '123456789012345678901234567890']
+    assert table.column('answer choice C').to_pylist() == [None, 'c', None]
+    assert table.column('answer choice E').to_pylist() == [None, 'e', None]
+    assert table.column('Correct Answer').to_pylist() == ['résumé', 'e', None]
+
+
+def test_compressed_arrow_reads_back():
+    pytest.importorskip('pyarrow')
+    plain = read_columnar('arrow', iter_arrow(QUESTIONS))
+    assert read_columnar('arrow', iter_arrow(QUESTIONS, compression='zstd')).equals(plain)
+
+
+def test_columnar_export_of_no_questions():
+    pytest.importorskip('pyarrow')
+    for format, exporter in COLUMNAR.items():
+        table = read_columnar(format, exporter([]))
+        assert table.num_rows == 0 and table.schema == arrow_schema()
@@ -0,0 +1,255 @@
+"""The Flask app's pages and APIs, with its stores in a temporary directory."""
+import io
+import json
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from exam_corpus import build_docx, synthetic_exam
+
+EXAM = b'1. First question\nA. one\nB. two*\nC. three\nD. four\n2. Second question\nA. a\nB. b\nC. c\nD. d\n'
+
+HTML = {'Accept': 'text/html'}
+
+
+@pytest.fixture(scope='module')
+def flask_app(tmp_path_factory):
+    directory = tmp_path_factory.mktemp('flask_app')
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv('RESULT_STORE_PATH', str(directory / 'results.sqlite3'))
+        monkeypatch.delenv('QUESTION_BANK_PATH', raising=False)
+        monkeypatch.setenv('DATA_DIR', str(directory / 'data'))
+        monkeypatch.setenv('METRICS_DIR', str(directory / 'metrics'))
+        # The stores are opened when the module is imported
+        sys.modules.pop('flask_app', None)
+        import flask_app
+        yield flask_app
+        if flask_app.job_queue._executor is not None:
+            flask_app.job_queue._executor.shutdown()
+
+
+@pytest.fixture
+def client(flask_app):
+    return flask_app.app.test_client()
+
+
+def wait_for_job(client, status_url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        body = client.get(status_url).get_json()
+        if body['status'] not in ('queued', 'running'):
+            return body
+        time.sleep(0.05)
+    raise AssertionError("job did not finish")
+
+
+def test_job_api(client):
+    response = client.post('/jobs', data={'question_file': (io.BytesIO(EXAM), 'exam.txt')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 202
+    body = wait_for_job(client, response.headers['Location'])
+    assert body['status'] == 'done' and body['questions'] == 2
+    assert client.get(body['downloads']['csv']).data.startswith(b'Question,')
+    assert client.get('/jobs/unknown').status_code == 404
+
+
+def test_a_repeat_submission_is_answered_with_the_stored_result(flask_app, client):
+    exam = EXAM + b'3. Repeated\nA. a*\nB. b\n'
+    response = client.post('/jobs', data={'question_file': (io.BytesIO(exam), 'exam.txt')},
+                           content_type='multipart/form-data')
+    result_id = wait_for_job(client, response.headers['Location'])['result_id']
+    # Any worker finds the result: the per-process parse cache never saw this upload
+    assert flask_app.parse_cache.get(flask_app.upload_cache_key(exam, '', None)) is None
+
+    response = client.post('/jobs', data={'question_file': (io.BytesIO(exam), 'again.txt')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    assert response.get_json()['result_id'] == result_id
+    assert response.get_json()['result_url'] == f'/results/{result_id}'
+    response = client.post('/', headers=HTML, content_type='multipart/form-data',
+                           data={'question_file': (io.BytesIO(exam), 'exam.txt'), 'background': 'on'})
+    assert response.status_code == 303 and response.headers['Location'] == f'/results/{result_id}'
+
+    # A different answer key is a different conversion
+    response = client.post('/jobs', content_type='multipart/form-data', data={
+        'question_file': (io.BytesIO(exam), 'exam.txt'), 'answer_key_file': (io.BytesIO(b'1: A'), 'key.txt')})
+    assert response.status_code == 202
+    wait_for_job(client, response.headers['Location'])
+
+
+def test_a_full_queue_answers_503(flask_app, client, monkeypatch):
+    monkeypatch.setattr(flask_app.job_queue, 'max_pending', 0)
+    exam = EXAM + b'3. Queued\nA. a*\nB. b\n'
+    response = client.post('/jobs', data={'question_file': (io.BytesIO(exam), 'exam.txt')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 503
+    assert response.headers['Retry-After']
+    response = client.post('/', headers=HTML, content_type='multipart/form-data',
+                           data={'question_file': (io.BytesIO(exam), 'exam.txt'), 'background': 'on'})
+    assert response.status_code == 503
+    assert b'The server is busy' in response.data
+
+
+def upload(client, exam=EXAM, key=None, key_name='key.txt', **form):
+    data = {'question_file': (io.BytesIO(exam), 'exam.txt'), **form}
+    if key is not None:
+        data.update(has_separate_answers='on', answer_key_file=(io.BytesIO(key), key_name))
+    return client.post('/', headers=HTML, content_type='multipart/form-data', data=data)
+
+
+def result_id_of(response):
+    return re.search(rb'result_id=(\w+)', response.data).group(1).decode()
+
+
+def test_the_question_bank_defaults_to_the_data_directory(flask_app):
+    assert flask_app.question_bank.path == os.path.join(flask_app.DATA_DIR, 'question_bank.sqlite3')
+    assert os.path.isfile(flask_app.question_bank.path)
+
+
+def test_health_check(client):
+    response = client.get('/')
+    assert response.status_code == 200
+    assert response.data == b'OK'
+
+
+def test_index_page(client):
+    response = client.get('/', headers=HTML)
+    assert response.status_code == 200
+    assert b'name="question_file"' in response.data
+
+
+def test_missing_upload_shows_an_error(client):
+    response = client.post('/', data={}, headers=HTML)
+    assert response.status_code == 200
+    assert b'No question file uploaded' in response.data
+
+
+def test_preview_renders_the_first_page_and_serves_the_rest(client):
+    exam = synthetic_exam(120, seed=4).encode('utf-8')
+    response = upload(client, exam)
+    assert response.status_code == 200
+    # The header row, then the first page
+    assert response.data.count(b'<tr><th>') == 1 + 50
+    assert b'Showing 50 of 120' in response.data
+    result_id = result_id_of(response)
+
+    page = client.get(f'/results/{result_id}/questions?offset=100&limit=50').get_json()
+    assert (page['total'], page['matched'], len(page['rows'])) == (120, 120, 20)
+    assert page['rows'][0]['number'] == '101'
+
+    page = client.get(f'/results/{result_id}/questions?filter=missing_correct&limit=500').get_json()
+    assert 0 < page['matched'] < 120
+    assert all(not row['Correct Answer'] for row in page['rows'])
+
+    assert client.get(f'/results/{result_id}/questions?limit=x').status_code == 400
+    assert client.get(f'/results/{result_id}/questions?filter=nope').status_code == 400
+    assert client.get('/results/unknown/questions').status_code == 404
+
+
+def test_result_page_and_downloads(client):
+    result_id = result_id_of(upload(client, key=b'1: A\n2: C'))
+    page = client.get(f'/results/{result_id}', headers=HTML)
+    assert b'Total questions parsed: 2' in page.data
+    csv = client.get(f'/download/csv?result_id={result_id}')
+    assert csv.status_code == 200
+    assert csv.data.decode('utf-8').splitlines()[2].endswith(',c')
+    assert client.get(f'/download/excel?result_id={result_id}').data.startswith(b'PK')
+    assert client.get('/download/csv?result_id=unknown').status_code == 400
+    assert client.get(f'/download/pdf?result_id={result_id}').status_code == 400
+    assert client.get('/results/unknown', headers=HTML).status_code == 404
+
+
+@pytest.mark.parametrize('exam, key', [
+    ('exam.txt', 'key.docx'),
+    ('exam.txt', 'answers.txt'),
+    ('questions.txt', 'whatever.txt'),
+    ('exam1.txt', 'exam1_key.txt'),
+])
+def test_pair_uploads_pairs_a_lone_exam_with_its_key(flask_app, exam, key):
+    key_bytes = build_docx(2) if key.endswith('.docx') else b'1: A\n2: C\n'
+    pairs, unpaired = flask_app.pair_uploads({Path(exam): EXAM, Path(key): key_bytes})
+    assert pairs == [(Path(exam), Path(key))]
+    assert unpaired == []
+
+
+def test_pair_uploads_keeps_two_exams_apart(flask_app):
+    pairs, unpaired = flask_app.pair_uploads({Path('a.txt'): EXAM, Path('b.txt'): EXAM})
+    assert pairs == [(Path('a.txt'), None), (Path('b.txt'), None)]
+    assert unpaired == []
+
+
+def test_pair_uploads_by_name_and_reports_leftovers(flask_app):
+    uploads = {Path('a.txt'): EXAM, Path('a_key.txt'): b'1: A', Path('b.txt'): EXAM, Path('c_key.txt'): b'1: B'}
+    pairs, unpaired = flask_app.pair_uploads(uploads)
+    assert pairs == [(Path('a.txt'), Path('a_key.txt')), (Path('b.txt'), None)]
+    assert unpaired == [Path('c_key.txt')]
+
+
+def test_api_convert_streams_records(client):
+    response = client.post('/api/convert', content_type='multipart/form-data', data={
+        'files': [(io.BytesIO(EXAM), 'a.txt'), (io.BytesIO(b'1: A\n2: C'), 'a_key.txt'),
+                  (io.BytesIO(b'1: B'), 'orphan_key.txt')]})
+    assert response.mimetype == 'application/x-ndjson'
+    records = [json.loads(line) for line in response.data.decode('utf-8').splitlines()]
+    assert [record['type'] for record in records] == ['question', 'question', 'file', 'error']
+    assert [record['correct_answer'] for record in records[:2]] == ['two', 'c']
+    assert records[2]['questions'] == 2 and records[2]['coverage']['matched'] == 2
+    assert records[3]['source'] == 'orphan_key.txt'
+
+    response = client.post('/api/convert?format=json', content_type='multipart/form-data',
+                           data={'exam': (io.BytesIO(EXAM), 'a.txt')})
+    assert len(response.get_json()) == 3
+    assert client.post('/api/convert').status_code == 400
+
+
+def test_a_re_upload_lists_the_changes(client):
+    first = result_id_of(upload(client))
+    edited = EXAM.replace(b'Second question', b'Second question, edited') + b'3. Third\nA. x\nB. y*\n'
+    response = upload(client, edited, previous_result_id=first)
+    assert b'Compared with the previous upload: 1 added, 0 removed, 1 changed.' in response.data
+    assert b'Added: 3' in response.data and b'Changed: 2' in response.data
+
+    second = result_id_of(response)
+    assert client.get(f'/results/{second}/changes?since={first}').get_json()['changed'] == ['2']
+    assert client.get(f'/results/{second}/changes?since=missing').status_code == 404
+    # The changes are stored with the result, so its page shows them again
+    assert b'Changed: 2' in client.get(f'/results/{second}', headers=HTML).data
+    assert b'Compared with the previous upload' not in client.get(f'/results/{first}', headers=HTML).data
+
+
+def test_a_background_re_upload_lists_the_changes(client):
+    first = result_id_of(upload(client))
+    edited = EXAM.replace(b'First question', b'First question, edited')
+    response = upload(client, edited, previous_result_id=first, background='on')
+    assert response.status_code == 303
+    result_id = wait_for_job(client, response.headers['Location'])['result_id']
+    page = client.get(f'/results/{result_id}', headers=HTML).data
+    assert b'Compared with the previous upload: 0 added, 0 removed, 1 changed.' in page
+
+
+def test_a_large_re_upload_is_parsed_incrementally(flask_app, client, monkeypatch):
+    exam = synthetic_exam(50, seed=11).encode('utf-8')
+    first = result_id_of(upload(client, exam))
+    monkeypatch.setattr(flask_app, 'JOB_SIZE_THRESHOLD', 0)
+    misses = flask_app.block_cache.stats()['misses']
+    response = upload(client, exam.replace(b'1. ', b'1. Edited ', 1), previous_result_id=first)
+    assert response.status_code == 200
+    assert b'0 added, 0 removed, 1 changed' in response.data
+    # Every block is looked up once, and only the edited one is rebuilt
+    assert flask_app.block_cache.stats()['misses'] - misses == 1
+    # Without a stored result to compare with, a large upload still goes to the job pool
+    response = upload(client, exam.replace(b'2. ', b'2. Edited ', 1), previous_result_id='expired')
+    assert response.status_code == 303 and '/jobs/' in response.headers['Location']
+    wait_for_job(client, response.headers['Location'])
+
+
+def test_upload_errors_name_the_file(client):
+    response = upload(client, key=b'not a zip', key_name='key.docx')
+    assert b'Error reading answer key file: not a readable .docx file' in response.data
+    response = client.post('/', headers=HTML, content_type='multipart/form-data',
+                           data={'question_file': (io.BytesIO(b'not a zip'), 'exam.docx')})
+    assert b'Error reading file: not a readable .docx file' in response.data
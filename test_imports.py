@@ -0,0 +1,31 @@
+"""Entry points leave their heavy dependencies to be imported on first use."""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent
+
+HEAVY = ('pandas', 'docx', 'chardet', 'pyarrow', 'numpy', 'openpyxl')
+
+# Entry point -> heavy modules it may import at startup
+ALLOWED = {
+    'parser': (),
+    'batch_convert': (),
+    'flask_app': ('numpy',),
+    'app': ('pandas', 'numpy', 'pyarrow'),
+}
+
+
+@pytest.mark.parametrize('module', sorted(ALLOWED))
+def test_heavy_dependencies_are_imported_on_first_use(module, tmp_path):
+    env = dict(os.environ, RESULT_STORE_PATH=str(tmp_path / 'results.sqlite3'),
+               QUESTION_BANK_PATH=str(tmp_path / 'bank.sqlite3'), METRICS_DIR=str(tmp_path / 'metrics'))
+    code = f"import sys, {module}; print(' '.join(m for m in {HEAVY!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env, capture_output=True, text=True,
+                            check=True)
+    # The Streamlit app prints start-up information first
+    imported = result.stdout.splitlines()[-1].split() if result.stdout.strip() else []
+    assert set(imported) <= set(ALLOWED[module])
@@ -0,0 +1,55 @@
+"""Block-level reuse of parsed questions and the diff between two versions of an exam."""
+import json
+
+import pytest
+
+from exam_corpus import answer_key_text, fixture_exams, synthetic_exam
+from incremental import BlockCache, QuestionDiff, diff_questions
+from parser import ExamParser, Question
+
+FIXTURES = fixture_exams() + [('synthetic', synthetic_exam(300, seed=7))]
+
+
+@pytest.mark.parametrize('name, content', FIXTURES, ids=[name for name, _ in FIXTURES])
+def test_cached_parse_matches_parse_content(name, content):
+    key_text = answer_key_text(150)
+    parser = ExamParser()
+    expected = parser.parse_content(content, key_text)
+    block_cache = BlockCache(max_entries=100000)
+    for _ in range(2):
+        cached = ExamParser()
+        assert cached.parse_content(content, key_text, block_cache=block_cache) == expected
+        assert cached.stats.as_dict() == parser.stats.as_dict()
+
+
+def test_only_edited_blocks_are_reparsed():
+    content = synthetic_exam(50, seed=1)
+    block_cache = BlockCache(max_entries=1000)
+    ExamParser().parse_content(content, block_cache=block_cache)
+    edited = content.replace('1. ', '1. Edited ', 1)
+    assert ExamParser().parse_content(edited, block_cache=block_cache) == ExamParser().parse_content(edited)
+    assert block_cache.stats()['misses'] == 51
+
+
+def test_a_new_key_letter_reparses_the_block():
+    content = synthetic_exam(10, seed=2)
+    block_cache = BlockCache(max_entries=1000)
+    ExamParser().parse_content(content, '1: A', block_cache=block_cache)
+    assert ExamParser().parse_content(content, '1: B', block_cache) == ExamParser().parse_content(content, '1: B')
+    assert block_cache.stats()['misses'] == 11
+
+
+def test_entries_are_bounded():
+    block_cache = BlockCache(max_entries=5)
+    ExamParser().parse_content(synthetic_exam(20, seed=3), block_cache=block_cache)
+    assert block_cache.stats()['entries'] == 5
+
+
+def test_diff_matches_repeated_numbers_in_order():
+    old = [Question('1', 'a', ()), Question('2', 'b', ()), Question('2', 'c', ()), Question('3', 'd', ())]
+    new = [Question('1', 'a', ()), Question('2', 'b', ()), Question('2', 'changed', ()), Question('4', 'e', ())]
+    changes = diff_questions(old, new)
+    assert changes.as_dict() == {'added': ['4'], 'removed': ['3'], 'changed': ['2'], 'unchanged': 2}
+    assert changes.describe() == '1 added, 1 removed, 1 changed'
+    assert not diff_questions(old, old) and diff_questions(old, old).describe() == 'no questions changed'
+    assert QuestionDiff.from_dict(json.loads(json.dumps(changes.as_dict()))).as_dict() == changes.as_dict()
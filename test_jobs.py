@@ -0,0 +1,88 @@
+"""Background conversions: their lifecycle, the queue bound and recovery from a dead pool process."""
+import json
+import os
+import signal
+import time
+
+import pytest
+
+from jobs import JobQueue, QueueFull
+from result_store import ResultStore
+
+EXAM = b'1. First\nA. a*\nB. b\n2. Second\nA. a\nB. b*\n'
+
+
+def wait(queue, job_id, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job['status'] not in ('queued', 'running'):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(ResultStore(str(tmp_path / 'results.sqlite3')), workers=1)
+    yield queue
+    if queue._executor is not None:
+        queue._executor.shutdown()
+
+
+def test_a_job_stores_its_result_and_exports(queue):
+    finished = []
+    queue.on_finish = lambda status, seconds: finished.append(status)
+    job = wait(queue, queue.submit('exam.txt', EXAM, 'key.txt', b'1: B'))
+    assert job['status'] == 'done' and job['questions'] == 2
+    store = queue.result_store
+    assert [question.correct_answer for question in store.get(job['result_id'])] == ['a', 'b']
+    assert json.loads(store.get_artifact(job['result_id'], 'stats'))['conflicts'] == ['1']
+    assert store.get_artifact(job['result_id'], 'csv').startswith(b'Question,')
+    assert store.get_artifact(job['result_id'], 'xlsx').startswith(b'PK')
+    assert finished == ['done']
+    assert queue.get('unknown') is None
+
+
+
+def test_a_job_records_its_key_and_changes(queue):
+    first = wait(queue, queue.submit('exam.txt', EXAM))['result_id']
+    edited = EXAM.replace(b'Second', b'Second, edited') + b'3. Third\nA. a*\n'
+    job = wait(queue, queue.submit('exam.txt', edited, cache_key='edited', previous_result_id=first))
+    store = queue.result_store
+    assert store.find('edited') == job['result_id']
+    assert json.loads(store.get_artifact(job['result_id'], 'changes')) == {
+        'added': ['3'], 'removed': [], 'changed': ['2'], 'unchanged': 1}
+    job = wait(queue, queue.submit('exam.txt', edited, previous_result_id='expired'))
+    assert job['status'] == 'done' and store.get_artifact(job['result_id'], 'changes') is None
+
+def test_a_failing_job_records_its_error(queue):
+    job = wait(queue, queue.submit('key.docx', EXAM, 'key.docx', b'not a zip file'))
+    assert job['status'] == 'failed'
+    assert job['error']
+
+
+def test_the_queue_refuses_jobs_beyond_max_pending(queue):
+    queue.max_pending = 0
+    with pytest.raises(QueueFull):
+        queue.submit('exam.txt', EXAM)
+    assert queue.stats() == {'workers': 1, 'max_pending': 0}
+
+
+def test_a_new_pool_replaces_one_whose_process_died(queue):
+    assert wait(queue, queue.submit('exam.txt', EXAM))['status'] == 'done'
+    for pid in list(queue._executor._processes):
+        os.kill(pid, signal.SIGKILL)
+    time.sleep(0.5)
+    assert wait(queue, queue.submit('exam.txt', EXAM))['status'] == 'done'
+    assert wait(queue, queue.submit('exam.txt', EXAM))['status'] == 'done'
+
+
+def test_a_job_whose_process_dies_fails_alone(queue):
+    job_id = queue.submit('exam.txt', EXAM * 300000)
+    time.sleep(0.5)
+    for pid in list(queue._executor._processes):
+        os.kill(pid, signal.SIGKILL)
+    job = wait(queue, job_id)
+    assert job['status'] == 'failed'
+    assert wait(queue, queue.submit('exam.txt', EXAM))['status'] == 'done'
@@ -0,0 +1,39 @@
+"""parse_mapped against parsing the same file read into memory."""
+import pytest
+
+from decoding import decode_bytes
+from exam_corpus import DIALECT_SAMPLES, EDGE_CASES, answer_key_text, fixture_exams, synthetic_exam
+from mapped import parse_mapped
+from parser import ExamParser
+
+CASES = ([(name, content, answer_key_text(150)) for name, content in fixture_exams()]
+         + [('synthetic', synthetic_exam(500, seed=7), answer_key_text(250))]
+         + [(name, content, None) for name, content in DIALECT_SAMPLES.items()]
+         + EDGE_CASES)
+
+
+@pytest.mark.parametrize('newline', ['\n', '\r\n', '\r'])
+@pytest.mark.parametrize('name, content, key_text', CASES, ids=[case[0] for case in CASES])
+def test_mapped_parse_matches_parse_content(tmp_path, name, content, key_text, newline):
+    lines = content.replace('\r\n', '\n').replace('\r', '\n')
+    sequential = ExamParser()
+    expected = sequential.parse_content(lines, key_text)
+    path = tmp_path / 'exam.txt'
+    path.write_bytes(lines.replace('\n', newline).encode('utf-8'))
+    mapped = ExamParser()
+    assert parse_mapped(path, key_text, parser=mapped) == expected
+    assert mapped.stats.as_dict() == sequential.stats.as_dict()
+
+
+@pytest.mark.parametrize('encoding', ['utf-8-sig', 'utf-16', 'cp1252'])
+def test_encodings(tmp_path, encoding):
+    data = synthetic_exam(300, seed=2).encode(encoding)
+    path = tmp_path / 'exam.txt'
+    path.write_bytes(data)
+    assert parse_mapped(path) == ExamParser().parse_content(decode_bytes(data).text)
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / 'exam.txt'
+    path.write_bytes(b'')
+    assert parse_mapped(path) == []
@@ -0,0 +1,84 @@
+"""Metrics recorded by several processes and summed for /metrics."""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from metrics import AGGREGATE_NAME, Metrics
+
+ROOT = Path(__file__).resolve().parent
+
+CHILD = """
+import sys
+from metrics import Metrics
+metrics = Metrics(sys.argv[1], flush_interval=3600)
+metrics.inc('exam_requests_total', int(sys.argv[2]), endpoint='convert', outcome='ok')
+metrics.observe('exam_stage_seconds', 0.003, stage='parse')
+"""
+
+
+def run_child(directory, amount):
+    """Record in a separate process, which writes its snapshot as it exits."""
+    subprocess.run([sys.executable, '-c', CHILD, str(directory), str(amount)], cwd=ROOT, check=True)
+
+
+def counter(metrics):
+    counters, _ = metrics.collect()
+    return counters.get(('exam_requests_total', (('endpoint', 'convert'), ('outcome', 'ok'))), 0)
+
+
+def test_render_counters_and_histograms(tmp_path):
+    metrics = Metrics(str(tmp_path))
+    metrics.inc('exam_requests_total', endpoint='convert', outcome='ok')
+    metrics.observe('exam_stage_seconds', 0.003, stage='parse')
+    metrics.observe('exam_stage_seconds', 20, stage='parse')
+    text = metrics.render()
+    assert 'exam_requests_total{endpoint="convert",outcome="ok"} 1' in text
+    assert 'exam_stage_seconds_bucket{stage="parse",le="0.005"} 1' in text
+    assert 'exam_stage_seconds_bucket{stage="parse",le="+Inf"} 2' in text
+    assert 'exam_stage_seconds_count{stage="parse"} 2' in text
+
+
+def test_exited_processes_are_folded_into_the_aggregate(tmp_path):
+    metrics = Metrics(str(tmp_path))
+    metrics.inc('exam_requests_total', endpoint='convert', outcome='ok')
+    run_child(tmp_path, 2)
+    run_child(tmp_path, 3)
+    assert counter(metrics) == 6
+
+    # Only this process's snapshot and the aggregate are left
+    snapshots = [name for name in os.listdir(tmp_path) if name.endswith('.json')]
+    assert sorted(snapshots) == sorted([AGGREGATE_NAME, os.path.basename(metrics._snapshot_path)])
+    _, histograms = metrics.collect()
+    assert histograms[('exam_stage_seconds', (('stage', 'parse'),))][2] == 2
+
+    # Counters never go backwards, and folding twice adds nothing
+    run_child(tmp_path, 4)
+    assert counter(metrics) == 10
+    assert counter(metrics) == 10
+
+
+def test_a_reused_pid_does_not_overwrite_an_earlier_snapshot(tmp_path):
+    metrics = Metrics(str(tmp_path))
+    # A snapshot left by an earlier process with this process's PID
+    earlier = {'counters': [['exam_requests_total', {'endpoint': 'convert', 'outcome': 'ok'}, 5]],
+               'histograms': []}
+    (tmp_path / f'{os.getpid()}-0badf00d.json').write_text(json.dumps(earlier))
+    metrics.inc('exam_requests_total', endpoint='convert', outcome='ok')
+    assert counter(metrics) == 6
+
+
+def test_a_snapshot_folded_but_not_removed_is_not_added_twice(tmp_path):
+    metrics = Metrics(str(tmp_path))
+    run_child(tmp_path, 2)
+    leftover = next(name for name in os.listdir(tmp_path) if name.endswith('.json'))
+    data = (tmp_path / leftover).read_text()
+    assert counter(metrics) == 2
+    # As if the removal after folding had been interrupted
+    (tmp_path / leftover).write_text(data)
+    aggregate = json.loads((tmp_path / AGGREGATE_NAME).read_text())
+    aggregate['folded'].append(leftover)
+    (tmp_path / AGGREGATE_NAME).write_text(json.dumps(aggregate))
+    assert counter(metrics) == 2
+    assert not (tmp_path / leftover).exists()
@@ -0,0 +1,40 @@
+"""parse_parallel against a sequential parse."""
+import pytest
+
+from exam_corpus import DIALECT_SAMPLES, EDGE_CASES, answer_key_text, fixture_exams, synthetic_exam
+from parallel import make_executor, parse_parallel, split_content
+from parser import ExamParser
+
+CASES = ([(name, content, answer_key_text(150)) for name, content in fixture_exams()]
+         + [('synthetic', synthetic_exam(2000, seed=7), answer_key_text(1000))]
+         + [(name, content, None) for name, content in DIALECT_SAMPLES.items()]
+         + EDGE_CASES)
+
+
+@pytest.fixture(scope='module')
+def pool():
+    executor = make_executor(2)
+    yield executor
+    executor.shutdown()
+
+
+@pytest.mark.parametrize('name, content, key_text', CASES, ids=[case[0] for case in CASES])
+def test_parallel_parse_matches_parse_content(pool, name, content, key_text):
+    sequential = ExamParser()
+    expected = sequential.parse_content(content, key_text)
+    parallel = ExamParser()
+    assert parse_parallel(content, key_text, 2, pool, min_chars=0, parser=parallel) == expected
+    assert parallel.stats.as_dict() == sequential.stats.as_dict()
+    assert parallel.error_count == sequential.error_count
+
+
+def test_chunks_start_at_question_boundaries():
+    content = synthetic_exam(200, seed=4)
+    chunks = split_content(content, 8)
+    assert len(chunks) == 8
+    assert all(chunk.split('.', 1)[0].isdigit() for chunk in chunks[1:])
+
+
+def test_small_content_takes_the_sequential_path():
+    content = synthetic_exam(5, seed=5)
+    assert parse_parallel(content, workers=4) == ExamParser().parse_content(content)
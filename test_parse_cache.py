@@ -0,0 +1,56 @@
+"""The content-addressed parse cache and its byte bound."""
+from exam_corpus import synthetic_exam
+from parse_cache import ParseCache, estimate_size
+from parser import ExamParser
+
+
+def test_keys_depend_on_every_input():
+    key = ParseCache.make_key(b'exam', b'key')
+    assert ParseCache.make_key(b'exam', b'key') == key
+    assert ParseCache.make_key(b'exam', b'key', settings=(True,)) != key
+    assert ParseCache.make_key(b'exa', b'mkey') != key
+    assert ParseCache.make_key(b'exam', None) == ParseCache.make_key(b'exam', b'')
+
+
+def test_hits_and_misses():
+    cache = ParseCache(max_bytes=100)
+    assert cache.get('a') is None
+    cache.put('a', 'value', 10)
+    assert cache.get('a') == 'value'
+    assert cache.stats() == {'entries': 1, 'bytes': 10, 'max_bytes': 100, 'hits': 1, 'misses': 1, 'evictions': 0}
+
+
+def test_least_recently_used_entries_are_evicted_to_stay_within_max_bytes():
+    cache = ParseCache(max_bytes=100)
+    cache.put('a', 1, 40)
+    cache.put('b', 2, 40)
+    cache.get('a')
+    cache.put('c', 3, 40)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.stats()['bytes'] == 80
+    assert cache.stats()['evictions'] == 1
+
+
+def test_replacing_an_entry_updates_its_size():
+    cache = ParseCache(max_bytes=100)
+    cache.put('a', 1, 90)
+    cache.put('a', 2, 30)
+    cache.put('b', 3, 60)
+    assert cache.get('a') == 2
+    assert cache.stats()['bytes'] == 90
+
+
+def test_entries_larger_than_the_cache_are_not_stored():
+    cache = ParseCache(max_bytes=100)
+    cache.put('a', 1, 50)
+    cache.put('big', 2, 101)
+    assert cache.get('big') is None
+    assert cache.get('a') == 1
+
+
+def test_estimate_size_grows_with_the_questions():
+    small = ExamParser().parse_content(synthetic_exam(10))
+    large = ExamParser().parse_content(synthetic_exam(100))
+    assert 0 < estimate_size(small) < estimate_size(large)
+    assert estimate_size(large) > sum(len(question.text) for question in large)
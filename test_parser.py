@@ -0,0 +1,119 @@
+"""ExamParser against the regex parser it replaced, and its streaming, statistics and dialect behaviour."""
+import io
+import json
+import pickle
+
+import pytest
+
+from decoding import decode_bytes
+from exam_corpus import answer_key_text, as_dicts, fixture_exams, reference_parse, synthetic_exam
+from parser import LISTED_NUMBERS, ExamParser, ParseStats, Question, iter_lines
+
+FIXTURES = fixture_exams()
+
+
+@pytest.mark.parametrize('name, content', FIXTURES, ids=[name for name, _ in FIXTURES])
+def test_fixtures_match_reference_parser(name, content):
+    assert as_dicts(ExamParser().parse_content(content)) == reference_parse(content, {})
+
+
+@pytest.mark.parametrize('count', [1, 50, 500])
+def test_synthetic_exams_match_reference_parser(count):
+    content = synthetic_exam(count, seed=count)
+    key_text = answer_key_text(count // 2)
+    parser = ExamParser()
+    expected = reference_parse(content, parser.parse_answer_key(key_text))
+    assert as_dicts(parser.parse_content(content, key_text)) == expected
+
+
+@pytest.mark.parametrize('newline', ['\r\n', '\r'])
+def test_line_endings_do_not_change_the_result(newline):
+    content = synthetic_exam(100, seed=3)
+    assert ExamParser().parse_content(content.replace('\n', newline)) == ExamParser().parse_content(content)
+
+
+def test_question_number_alone_is_not_a_question():
+    questions = ExamParser().parse_content('1. 2025\nA. a\n2. Real question\nA. yes*\nB. no\n')
+    assert [question.number for question in questions] == ['2']
+    assert questions[0].correct_answer == 'yes'
+
+
+
+@pytest.mark.parametrize('name, content', FIXTURES + [('synthetic', synthetic_exam(300, seed=7))],
+                         ids=[name for name, _ in FIXTURES] + ['synthetic'])
+def test_iter_questions_matches_parse_content(name, content):
+    key_text = answer_key_text(150)
+    parser = ExamParser()
+    expected = parser.parse_content(content, key_text)
+    for stream in (io.StringIO(content), io.BytesIO(content.encode('utf-8'))):
+        streamed = ExamParser()
+        assert list(streamed.iter_questions(stream, key_text)) == expected
+        assert streamed.stats.as_dict() == parser.stats.as_dict()
+
+
+def test_iter_questions_decodes_legacy_bytes_like_decode_bytes():
+    data = synthetic_exam(200, seed=2).encode('cp1252')
+    expected = ExamParser().parse_content(decode_bytes(data).text)
+    assert list(ExamParser().iter_questions(io.BytesIO(data))) == expected
+
+
+def test_iter_questions_reads_the_stream_lazily():
+    stream = io.BytesIO(synthetic_exam(20000, seed=1).encode('utf-8'))
+    questions = ExamParser().iter_questions(stream)
+    assert next(questions).number == '1'
+    assert stream.tell() < len(stream.getvalue()) // 2
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7])
+def test_iter_lines_across_chunk_boundaries(chunk_size):
+    content = 'one\r\ntwo\rthree\n\r\nfour\r'
+    expected = content.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    assert list(iter_lines(io.StringIO(content), chunk_size=chunk_size)) == expected
+    assert list(iter_lines(io.BytesIO(content.encode('utf-8')), chunk_size=chunk_size)) == expected
+
+
+def test_question_records_round_trip():
+    question = Question('7', 'Stem', ('a', 'b', 'c', 'd', 'e'), 'e')
+    assert not hasattr(question, '__dict__')
+    assert Question.from_tuple(json.loads(json.dumps(question.astuple()))) == question
+    assert pickle.loads(pickle.dumps(question)) == question
+    assert question.choice('e') == 'e' and question.choice('F') == ''
+    assert question.row() == ['Stem', 'a', 'b', 'c', 'd', 'e', 'e']
+    assert list(question.as_dict()) == ['Question', 'answer choice A', 'answer choice B', 'answer choice C',
+                                        'answer choice D', 'answer choice E', 'Correct Answer']
+    assert Question('1', 'Short', ('a',)).row(5) == ['Short', 'a', '', '', '', '', '']
+
+
+def test_stats_ignore_large_numbering_gaps():
+    content = '1. First\nA. a*\nB. b\n20250210. Dated\nA. a*\nB. b\n3000000000. Far\nA. a*\nB. b\n'
+    parser = ExamParser()
+    parser.parse_content(content)
+    assert parser.stats.skipped == []
+    assert parser.stats.skipped_count == 0
+
+
+def test_stats_list_the_first_skipped_numbers():
+    content = ''.join(f'{number}. Q\nA. a*\nB. b\n' for number in (1, 50, 60))
+    parser = ExamParser()
+    parser.parse_content(content)
+    stats = parser.stats
+    assert stats.skipped == [str(number) for number in range(2, 2 + LISTED_NUMBERS)]
+    assert stats.skipped_count == 48 + 9
+    assert ParseStats.from_dict(json.loads(json.dumps(stats.as_dict()))).as_dict() == stats.as_dict()
+    assert stats.warnings()[-1] == 'Found 57 question numbers skipped (2, 3, 4, 5, 6, 7, 8, 9, 10, 11, ...)'
+
+
+def test_stats_stored_before_the_cap_keep_their_count():
+    stats = ParseStats.from_dict({'total': 30, 'missing_choices': [], 'unresolved': [], 'duplicates': [],
+                                  'conflicts': [], 'skipped': [str(number) for number in range(2, 22)]})
+    assert stats.skipped_count == 20
+    assert len(stats.skipped) == LISTED_NUMBERS
+
+
+def test_stats_problems():
+    choices = 'B. b\nC. c\nD. d\n'
+    content = f'1. Q\nA. a\nB. \nC. c\nD. d\n1. Again\nA. a*\n{choices}3. Keyed\nA. a*\n{choices}4. Key\nA. a\n{choices}'
+    parser = ExamParser()
+    parser.parse_content(content, '3: B\n4: D')
+    assert parser.stats.as_dict() == {'total': 4, 'missing_choices': ['1'], 'unresolved': ['1'], 'duplicates': ['1'],
+                                      'skipped': ['2'], 'skipped_count': 1, 'conflicts': ['3']}
@@ -0,0 +1,86 @@
+"""The SQLite question bank: one copy per exam, full-text search and source ranges."""
+import pytest
+
+from exam_corpus import synthetic_exam
+from parser import ExamParser, Question
+from question_bank import QuestionBank, content_hash, match_query
+
+TRUSTS = [Question('1', 'What does a trustee owe?', ('Loyalty', 'Rent', '', ''), 'Loyalty'),
+          Question('2', 'Who creates a trust?', ('The settlor', 'The bank', '', ''), 'The settlor'),
+          Question('3', 'Define an annuity', ('A payment stream', 'A tax', 'A "fee"', ''), 'A payment stream')]
+TAXES = [Question('1', 'When is income tax due?', ('April', 'May', '', ''), 'April'),
+         Question('2', 'Who creates a trust?', ('The settlor', 'The bank', '', ''), 'The settlor')]
+
+
+@pytest.fixture
+def bank(tmp_path):
+    bank = QuestionBank(str(tmp_path / 'bank.sqlite3'))
+    bank.add('trusts.txt', content_hash(b'trusts'), TRUSTS)
+    bank.add('taxes.txt', content_hash(b'taxes'), TAXES)
+    return bank
+
+
+def test_an_exam_already_in_the_bank_is_not_added_again(bank):
+    source_id, added = bank.add('copy.txt', content_hash(b'trusts'), iter(()))
+    assert (source_id, added) == (1, False)
+    assert bank.add('trusts.txt', content_hash(b'trusts', b'key'), TRUSTS)[1]
+    assert bank.stats() == {'sources': 3, 'questions': 8, 'distinct_questions': 4}
+
+
+def test_content_hash_reads_files_like_bytes(tmp_path):
+    path = tmp_path / 'exam.txt'
+    path.write_bytes(b'exam')
+    assert content_hash(path, None) == content_hash(b'exam')
+    assert content_hash(b'exam', b'') == content_hash(b'exam')
+    assert content_hash(b'exam', b'key') != content_hash(b'exam')
+
+
+def test_match_query_quotes_words_and_keeps_prefixes():
+    assert match_query('trust* "fee" OR') == '"trust"* """fee""" "OR"'
+    assert match_query('*') == '"*"'
+    assert match_query('  ') == ''
+
+
+def test_search(bank):
+    total, rows = bank.search('creates trust')
+    assert total == 2
+    assert [(row['source'], row['number']) for row in rows] == [('trusts.txt', '2'), ('taxes.txt', '2')]
+    assert rows[0]['choices'] == {'A': 'The settlor', 'B': 'The bank', 'C': '', 'D': ''}
+    assert bank.search('trust*')[0] == 3
+    assert bank.search('"fee" OR')[0] == 0
+    assert bank.search('"fee"')[1][0]['number'] == '3'
+    assert bank.search('séttlor')[0] == 2
+
+
+def test_search_by_source_and_order(bank):
+    taxes = bank.sources()[0]
+    assert (taxes['name'], taxes['questions']) == ('taxes.txt', 2)
+    assert [row['number'] for row in bank.search(source_id=taxes['id'])[1]] == ['1', '2']
+    assert bank.search('trust*', source_id=taxes['id'])[0] == 1
+    assert [row['id'] for row in bank.search(limit=2, offset=3)[1]] == [4, 5]
+    assert [row['id'] for row in bank.search('trust*', ranked=False)[1]] == [1, 2, 5]
+
+
+def test_iter_questions_and_choice_count(bank, tmp_path):
+    assert list(bank.iter_questions()) == TRUSTS + TAXES
+    assert list(bank.iter_questions('trust*', source_id=1)) == TRUSTS[:2]
+    assert bank.choice_count() == 4
+    wide = ExamParser().parse_content('1. Pick\nA. a\nB. b\nC. c\nD. d\nE. e*\n')
+    bank.add('wide.txt', content_hash(b'wide'), wide)
+    assert bank.choice_count() == 5 and bank.choice_count('trust') == 4
+
+
+def test_large_sources_are_stored_in_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr('question_bank.INSERT_BATCH', 7)
+    monkeypatch.setattr('question_bank.EXPORT_BATCH', 5)
+    questions = ExamParser().parse_content(synthetic_exam(60, seed=3))
+    bank = QuestionBank(str(tmp_path / 'bank.sqlite3'))
+    bank.add('exam.txt', content_hash(b'exam'), questions)
+    assert list(bank.iter_questions()) == questions
+
+
+def test_remove(bank):
+    assert bank.remove(1)
+    assert not bank.remove(1)
+    assert bank.search('trust')[0] == 1
+    assert bank.stats() == {'sources': 1, 'questions': 2, 'distinct_questions': 2}
@@ -0,0 +1,92 @@
+"""Results shared through SQLite: round trips, expiry, the size bound and lookup by input key."""
+import sqlite3
+from contextlib import closing
+
+import pytest
+
+import result_store
+from parser import ExamParser, Question
+from result_store import ResultStore
+
+QUESTIONS = [Question('1', 'First', ('a', 'b', 'c', 'd'), 'b'), Question('2', 'Ünïcode', ('x', '', 'z'), '')]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(result_store.time, 'time', clock.time)
+    return clock
+
+
+def test_round_trip(tmp_path):
+    store = ResultStore(str(tmp_path / 'results.sqlite3'))
+    result_id = store.put(QUESTIONS)
+    assert store.get(result_id) == QUESTIONS
+    assert store.get('unknown') is None
+    # Another store on the same file, as in another worker
+    assert ResultStore(store.path).get(result_id) == QUESTIONS
+
+
+def test_results_expire_after_their_last_access(tmp_path, clock):
+    store = ResultStore(str(tmp_path / 'results.sqlite3'), ttl_seconds=60)
+    result_id = store.put(QUESTIONS)
+    clock.now += 50
+    assert store.get(result_id) is not None
+    clock.now += 50
+    assert store.get(result_id) is not None
+    clock.now += 61
+    assert store.get(result_id) is None
+
+
+def test_least_recently_used_results_are_evicted_beyond_max_bytes(tmp_path, clock):
+    questions = ExamParser().parse_content('1. Q\nA. ' + 'x' * 1000 + '\nB. b\n')
+    store = ResultStore(str(tmp_path / 'results.sqlite3'), max_bytes=2500)
+    first = store.put(questions)
+    clock.now += 1
+    second = store.put(questions)
+    clock.now += 1
+    store.get(first)
+    clock.now += 1
+    third = store.put(questions)
+    assert store.get(second) is None
+    assert store.get(first) is not None and store.get(third) is not None
+    assert store.stats()['bytes'] <= 2500
+
+
+def test_artifacts_count_toward_the_size_and_go_with_their_result(tmp_path, clock):
+    store = ResultStore(str(tmp_path / 'results.sqlite3'), ttl_seconds=60, max_bytes=10000)
+    result_id = store.put(QUESTIONS)
+    size = store.stats()['bytes']
+    store.put_artifact(result_id, 'csv', b'a,b\n')
+    assert store.get_artifact(result_id, 'csv') == b'a,b\n'
+    assert store.get_artifact(result_id, 'xlsx') is None
+    assert store.stats()['bytes'] == size + 4
+
+    store.put_artifact('unknown', 'csv', b'data')
+    assert store.get_artifact('unknown', 'csv') is None
+
+    clock.now += 61
+    assert store.get_artifact(result_id, 'csv') is None
+    store.put(QUESTIONS)
+    assert store.stats()['results'] == 1
+
+
+def test_results_are_found_by_key_while_they_live(tmp_path, clock):
+    store = ResultStore(str(tmp_path / 'results.sqlite3'), ttl_seconds=60)
+    result_id = store.put(QUESTIONS)
+    store.put_key('inputs', result_id)
+    assert store.find('inputs') == result_id
+    assert store.find('other') is None
+    clock.now += 61
+    assert store.find('inputs') is None
+    store.put(QUESTIONS)
+    with closing(sqlite3.connect(store.path)) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM result_keys").fetchone() == (0,)
@@ -1,10 +1,10 @@
 import re
-import chardet
+
+import decoding
 
 def detect_encoding(file_bytes):
-    """Detect the encoding of a file's bytes."""
-    result = chardet.detect(file_bytes)
-    return result['encoding']
+    """Detect the encoding of a file's bytes from its BOM or a bounded sample."""
+    return decoding.bom_encoding(file_bytes) or decoding.detect_encoding(file_bytes[:decoding.SAMPLE_SIZE])
 
 def clean_text(text):
     """Clean text by removing extra whitespace and normalizing line endings."""
@@ -19,4 +19,4 @@ def clean_text(text):
 def extract_question_number(text):
     """Extract question number from text."""
     match = re.match(r'(\d+)\.?\s*', text)
-    return int(match.group(1)) if match else None 
\ No newline at end of file
+    return int(match.group(1)) if match else None 